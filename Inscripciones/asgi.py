@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Inscripciones.settings')
+# Vistas de lectura asíncronas; las descargas largas (exportar-fichas,
+# pdf-grupo) se entregan con iteradores asíncronos por tandas para no
+# reunirlas en memoria (ver registro/vistas_async.py).
+os.environ.setdefault('API_ASYNC', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque
+
+from django.db.backends.mysql import base as mysql
+
+# Backend MySQL (PyMySQL) que reutiliza conexiones entre peticiones. Django
+# sigue "cerrando" la conexión al terminar cada petición (CONN_MAX_AGE = 0),
+# pero _close la devuelve al pool del proceso en lugar de cerrar el socket, y
+# get_new_connection toma una libre antes de abrir otra.
+
+_pools = {}
+_candado_pools = threading.Lock()
+
+
+class PoolAgotado(mysql.Database.OperationalError):
+    pass
+
+
+class PoolConexiones:
+    def __init__(self, tamano=10, espera=5, ping_tras=30, reciclar=1800):
+        self.tamano = tamano
+        self.espera = espera
+        self.ping_tras = ping_tras
+        self.reciclar = reciclar
+        self._condicion = threading.Condition()
+        self._libres = deque()
+        self._esperando = deque()
+        self._creadas = {}
+        self.abiertas = 0
+        self.max_en_uso = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.esperas = 0
+        self.tiempo_espera = 0.0
+        self.agotado = 0
+        self.recicladas = 0
+        self.descartadas = 0
+
+    def _disponible(self):
+        return bool(self._libres) or self.abiertas < self.tamano
+
+    def _esperar_turno(self):
+        # Cola FIFO: quien llega mientras otros esperan se forma detrás, así
+        # una conexión devuelta no la gana siempre el hilo que no esperaba.
+        turno = object()
+        self._esperando.append(turno)
+        self.esperas += 1
+        inicio = time.monotonic()
+        try:
+            while self._esperando[0] is not turno or not self._disponible():
+                restante = inicio + self.espera - time.monotonic()
+                if restante <= 0:
+                    self.agotado += 1
+                    raise PoolAgotado(
+                        f'No hay conexiones libres en el pool ({self.tamano}) tras {self.espera} s'
+                    )
+                self._condicion.wait(restante)
+        finally:
+            self._esperando.remove(turno)
+            self.tiempo_espera += time.monotonic() - inicio
+            self._condicion.notify_all()
+
+    def obtener(self, conectar):
+        # Devuelve (conexion, nueva). Las libres se toman en orden LIFO para
+        # reutilizar las más recientes y dejar envejecer las demás.
+        while True:
+            with self._condicion:
+                if self._esperando or not self._disponible():
+                    self._esperar_turno()
+                if self._libres:
+                    conexion, creada_en, devuelta_en = self._libres.pop()
+                else:
+                    self.abiertas += 1
+                    conexion = None
+                self.max_en_uso = max(self.max_en_uso, self.abiertas - len(self._libres))
+
+            if conexion is None:
+                try:
+                    conexion = conectar()
+                except Exception:
+                    with self._condicion:
+                        self.abiertas -= 1
+                        self._condicion.notify_all()
+                    raise
+                with self._condicion:
+                    self.fallos += 1
+                    self._creadas[id(conexion)] = time.monotonic()
+                return conexion, True
+
+            if self._sana(conexion, creada_en, devuelta_en):
+                with self._condicion:
+                    self.aciertos += 1
+                return conexion, False
+            self.descartar(conexion)
+
+    def _sana(self, conexion, creada_en, devuelta_en):
+        ahora = time.monotonic()
+        if ahora - creada_en > self.reciclar:
+            with self._condicion:
+                self.recicladas += 1
+            return False
+        if ahora - devuelta_en > self.ping_tras:
+            try:
+                conexion.ping(reconnect=False)
+            except Exception:
+                with self._condicion:
+                    self.descartadas += 1
+                return False
+        return True
+
+    def devolver(self, conexion):
+        with self._condicion:
+            self._libres.append((conexion, self._creadas[id(conexion)], time.monotonic()))
+            self._condicion.notify_all()
+
+    def descartar(self, conexion):
+        try:
+            conexion.close()
+        except Exception:
+            pass
+        with self._condicion:
+            self._creadas.pop(id(conexion), None)
+            self.abiertas -= 1
+            self._condicion.notify_all()
+
+    def estadisticas(self):
+        with self._condicion:
+            return {
+                'tamano': self.tamano,
+                'abiertas': self.abiertas,
+                'en_uso': self.abiertas - len(self._libres),
+                'libres': len(self._libres),
+                'max_en_uso': self.max_en_uso,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'esperas': self.esperas,
+                'tiempo_espera_ms': round(self.tiempo_espera * 1000, 1),
+                'agotado': self.agotado,
+                'recicladas': self.recicladas,
+                'descartadas': self.descartadas,
+            }
+
+
+def obtener_pool(alias, settings_dict):
+    clave = (alias, settings_dict['HOST'], settings_dict['PORT'], settings_dict['NAME'], settings_dict['USER'])
+    with _candado_pools:
+        if clave not in _pools:
+            opciones = settings_dict.get('POOL', {})
+            _pools[clave] = PoolConexiones(
+                tamano=opciones.get('TAMANO', 10),
+                espera=opciones.get('ESPERA', 5),
+                ping_tras=opciones.get('PING_TRAS', 30),
+                reciclar=opciones.get('RECICLAR', 1800),
+            )
+        return _pools[clave]
+
+
+class DatabaseWrapper(mysql.DatabaseWrapper):
+    _reutilizada = False
+
+    @property
+    def pool(self):
+        return obtener_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        conexion, nueva = self.pool.obtener(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        self._reutilizada = not nueva
+        return conexion
+
+    def init_connection_state(self):
+        # Las variables de sesión (SQL_AUTO_IS_NULL, nivel de aislamiento) se
+        # conservan en una conexión reutilizada; solo se fijan al abrirla.
+        if not self._reutilizada:
+            super().init_connection_state()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        conexion = self.connection
+        # Dentro de un atomic Django conserva la referencia a la conexión, así
+        # que no puede volver al pool; tampoco una que dio errores y ya no responde.
+        if self.in_atomic_block or (self.errors_occurred and not self.is_usable()):
+            self.pool.descartar(conexion)
+            return
+        try:
+            if not conexion.get_autocommit():
+                conexion.rollback()
+        except Exception:
+            self.pool.descartar(conexion)
+            return
+        self.pool.devolver(conexion)
@@ -27,6 +27,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
 import os
+import tempfile
 SECRET_KEY = os.environ.get('SECRET_KEY', 'una-clave-temporal-para-desarrollo')
 
 # SECURITY WARNING: don't run with debug turned on in production!
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'registro.instrumentacion.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -58,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'registro.replicas.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'Inscripciones.urls'
@@ -86,7 +89,9 @@ WSGI_APPLICATION = 'Inscripciones.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        # Inscripciones.mysql_pool reutiliza conexiones entre peticiones; con
+        # DB_ENGINE=django.db.backends.mysql se vuelve a una conexión por petición.
+        'ENGINE': os.environ.get('DB_ENGINE', 'Inscripciones.mysql_pool'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
@@ -94,10 +99,171 @@ DATABASES = {
         'PORT': os.environ.get('DB_PORT', '3306'),
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        }
+        },
+        # Conexiones por proceso (TAMANO), segundos que se espera una libre
+        # (ESPERA), inactividad tras la que se verifica con ping (PING_TRAS) y
+        # edad máxima de una conexión antes de reemplazarla (RECICLAR).
+        'POOL': {
+            'TAMANO': int(os.environ.get('DB_POOL_TAMANO', '10')),
+            'ESPERA': float(os.environ.get('DB_POOL_ESPERA', '5')),
+            'PING_TRAS': float(os.environ.get('DB_POOL_PING_TRAS', '30')),
+            'RECICLAR': float(os.environ.get('DB_POOL_RECICLAR', '1800')),
+        },
+    }
+}
+
+# Réplica de solo lectura para las peticiones GET (ver registro/replicas.py).
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ.get('DB_REPLICA_HOST'),
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'USER': os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'TEST': {'MIRROR': 'default'},
     }
+
+# Sin MySQL: primaria y réplica como dos archivos SQLite en DB_SQLITE_DIR. La
+# "réplica" no recibe los cambios, lo que deja ver qué lecturas se fijan a la
+# primaria (migrar ambas con manage.py migrate --database replica). En las
+# pruebas también son dos bases distintas (sin MIRROR), como una réplica atrasada.
+if os.environ.get('DB_SQLITE_DIR'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(os.environ['DB_SQLITE_DIR'], 'default.sqlite3'),
+        },
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(os.environ['DB_SQLITE_DIR'], 'replica.sqlite3'),
+        },
+    }
+
+DATABASE_ROUTERS = ['registro.replicas.EnrutadorReplica']
+
+# Segundos que un cliente (cookie) o alumno (caché) que acaba de escribir
+# sigue leyendo de la primaria. El fijado por alumno necesita una caché
+# compartida entre workers para cubrir peticiones de otros clientes.
+REPLICA_FIJAR = int(os.environ.get('REPLICA_FIJAR', '10'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Con varios workers conviene un backend compartido (memcached, redis o base de
+# datos) para que todos vean la misma versión del catálogo; con LocMemCache cada
+# worker solo ve sus propias invalidaciones y CATALOGO_TTL acota el atraso.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+    # Solicitudes PDF ya generadas, en disco para compartirlas entre workers.
+    'pdf': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'inscripciones_pdf')),
+        'TIMEOUT': int(os.environ.get('PDF_CACHE_TTL', '86400')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('PDF_CACHE_MAX', '5000')),
+        },
+    },
 }
 
+CATALOGO_TTL = float(os.environ.get('CATALOGO_TTL', '2'))
+
+# Índice en memoria para buscar alumnos por nombre o número de control. Cada
+# worker reconstruye el suyo cuando cambia la versión guardada en la caché; con
+# una caché por proceso (LocMem) los cambios solo se ven al vencer el TTL
+# (ver registro.W001).
+BUSQUEDA_TTL = float(os.environ.get('BUSQUEDA_TTL', '300'))
+
+# Control de admisión de registrar_inscripcion (ver registro/admision.py):
+# peticiones simultáneas, admisiones por segundo (0 = sin límite), segundos de
+# espera antes de responder 503 y TTL de un lugar ocupado. ADMISION_PRESUPUESTO
+# son los segundos desde que llega la petición hasta los que puede esperar un
+# lugar: el timeout de gunicorn (30 por omisión) menos lo que tarda el registro.
+ADMISION_CONCURRENCIA = int(os.environ.get('ADMISION_CONCURRENCIA', '8'))
+ADMISION_TASA = int(os.environ.get('ADMISION_TASA', '0'))
+ADMISION_ESPERA = float(os.environ.get('ADMISION_ESPERA', '2'))
+ADMISION_TTL = int(os.environ.get('ADMISION_TTL', '60'))
+ADMISION_PRESUPUESTO = float(os.environ.get('ADMISION_PRESUPUESTO', '25'))
+
+# Idempotency-Key en registrar_inscripcion (ver registro/idempotencia.py):
+# segundos que se guarda una respuesta, que un duplicado espera a la original
+# y que dura el bloqueo de una solicitud en curso.
+IDEMPOTENCIA_TTL = int(os.environ.get('IDEMPOTENCIA_TTL', '86400'))
+IDEMPOTENCIA_ESPERA = float(os.environ.get('IDEMPOTENCIA_ESPERA', '10'))
+IDEMPOTENCIA_BLOQUEO = int(os.environ.get('IDEMPOTENCIA_BLOQUEO', '60'))
+
+# Peticiones más lentas que esto se registran con su SQL (ver registro/instrumentacion.py).
+PETICION_LENTA_MS = float(os.environ.get('PETICION_LENTA_MS', '500'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'pythonjsonlogger.jsonlogger.JsonFormatter',
+            'fmt': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'consola_json': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'registro.peticiones': {
+            'handlers': ['consola_json'],
+            'level': os.environ.get('PETICIONES_LOG_NIVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Vistas de solo lectura asíncronas; asgi.py lo activa por defecto.
+API_ASYNC = os.environ.get('API_ASYNC', '0') == '1'
+
+# Stream SSE de cupos (cupos-en-vivo, solo ASGI): segundos entre revisiones
+# de la versión del catálogo, entre latidos, y milisegundos de reconexión.
+CUPOS_SSE_INTERVALO = float(os.environ.get('CUPOS_SSE_INTERVALO', '0.5'))
+CUPOS_SSE_LATIDO = float(os.environ.get('CUPOS_SSE_LATIDO', '15'))
+CUPOS_SSE_REINTENTO = int(os.environ.get('CUPOS_SSE_REINTENTO', '3000'))
+
+# Fracciones del contador de cupo de cada curso (ver registro/cupos.py); 1
+# usa directamente Especialidad.cantidad y Taller.cantidad. Al cambiarlo hay
+# que correr manage.py fraccionar_cupos. La mejora con varios workers no se
+# ha medido en MySQL: antes de subirlo, compare con manage.py bench_cupos
+# contra la base de producción (o una copia).
+CUPOS_FRACCIONES = int(os.environ.get('CUPOS_FRACCIONES', '1'))
+
+# Ventana de preferencias (registrar-preferencias; fechas ISO 8601, vacías =
+# cerrada) y orden de prioridad al asignarlas: 'sorteo' (hash del número de
+# control con PREFERENCIAS_SEMILLA) o 'fecha' (orden de registro).
+PREFERENCIAS_INICIO = os.environ.get('PREFERENCIAS_INICIO', '')
+PREFERENCIAS_FIN = os.environ.get('PREFERENCIAS_FIN', '')
+PREFERENCIAS_PRIORIDAD = os.environ.get('PREFERENCIAS_PRIORIDAD', 'sorteo')
+PREFERENCIAS_SEMILLA = os.environ.get('PREFERENCIAS_SEMILLA', '')
+
+# Alumnos por sección al repartir un semestre con manage.py asignar_grupos.
+GRUPO_TAMANO_MAXIMO = int(os.environ.get('GRUPO_TAMANO_MAXIMO', '35'))
+
+# Filas por consulta al exportar fichas a CSV/XLSX.
+EXPORTACION_BLOQUE = int(os.environ.get('EXPORTACION_BLOQUE', '2000'))
+
+# 'plantilla' dibuja solo los datos del alumno sobre una página maquetada una
+# vez por proceso; 'platypus' maqueta el documento completo en cada solicitud.
+PDF_MODO = os.environ.get('PDF_MODO', 'plantilla')
+
+# Páginas máximas del PDF combinado de pdf-grupo (unos 7 KiB de memoria por
+# página hasta cerrarlo); grupos más grandes se piden como ZIP.
+PDF_COMBINADO_MAXIMO = int(os.environ.get('PDF_COMBINADO_MAXIMO', '1000'))
+
+# Procesos para renderizar las exportaciones en ZIP por grupo: un pool de este
+# tamaño por worker, compartido por sus exportaciones (ver registro/exportar_pdf.py).
+PDF_PROCESOS = int(os.environ.get('PDF_PROCESOS', min(4, os.cpu_count() or 1)))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -158,12 +324,19 @@ CORS_ALLOW_METHODS = [
     'PUT',
 ]
 
+CORS_EXPOSE_HEADERS = [
+    'Idempotent-Replayed',
+    'Retry-After',
+    'Server-Timing',
+]
+
 CORS_ALLOW_HEADERS = [
     'accept',
     'accept-encoding',
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
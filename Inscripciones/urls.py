@@ -16,8 +16,10 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from registro.metricas import metricas
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('registro.urls')),
+    path('metrics', metricas, name='metricas'),
 ]
\ No newline at end of file
@@ -0,0 +1,21 @@
+import glob
+import os
+
+# gunicorn lee este archivo por defecto al arrancar desde la raíz del proyecto.
+# Con PROMETHEUS_MULTIPROC_DIR cada worker escribe sus métricas en ese
+# directorio (ver registro/metricas.py): se vacía al iniciar el maestro y se
+# marcan como muertos los workers que terminan para no sumar sus medidores.
+
+
+def on_starting(server):
+    directorio = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+        for archivo in glob.glob(os.path.join(directorio, '*.db')):
+            os.remove(archivo)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
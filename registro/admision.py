@@ -0,0 +1,152 @@
+import functools
+import math
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+from .instrumentacion import inicio_peticion
+
+# Control de admisión para las vistas de escritura. Cada petición admitida
+# ocupa uno de ADMISION_CONCURRENCIA lugares (claves en la caché con TTL, para
+# que un worker caído no deje lugares tomados) y, si ADMISION_TASA > 0, cuenta
+# contra un máximo de admisiones por segundo. Quien no encuentra lugar, o llega
+# mientras otros esperan, toma un turno y espera; si no entra, recibe un 503
+# con Retry-After y su posición en la fila.
+# La fila es aproximadamente FIFO: solo los primeros ADMISION_CONCURRENCIA
+# turnos pendientes intentan tomar un lugar, así que un recién llegado no se
+# adelanta a quien ya esperaba, pero entre esos primeros turnos entra quien
+# encuentre el lugar libre antes. Con workers síncronos la espera ocupa al
+# worker (time.sleep); por eso dura a lo más ADMISION_ESPERA y nunca más de lo
+# que le queda a la petición de ADMISION_PRESUPUESTO.
+# Con varios workers la caché debe ser compartida para que el límite sea global.
+
+VENTANA_TASA = 10
+
+
+def _incrementar(clave, delta=1, timeout=None):
+    try:
+        return cache.incr(clave, delta)
+    except ValueError:
+        cache.add(clave, 0, timeout)
+        return cache.incr(clave, delta)
+
+
+def _tomar_lugar():
+    ficha = uuid.uuid4().hex
+    lugares = list(range(settings.ADMISION_CONCURRENCIA))
+    random.shuffle(lugares)
+    for lugar in lugares:
+        clave = f'admision:lugar:{lugar}'
+        if cache.add(clave, ficha, settings.ADMISION_TTL):
+            return clave, ficha
+    return None
+
+
+def _admitir():
+    lugar = _tomar_lugar()
+    if lugar is None:
+        return None
+    segundo = int(time.time())
+    if settings.ADMISION_TASA and _incrementar(f'admision:tasa:{segundo}', timeout=5) > settings.ADMISION_TASA:
+        _liberar(lugar)
+        return None
+    _incrementar(f'admision:admitidas:{segundo}', timeout=VENTANA_TASA * 2)
+    return lugar
+
+
+def _liberar(lugar):
+    clave, ficha = lugar
+    # Si el TTL venció y otro tomó el lugar, no se le quita.
+    if cache.get(clave) == ficha:
+        cache.delete(clave)
+
+
+def _hay_fila():
+    return (cache.get('admision:esperando') or 0) > 0
+
+
+def _al_frente(turno):
+    # atendidos cuenta los turnos que ya salieron de la fila (admitidos o
+    # rechazados); un turno que se quedó atrás por un worker caído deja de
+    # contar cuando los siguientes agotan su espera y salen.
+    return turno - (cache.get('admision:atendidos') or 0) <= settings.ADMISION_CONCURRENCIA
+
+
+def _limite_espera():
+    ahora = time.perf_counter()
+    inicio = inicio_peticion() or ahora
+    return min(ahora + settings.ADMISION_ESPERA, inicio + settings.ADMISION_PRESUPUESTO)
+
+
+def _esperar(limite):
+    turno = _incrementar('admision:turno')
+    _incrementar('admision:esperando')
+    pausa = 0.02
+    try:
+        while time.perf_counter() < limite:
+            time.sleep(max(0, min(pausa, limite - time.perf_counter())) * random.uniform(0.5, 1))
+            if _al_frente(turno):
+                lugar = _admitir()
+                if lugar is not None:
+                    return lugar, 0
+            pausa = min(pausa * 2, 0.25)
+        return None, max(1, turno - (cache.get('admision:atendidos') or 0))
+    finally:
+        _incrementar('admision:atendidos')
+        _incrementar('admision:esperando', -1)
+
+
+def tasa_admision():
+    segundo = int(time.time())
+    claves = [f'admision:admitidas:{segundo - i}' for i in range(1, VENTANA_TASA + 1)]
+    return sum(cache.get_many(claves).values()) / VENTANA_TASA
+
+
+def _rechazo(posicion):
+    tasa = tasa_admision()
+    # Con jitter, para que los rechazados juntos no vuelvan todos a la vez.
+    base = posicion / tasa if tasa else settings.ADMISION_ESPERA
+    reintentar = math.ceil(base * random.uniform(1, 2))
+    reintentar = min(max(1, reintentar), 60)
+    _incrementar('admision:rechazadas')
+    response = JsonResponse({
+        'success': False,
+        'error': 'Hay muchas solicitudes en este momento, intenta de nuevo en unos segundos',
+        'posicion': posicion,
+        'reintentar_en': reintentar
+    }, status=503)
+    response['Retry-After'] = str(reintentar)
+    return response
+
+
+def admision_controlada(vista):
+    # Va por fuera de transaction.atomic: la espera no debe retener una
+    # transacción ni una conexión.
+    @functools.wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        lugar = None if _hay_fila() else _admitir()
+        if lugar is None:
+            lugar, posicion = _esperar(_limite_espera())
+            if lugar is None:
+                return _rechazo(posicion)
+        try:
+            return vista(request, *args, **kwargs)
+        finally:
+            _liberar(lugar)
+    return envoltura
+
+
+def estadisticas():
+    claves = [f'admision:lugar:{lugar}' for lugar in range(settings.ADMISION_CONCURRENCIA)]
+    return {
+        'concurrencia': settings.ADMISION_CONCURRENCIA,
+        'tasa_maxima': settings.ADMISION_TASA,
+        'en_curso': len(cache.get_many(claves)),
+        'esperando': max(0, cache.get('admision:esperando') or 0),
+        'admitidas_por_segundo': tasa_admision(),
+        'rechazadas': cache.get('admision:rechazadas') or 0,
+    }
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RegistroConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'registro'
+
+    def ready(self):
+        # Conecta la medición de consultas antes de que se abra cualquier conexión.
+        from . import checks, instrumentacion
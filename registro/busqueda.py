@@ -0,0 +1,140 @@
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+CLAVE_VERSION = 'busqueda:version'
+LONGITUD_CLAVE = 160
+
+_candado = threading.Lock()
+_indice = None
+
+
+def normalizar(texto):
+    descompuesto = unicodedata.normalize('NFKD', str(texto))
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.lower().split())
+
+
+def clave_busqueda(nombres, apellido_paterno, apellido_materno):
+    return normalizar(f'{apellido_paterno} {apellido_materno} {nombres}')[:LONGITUD_CLAVE]
+
+
+def version_actual():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, time.time_ns(), timeout=None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def invalidar():
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.add(CLAVE_VERSION, time.time_ns(), timeout=None)
+
+
+def _construir(version):
+    from .models import Alumno
+
+    # Cada palabra de la clave y el número de control quedan como una entrada
+    # (token, posición, número de control); ordenadas, un prefijo es un rango.
+    entradas = []
+    claves = {}
+    for numero_control, clave in Alumno.objects.values_list('numero_control', 'clave_busqueda').iterator(chunk_size=5000):
+        claves[numero_control] = clave
+        entradas.append((str(numero_control), 0, numero_control))
+        for posicion, palabra in enumerate(clave.split()):
+            entradas.append((palabra, posicion, numero_control))
+    entradas.sort()
+
+    return {
+        'version': version,
+        'construido_en': time.monotonic(),
+        'tokens': [token for token, _, _ in entradas],
+        'entradas': entradas,
+        'claves': claves,
+    }
+
+
+def _vigente(indice, version):
+    return (
+        indice is not None
+        and indice['version'] == version
+        and time.monotonic() - indice['construido_en'] < settings.BUSQUEDA_TTL
+    )
+
+
+def obtener_indice():
+    global _indice
+
+    version = version_actual()
+    indice = _indice
+    if _vigente(indice, version):
+        return indice
+
+    with _candado:
+        if not _vigente(_indice, version):
+            _indice = _construir(version)
+        return _indice
+
+
+def buscar(texto, limite=20):
+    terminos = normalizar(texto).split()
+    if not terminos:
+        return []
+
+    indice = obtener_indice()
+    tokens = indice['tokens']
+    entradas = indice['entradas']
+
+    puntajes = None
+    for termino in terminos:
+        encontrados = {}
+        i = bisect_left(tokens, termino)
+        while i < len(tokens) and tokens[i].startswith(termino):
+            token, posicion, numero_control = entradas[i]
+            # Palabra completa pesa más que prefijo, y el apellido paterno (o
+            # el número de control) más que el resto del nombre.
+            puntaje = (3 if token == termino else 1) + (2 if posicion == 0 else 0)
+            if puntaje > encontrados.get(numero_control, 0):
+                encontrados[numero_control] = puntaje
+            i += 1
+
+        if puntajes is None:
+            puntajes = encontrados
+        else:
+            puntajes = {
+                numero_control: puntaje + encontrados[numero_control]
+                for numero_control, puntaje in puntajes.items() if numero_control in encontrados
+            }
+        if not puntajes:
+            return []
+
+    claves = indice['claves']
+    ordenados = sorted(puntajes, key=lambda numero_control: (-puntajes[numero_control], claves[numero_control]))
+    return ordenados if limite is None else ordenados[:limite]
+
+
+def condicion(texto, prefijo=''):
+    # Las mismas coincidencias que buscar() (cada término es prefijo de una
+    # palabra de la clave o del número de control), como filtro SQL sobre
+    # clave_busqueda: sirve para filtrar consultas sin pasar una lista de ids.
+    # Devuelve None si el texto no tiene términos.
+    terminos = normalizar(texto).split()
+    if not terminos:
+        return None
+
+    condicion = Q()
+    for termino in terminos:
+        condicion &= (
+            Q(**{f'{prefijo}clave_busqueda__startswith': termino})
+            | Q(**{f'{prefijo}clave_busqueda__contains': f' {termino}'})
+            | Q(**{f'{prefijo}numero_control__startswith': termino})
+        )
+    return condicion
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+CLAVE_VERSION = 'catalogo:version'
+
+_candado = threading.Lock()
+_instantanea = None
+
+
+def version_actual():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        # Se siembra con la hora para que una clave desalojada nunca regrese
+        # a un número de versión que algún worker ya tenga en memoria.
+        cache.add(CLAVE_VERSION, time.time_ns(), timeout=None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def invalidar():
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.add(CLAVE_VERSION, time.time_ns(), timeout=None)
+
+
+def _cargar(version):
+    from . import cupos
+    from .models import Especialidad, Taller
+    from .serializadores import CAMPOS_ESPECIALIDAD, CAMPOS_TALLER, codificar, especialidad, taller
+
+    # Siempre de la primaria: la instantánea queda guardada con la versión
+    # nueva, y una réplica atrasada dejaría contadores viejos CATALOGO_TTL.
+    filas_especialidad = Especialidad.objects.using('default').values_list(*CAMPOS_ESPECIALIDAD)
+    filas_taller = Taller.objects.using('default').values_list(*CAMPOS_TALLER)
+    if cupos.fraccionado():
+        filas_especialidad = cupos.con_fracciones(Especialidad, filas_especialidad)
+        filas_taller = cupos.con_fracciones(Taller, filas_taller)
+
+    especialidades = [especialidad(fila, Especialidad.CUPO_MAXIMO) for fila in filas_especialidad]
+    talleres = [taller(fila, Taller.CUPO_MAXIMO) for fila in filas_taller]
+
+    return {
+        'version': version,
+        'cargada_en': time.monotonic(),
+        'especialidades': especialidades,
+        'talleres': talleres,
+        'json_especialidades': codificar(
+            [esp for esp in especialidades if esp['fichas_disponibles'] > 0]
+        ),
+        'json_talleres': codificar(
+            [t for t in talleres if t['fichas_disponibles'] > 0]
+        ),
+    }
+
+
+def _vigente(instantanea, version):
+    return (
+        instantanea is not None
+        and instantanea['version'] == version
+        and time.monotonic() - instantanea['cargada_en'] < settings.CATALOGO_TTL
+    )
+
+
+def ultima():
+    # La instantánea que ya tiene este proceso, sin revisar versión ni TTL.
+    return _instantanea
+
+
+def obtener():
+    global _instantanea
+
+    version = version_actual()
+    instantanea = _instantanea
+    if _vigente(instantanea, version):
+        return instantanea
+
+    with _candado:
+        if not _vigente(_instantanea, version):
+            _instantanea = _cargar(version)
+        return _instantanea
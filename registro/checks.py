@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+CACHES_LOCALES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def cache_compartida(app_configs, **kwargs):
+    # Idempotency-Key, el control de admisión, el fijado a la primaria y las
+    # versiones del catálogo y del índice de búsqueda se coordinan en la caché
+    # 'default'; con una caché por proceso cada worker lleva su propia cuenta.
+    if settings.CACHES['default']['BACKEND'] in CACHES_LOCALES and not settings.DEBUG:
+        return [Warning(
+            'La caché default no se comparte entre procesos.',
+            hint=(
+                'Con varios workers, dos reintentos con la misma Idempotency-Key pueden '
+                'ejecutarse ambos, ADMISION_CONCURRENCIA se aplica por worker y un alumno '
+                'nuevo o importado no aparece en la búsqueda de los demás workers hasta '
+                'que vence BUSQUEDA_TTL. Configure '
+                'CACHE_BACKEND/CACHE_LOCATION con memcached, redis o la base de datos.'
+            ),
+            id='registro.W001',
+        )]
+    return []
@@ -0,0 +1,214 @@
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from . import catalogo
+
+# Con CUPOS_FRACCIONES > 1 el contador de cada curso se reparte en varias filas
+# de FraccionCupo, cada una con su parte del cupo. Una reserva incrementa una
+# fracción al azar (UPDATE condicional contra su capacidad) en lugar de la fila
+# del curso, así las reservas simultáneas de un curso popular no esperan todas
+# el mismo bloqueo. La suma de capacidades es el cupo, así que nunca se
+# sobrevende; la ocupación se lee sumando las fracciones. Especialidad.cantidad
+# y Taller.cantidad solo se actualizan al reconciliar.
+
+
+class _SinLugar(Exception):
+    pass
+
+
+def fraccionado():
+    return settings.CUPOS_FRACCIONES > 1
+
+
+def _fracciones(modelo, pk):
+    from .models import FraccionCupo
+    return FraccionCupo.objects.filter(tipo=modelo._meta.model_name, curso=pk)
+
+
+def _repartir(total, partes):
+    base, sobrantes = divmod(total, partes)
+    return [base + (1 if i < sobrantes else 0) for i in range(partes)]
+
+
+def _llenar(capacidades, cantidad):
+    llenas = []
+    for capacidad in capacidades:
+        llenas.append(min(capacidad, cantidad))
+        cantidad -= llenas[-1]
+    # Lo que exceda el cupo (un curso ya sobrevendido) queda en la primera.
+    llenas[0] += cantidad
+    return llenas
+
+
+def crear_fracciones(modelo, pk, cantidad, fracciones=None):
+    from .models import FraccionCupo
+
+    fracciones = fracciones or settings.CUPOS_FRACCIONES
+    capacidades = _repartir(modelo.CUPO_MAXIMO, fracciones)
+    FraccionCupo.objects.bulk_create([
+        FraccionCupo(tipo=modelo._meta.model_name, curso=pk, indice=indice, cantidad=ocupados, capacidad=capacidad)
+        for indice, (capacidad, ocupados) in enumerate(zip(capacidades, _llenar(capacidades, cantidad)))
+    ], ignore_conflicts=True)
+
+
+def _reservar_fraccionado(modelo, pk, lugares):
+    fracciones = _fracciones(modelo, pk)
+    if lugares == 1:
+        indice = random.randrange(settings.CUPOS_FRACCIONES)
+        if fracciones.filter(indice=indice, cantidad__lt=F('capacidad')).update(cantidad=F('cantidad') + 1):
+            return True
+
+    libres = list(fracciones.values_list('indice', 'cantidad', 'capacidad'))
+    if not libres:
+        # Curso sin fracciones todavía (creado después de fraccionar_cupos):
+        # se crean a partir de su contador y se reintenta.
+        cantidad = modelo.objects.filter(pk=pk).values_list('cantidad', flat=True).first()
+        if cantidad is None:
+            return False
+        crear_fracciones(modelo, pk, cantidad)
+        libres = list(fracciones.values_list('indice', 'cantidad', 'capacidad'))
+
+    libres = [(indice, capacidad - cantidad) for indice, cantidad, capacidad in libres if cantidad < capacidad]
+    random.shuffle(libres)
+    if sum(disponibles for _, disponibles in libres) < lugares:
+        return False
+
+    # Varias fracciones pueden cubrir una reserva de varios lugares (lotes);
+    # si otra reserva gana alguna en medio se deshacen las ya tomadas.
+    try:
+        with transaction.atomic():
+            restantes = lugares
+            for indice, disponibles in libres:
+                tomados = min(disponibles, restantes)
+                while tomados and not fracciones.filter(
+                    indice=indice, cantidad__lte=F('capacidad') - tomados
+                ).update(cantidad=F('cantidad') + tomados):
+                    tomados -= 1
+                restantes -= tomados
+                if not restantes:
+                    return True
+            raise _SinLugar
+    except _SinLugar:
+        return False
+
+
+def reservar_lugar(modelo, pk, lugares=1):
+    if fraccionado():
+        return _reservar_fraccionado(modelo, pk, lugares)
+    actualizados = modelo.objects.filter(
+        pk=pk, cantidad__lte=modelo.CUPO_MAXIMO - lugares
+    ).update(cantidad=F('cantidad') + lugares)
+    return actualizados == 1
+
+
+def ocupados(modelo, pks=None):
+    from .models import FraccionCupo
+
+    # De la primaria, aunque se llame dentro de un GET enrutado a la réplica.
+    cursos = modelo.objects.using('default')
+    if pks is not None:
+        cursos = cursos.filter(pk__in=pks)
+    resultado = dict(cursos.values_list('pk', 'cantidad'))
+    if fraccionado():
+        fracciones = FraccionCupo.objects.using('default').filter(tipo=modelo._meta.model_name, curso__in=resultado)
+        resultado.update(fracciones.values_list('curso').annotate(total=Sum('cantidad')).order_by())
+    return resultado
+
+
+def cantidad_actual(curso):
+    # Con fracciones la columna cantidad solo se actualiza al reconciliar.
+    if not fraccionado() or curso.pk is None:
+        return curso.cantidad
+    return ocupados(type(curso), [curso.pk]).get(curso.pk, curso.cantidad)
+
+
+def con_fracciones(modelo, filas):
+    # Reemplaza la cantidad (último campo de cada fila) por la suma de las fracciones.
+    filas = list(filas)
+    totales = ocupados(modelo, [fila[0] for fila in filas])
+    return [fila[:-1] + (totales[fila[0]],) for fila in filas]
+
+
+def disponibles(modelo, cursos):
+    if not fraccionado():
+        return {pk: curso.fichas_disponibles() for pk, curso in cursos.items()}
+    return {pk: modelo.CUPO_MAXIMO - cantidad for pk, cantidad in ocupados(modelo, list(cursos)).items()}
+
+
+def contar_fichas(modelo, pks=None):
+    # Un solo GROUP BY con LEFT JOIN: los cursos sin fichas cuentan 0.
+    cursos = modelo.objects.all()
+    if pks is not None:
+        cursos = cursos.filter(pk__in=pks)
+    conteos = {
+        pk: (nombre, cantidad, reales)
+        for pk, nombre, cantidad, reales in cursos.values_list('pk', 'nombre', 'cantidad').annotate(
+            reales=Count('fichainscripcion')
+        ).order_by()
+    }
+    if fraccionado():
+        totales = ocupados(modelo, list(conteos))
+        conteos = {pk: (nombre, totales[pk], reales) for pk, (nombre, _, reales) in conteos.items()}
+    return conteos
+
+
+def _reparar_fracciones(modelo, pk, reales):
+    # Se corrigen las filas existentes en su lugar (sin borrarlas) para que una
+    # reserva que esperaba el bloqueo vuelva a evaluar su condición sobre ellas.
+    actuales = sorted(_fracciones(modelo, pk).values_list('indice', 'capacidad'))
+    if not actuales:
+        crear_fracciones(modelo, pk, reales)
+        return
+    for (indice, _), cantidad in zip(actuales, _llenar([capacidad for _, capacidad in actuales], reales)):
+        _fracciones(modelo, pk).filter(indice=indice).update(cantidad=cantidad)
+
+
+def reconciliar(modelo, reparar=True):
+    # El conteo inicial no bloquea nada. Solo los cursos con diferencia se
+    # bloquean (select_for_update, junto con sus fracciones) y se vuelven a
+    # contar antes de corregirlos: mientras dura el bloqueo ninguna ficha nueva
+    # puede apartar lugar en ellos.
+    from .models import FraccionCupo
+
+    diferencias = [
+        pk for pk, (_, cantidad, reales) in contar_fichas(modelo).items() if cantidad != reales
+    ]
+
+    resultado = []
+    if diferencias:
+        with transaction.atomic():
+            if reparar:
+                list(modelo.objects.select_for_update().filter(pk__in=diferencias).values_list('pk'))
+                if fraccionado():
+                    list(FraccionCupo.objects.select_for_update().filter(
+                        tipo=modelo._meta.model_name, curso__in=diferencias
+                    ).values_list('pk'))
+            conteos = contar_fichas(modelo, diferencias)
+
+            for pk, (nombre, cantidad, reales) in sorted(conteos.items()):
+                if cantidad == reales:
+                    continue
+                if reparar:
+                    modelo.objects.filter(pk=pk).update(cantidad=reales)
+                    if fraccionado():
+                        _reparar_fracciones(modelo, pk, reales)
+                resultado.append({
+                    'id': pk,
+                    'nombre': nombre,
+                    'cantidad': cantidad,
+                    'reales': reales,
+                    'sobrecupo': max(0, reales - modelo.CUPO_MAXIMO),
+                })
+
+            if reparar and resultado:
+                transaction.on_commit(catalogo.invalidar)
+
+    if reparar and fraccionado():
+        # Con fracciones el contador del curso no se toca al reservar; aquí se
+        # le copia la suma para que el admin y las validaciones previas lo vean.
+        for pk, total in ocupados(modelo).items():
+            modelo.objects.filter(pk=pk).exclude(cantidad=total).update(cantidad=total)
+    return resultado
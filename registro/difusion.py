@@ -0,0 +1,106 @@
+import asyncio
+import contextvars
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import catalogo
+from .serializadores import codificar
+
+# Difusión de cupos por Server-Sent Events. Una sola tarea por worker revisa
+# la versión del catálogo (la misma que invalidan las fichas al guardarse) y
+# publica la instantánea nueva; cada conexión compara contra la última que
+# envió y manda solo las cantidades que cambiaron. Un cliente lento no acumula
+# eventos: al despertar recibe la diferencia contra el estado más reciente.
+
+_estado = {'instantanea': None, 'cambio': None, 'suscriptores': 0, 'tarea': None}
+
+
+def _leer_catalogo():
+    try:
+        return catalogo.obtener()
+    finally:
+        # La tarea no pertenece a ninguna petición: nadie más cerraría la
+        # conexión que abra al recargar el catálogo.
+        connections.close_all()
+
+
+async def _vigilar():
+    try:
+        while _estado['suscriptores']:
+            instantanea = await sync_to_async(_leer_catalogo)()
+            if instantanea is not _estado['instantanea']:
+                _estado['instantanea'] = instantanea
+                cambio, _estado['cambio'] = _estado['cambio'], asyncio.Event()
+                cambio.set()
+            await asyncio.sleep(settings.CUPOS_SSE_INTERVALO)
+    finally:
+        _estado['tarea'] = None
+
+
+def _evento(nombre, data, version):
+    return b'event: %s\nid: %d\ndata: %s\n\n' % (nombre.encode(), version, codificar(data))
+
+
+def _completo(instantanea):
+    data = {'especialidades': instantanea['especialidades'], 'talleres': instantanea['talleres']}
+    return _evento('catalogo', data, instantanea['version'])
+
+
+def _cambios(anteriores, actuales, campo_id):
+    previos = {item[campo_id]: item['cantidad'] for item in anteriores}
+    if previos.keys() != {item[campo_id] for item in actuales}:
+        return None
+    return [
+        {campo_id: item[campo_id], 'cantidad': item['cantidad'], 'fichas_disponibles': item['fichas_disponibles']}
+        for item in actuales
+        if previos[item[campo_id]] != item['cantidad']
+    ]
+
+
+def _diferencia(enviada, actual):
+    especialidades = _cambios(enviada['especialidades'], actual['especialidades'], 'id_especialidad')
+    talleres = _cambios(enviada['talleres'], actual['talleres'], 'id_taller')
+    if especialidades is None or talleres is None:
+        # Se agregó o quitó un curso: se reenvía el catálogo completo.
+        return _completo(actual)
+    if not especialidades and not talleres:
+        return None
+    data = {'especialidades': especialidades, 'talleres': talleres}
+    return _evento('cupos', data, actual['version'])
+
+
+async def eventos():
+    _estado['suscriptores'] += 1
+    if _estado['cambio'] is None:
+        _estado['cambio'] = asyncio.Event()
+    if _estado['tarea'] is None:
+        # En un contexto vacío: la tarea sigue viva cuando termina la petición
+        # que la inició y no debe heredar su estado (réplica, instrumentación,
+        # ni el hilo de sync_to_async de esa petición).
+        _estado['tarea'] = contextvars.Context().run(asyncio.ensure_future, _vigilar())
+
+    try:
+        enviada = _estado['instantanea']
+        if enviada is None:
+            enviada = await sync_to_async(catalogo.obtener)()
+        yield b'retry: %d\n' % settings.CUPOS_SSE_REINTENTO
+        yield _completo(enviada)
+
+        while True:
+            cambio = _estado['cambio']
+            actual = _estado['instantanea']
+            if actual is not None and actual is not enviada:
+                mensaje = _diferencia(enviada, actual)
+                enviada = actual
+                if mensaje is not None:
+                    yield mensaje
+                continue
+            try:
+                await asyncio.wait_for(cambio.wait(), settings.CUPOS_SSE_LATIDO)
+            except asyncio.TimeoutError:
+                # Comentario SSE para que proxies y balanceadores no corten la conexión.
+                yield b': latido\n\n'
+    finally:
+        _estado['suscriptores'] -= 1
@@ -0,0 +1,131 @@
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+from .models import FichaInscripcion
+from .pdf import CAMPOS_SOLICITUD, datos_solicitud, dibujar_solicitud, nuevo_canvas, renderizar_solicitud_plantilla
+
+TAMANO_BLOQUE = 25
+
+# Un solo pool por proceso (worker de gunicorn o comando), creado la primera
+# vez que se necesita y compartido por todas las exportaciones: las peticiones
+# simultáneas no abren cada una sus propios procesos.
+_candado_pool = threading.Lock()
+_pool = None
+
+
+def filtrar_solicitudes(grupo='', especialidad='', semestre=''):
+    fichas = FichaInscripcion.objects.all()
+    if grupo:
+        fichas = fichas.filter(grupo_inscripcion=grupo)
+    if especialidad:
+        fichas = fichas.filter(especialidad__codigo=especialidad)
+    if semestre:
+        fichas = fichas.filter(semestre_inscripcion=semestre)
+    # values() sobre los campos relacionados hace los mismos JOIN que
+    # select_related, en una sola consulta y sin instanciar modelos.
+    return fichas.order_by(
+        'alumno__apellido_paterno', 'alumno__apellido_materno', 'alumno__nombres'
+    ).values(*CAMPOS_SOLICITUD)
+
+
+def _renderizar_bloque(bloque):
+    return [(datos['numero_control'], renderizar_solicitud_plantilla(datos)) for datos in bloque]
+
+
+def _bloques(filas):
+    datos = (datos_solicitud(fila) for fila in filas)
+    while True:
+        bloque = list(islice(datos, TAMANO_BLOQUE))
+        if not bloque:
+            return
+        yield bloque
+
+
+def _obtener_pool(procesos):
+    global _pool
+
+    with _candado_pool:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=procesos)
+        return _pool
+
+
+def _descartar_pool(pool):
+    global _pool
+
+    # El pool ya no sirve (murió uno de sus procesos): el siguiente uso crea uno nuevo.
+    with _candado_pool:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def renderizar_en_paralelo(filas, procesos):
+    if procesos <= 1:
+        for bloque in _bloques(filas):
+            yield from _renderizar_bloque(bloque)
+        return
+
+    # Solo hay `procesos * 2` bloques en vuelo por exportación, así la memoria
+    # no crece con el grupo.
+    pool = _obtener_pool(procesos)
+    pendientes = deque()
+    try:
+        for bloque in _bloques(filas):
+            pendientes.append(pool.submit(_renderizar_bloque, bloque))
+            if len(pendientes) >= procesos * 2:
+                yield from pendientes.popleft().result()
+        while pendientes:
+            yield from pendientes.popleft().result()
+    except BrokenProcessPool:
+        _descartar_pool(pool)
+        raise
+    finally:
+        # Si el cliente se desconecta, sus bloques pendientes no ocupan el pool.
+        for pendiente in pendientes:
+            pendiente.cancel()
+
+
+class _Salida:
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+def solicitudes_en_zip(filas, procesos):
+    salida = _Salida()
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_STORED) as archivo:
+        for numero_control, contenido in renderizar_en_paralelo(filas, procesos):
+            archivo.writestr(f'solicitud_reinscripcion_{numero_control}.pdf', contenido)
+            yield salida.vaciar()
+    yield salida.vaciar()
+
+
+def solicitudes_combinadas(filas, destino):
+    # Un solo canvas: la plantilla se define una vez como Form XObject y cada
+    # página solo agrega los textos del alumno. reportlab guarda las páginas
+    # hasta save(), así que la memoria crece con el grupo; la vista lo limita
+    # con PDF_COMBINADO_MAXIMO.
+    c = nuevo_canvas(destino)
+    paginas = 0
+    for fila in filas:
+        dibujar_solicitud(c, datos_solicitud(fila))
+        c.showPage()
+        paginas += 1
+    c.save()
+    return paginas
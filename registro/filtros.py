@@ -0,0 +1,31 @@
+from . import busqueda
+from .models import FichaInscripcion
+
+
+def validar_semestre(semestre):
+    # Vacío es "sin filtro"; cualquier otro valor debe ser un número.
+    if semestre and not str(semestre).isdigit():
+        raise ValueError('Semestre no válido')
+    return semestre
+
+
+def filtrar_fichas(search, grupo, semestre, especialidad):
+    validar_semestre(semestre)
+    fichas_query = FichaInscripcion.objects.all()
+
+    if search:
+        # Se filtra en la base (sin lista de ids) para no cortar los totales de
+        # la paginación ni armar un IN con miles de valores.
+        condicion = busqueda.condicion(search, prefijo='alumno__')
+        fichas_query = fichas_query.none() if condicion is None else fichas_query.filter(condicion)
+
+    if grupo:
+        fichas_query = fichas_query.filter(grupo_inscripcion__icontains=grupo)
+
+    if semestre:
+        fichas_query = fichas_query.filter(semestre_inscripcion=semestre)
+
+    if especialidad:
+        fichas_query = fichas_query.filter(especialidad__codigo=especialidad)
+
+    return fichas_query
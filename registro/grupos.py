@@ -0,0 +1,111 @@
+import math
+import string
+from collections import defaultdict
+
+from django.db import transaction
+
+# Un grupo se escribe semestre (un dígito) + código de especialidad (2
+# caracteres, '00' sin especialidad) + letra de sección opcional: '3PR', '3PRB',
+# '301', '2A'. Como antes de las secciones, en un grupo de 3 o más caracteres
+# el código son los dos últimos; la excepción es la forma con sección que
+# escribe asignar_grupos (4 caracteres terminados en letra de sección), donde
+# el código son los dos anteriores a la letra.
+SECCIONES = string.ascii_uppercase
+
+
+def partes_grupo(grupo):
+    grupo = str(grupo)
+    if len(grupo) == 4 and grupo[0].isdigit() and grupo[-1] in SECCIONES:
+        return grupo[0], grupo[1:3], grupo[3]
+    if len(grupo) >= 3:
+        return grupo[:-2], grupo[-2:], ''
+    return grupo[:1], '', grupo[1:]
+
+
+def codigo_especialidad(grupo):
+    return partes_grupo(grupo)[1] or None
+
+
+def _seccion_anterior(grupo):
+    letra = partes_grupo(grupo)[2]
+    return SECCIONES.index(letra) if letra in SECCIONES else None
+
+
+# Reparte tuplas (id, numero_control, grupo_anterior) en secciones de a lo más
+# `tamano` alumnos, con tamaños que difieren en uno como máximo. Los alumnos de
+# un mismo grupo anterior se mantienen juntos cuando caben, de preferencia en
+# la sección con su misma letra. Devuelve {id: índice de sección}.
+def repartir(alumnos, tamano):
+    if not alumnos:
+        return {}
+    secciones = math.ceil(len(alumnos) / tamano)
+    if secciones > len(SECCIONES):
+        raise ValueError(f'Se necesitan {secciones} secciones; el máximo es {len(SECCIONES)}')
+    base, sobrantes = divmod(len(alumnos), secciones)
+    libres = [base + (1 if i < sobrantes else 0) for i in range(secciones)]
+
+    cohortes = defaultdict(list)
+    for alumno in alumnos:
+        cohortes[alumno[2]].append(alumno)
+
+    asignacion = {}
+    for grupo_anterior, miembros in sorted(cohortes.items(), key=lambda c: (-len(c[1]), c[0])):
+        miembros.sort(key=lambda alumno: alumno[1])
+        preferida = _seccion_anterior(grupo_anterior)
+        while miembros:
+            if preferida is not None and preferida < secciones and libres[preferida] >= len(miembros):
+                seccion = preferida
+            else:
+                # La sección más justa donde cabe la cohorte completa; si no
+                # cabe en ninguna, se parte empezando por la de más lugar.
+                caben = [i for i in range(secciones) if libres[i] >= len(miembros)]
+                if caben:
+                    seccion = min(caben, key=lambda i: (libres[i], i))
+                else:
+                    seccion = max(range(secciones), key=lambda i: (libres[i], -i))
+            tomados, miembros = miembros[:libres[seccion]], miembros[libres[seccion]:]
+            libres[seccion] -= len(tomados)
+            for alumno in tomados:
+                asignacion[alumno[0]] = seccion
+    return asignacion
+
+
+def asignar_grupos(semestre, tamano):
+    from .models import FichaInscripcion
+
+    fichas = FichaInscripcion.objects.filter(semestre_inscripcion=semestre).values_list(
+        'id_inscripcion', 'alumno__numero_control', 'alumno__grupo_anterior',
+        'especialidad__codigo', 'grupo_inscripcion',
+    )
+
+    # Una ficha sin especialidad conserva el código de su grupo actual (el
+    # que le dio calcular_grupo_nuevo: '00', o el de su grupo anterior si ese
+    # código no tiene especialidad registrada).
+    por_especialidad = defaultdict(list)
+    actuales = {}
+    for pk, numero_control, grupo_anterior, codigo, grupo in fichas:
+        codigo = codigo or codigo_especialidad(grupo) or '00'
+        por_especialidad[codigo].append((pk, numero_control, grupo_anterior))
+        actuales[pk] = grupo
+
+    nuevos = {}
+    resumen = {}
+    for codigo, alumnos in sorted(por_especialidad.items()):
+        asignacion = repartir(alumnos, tamano)
+        secciones = max(asignacion.values()) + 1
+        tamanos = defaultdict(int)
+        for pk, seccion in asignacion.items():
+            # Con una sola sección se conserva el grupo sin letra.
+            letra = SECCIONES[seccion] if secciones > 1 else ''
+            nuevos[pk] = f'{semestre}{codigo}{letra}'
+            tamanos[nuevos[pk]] += 1
+        resumen[codigo] = dict(sorted(tamanos.items()))
+
+    cambios = [
+        FichaInscripcion(id_inscripcion=pk, grupo_inscripcion=grupo)
+        for pk, grupo in nuevos.items()
+        if actuales[pk] != grupo
+    ]
+    with transaction.atomic():
+        FichaInscripcion.objects.bulk_update(cambios, ['grupo_inscripcion'], batch_size=1000)
+    return resumen, len(cambios)
@@ -0,0 +1,89 @@
+import functools
+import hashlib
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+# Soporte para el encabezado Idempotency-Key en las vistas de escritura. La
+# primera respuesta para una clave (éxito o error) se guarda IDEMPOTENCIA_TTL
+# segundos y se repite tal cual en los reintentos, sin volver a ejecutar la
+# vista. Un duplicado que llega mientras la original sigue en curso espera su
+# resultado. Los 429 y todos los 5xx (el 503 del control de admisión, un error
+# transitorio o una caída) no se guardan: significan "reintenta", no un
+# resultado, y el reintento vuelve a ejecutar la vista.
+# El bloqueo y las respuestas viven en la caché default: con varios workers
+# debe ser compartida (manage.py check avisa con registro.W001), o dos
+# reintentos que caen en workers distintos se ejecutan ambos. Aun así, la
+# restricción única (alumno, semestre_inscripcion) impide una ficha duplicada;
+# el segundo recibe un error en lugar de la respuesta repetida.
+
+NO_GUARDAR = (429,)
+
+
+def _huella(request):
+    return hashlib.sha256(request.method.encode() + request.path.encode() + b'\n' + request.body).hexdigest()
+
+
+def _repetir(guardada):
+    response = HttpResponse(guardada['contenido'], status=guardada['status'], content_type=guardada['tipo'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _distinta():
+    return JsonResponse({
+        'success': False,
+        'error': 'La clave de idempotencia ya se usó con una solicitud distinta'
+    }, status=422)
+
+
+def idempotente(vista):
+    @functools.wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        clave_cliente = request.headers.get('Idempotency-Key')
+        if not clave_cliente:
+            return vista(request, *args, **kwargs)
+
+        clave = 'idempotencia:' + hashlib.sha256(clave_cliente.encode()).hexdigest()
+        clave_bloqueo = clave + ':en_curso'
+        huella = _huella(request)
+        limite = time.monotonic() + settings.IDEMPOTENCIA_ESPERA
+        pausa = 0.02
+
+        while True:
+            guardada = cache.get(clave)
+            if guardada is not None:
+                return _repetir(guardada) if guardada['huella'] == huella else _distinta()
+
+            ficha = uuid.uuid4().hex
+            if cache.add(clave_bloqueo, ficha, settings.IDEMPOTENCIA_BLOQUEO):
+                break
+
+            if time.monotonic() >= limite:
+                response = JsonResponse({
+                    'success': False,
+                    'error': 'La solicitud original con esta clave sigue en proceso'
+                }, status=409)
+                response['Retry-After'] = '1'
+                return response
+            time.sleep(pausa * random.uniform(0.5, 1))
+            pausa = min(pausa * 2, 0.25)
+
+        try:
+            response = vista(request, *args, **kwargs)
+            if response.status_code < 500 and response.status_code not in NO_GUARDAR and not response.streaming:
+                cache.set(clave, {
+                    'huella': huella,
+                    'status': response.status_code,
+                    'tipo': response.get('Content-Type'),
+                    'contenido': response.content,
+                }, settings.IDEMPOTENCIA_TTL)
+            return response
+        finally:
+            if cache.get(clave_bloqueo) == ficha:
+                cache.delete(clave_bloqueo)
+    return envoltura
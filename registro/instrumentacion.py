@@ -0,0 +1,125 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+from . import metricas
+
+# Mide por petición el número de consultas, el tiempo en la base, y los tramos
+# marcados con medir() (serialización JSON, render de PDF). Los publica en el
+# encabezado Server-Timing y en una línea de log estructurada; si la petición
+# supera PETICION_LENTA_MS, el log incluye el SQL ejecutado.
+
+MAX_SQL = 100
+
+logger = logging.getLogger('registro.peticiones')
+
+_medicion = ContextVar('instrumentacion_medicion', default=None)
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duracion = time.perf_counter() - inicio
+        medicion['consultas'] += 1
+        medicion['bd'] += duracion
+        if len(medicion['sql']) < MAX_SQL:
+            medicion['sql'].append((context['connection'].alias, round(duracion * 1000, 2), sql))
+
+
+def _instalar(sender, connection, **kwargs):
+    # connection_created se emite en cada conexión nueva del mismo wrapper.
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_consulta)
+
+
+connection_created.connect(_instalar, dispatch_uid='registro.instrumentacion')
+
+
+def inicio_peticion():
+    # perf_counter() al entrar la petición actual, o None fuera de una petición.
+    medicion = _medicion.get()
+    return medicion['inicio'] if medicion is not None else None
+
+
+@contextmanager
+def medir(tramo):
+    medicion = _medicion.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion['tramos'][tramo] = medicion['tramos'].get(tramo, 0) + time.perf_counter() - inicio
+
+
+class InstrumentacionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion = {'consultas': 0, 'bd': 0.0, 'sql': [], 'tramos': {}, 'inicio': time.perf_counter()}
+        token = _medicion.set(medicion)
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self._publicar(request, response, medicion)
+
+    async def __acall__(self, request):
+        medicion = {'consultas': 0, 'bd': 0.0, 'sql': [], 'tramos': {}, 'inicio': time.perf_counter()}
+        token = _medicion.set(medicion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self._publicar(request, response, medicion)
+
+    def _publicar(self, request, response, medicion):
+        total = time.perf_counter() - medicion['inicio']
+        tramos = [f'db;dur={medicion["bd"] * 1000:.1f};desc="{medicion["consultas"]} consultas"']
+        tramos += [f'{tramo};dur={duracion * 1000:.1f}' for tramo, duracion in medicion['tramos'].items()]
+        tramos.append(f'total;dur={total * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(tramos)
+
+        coincidencia = request.resolver_match
+        datos = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'vista': coincidencia.view_name if coincidencia else None,
+            'estado': response.status_code,
+            'duracion_ms': round(total * 1000, 1),
+            'consultas': medicion['consultas'],
+            'bd_ms': round(medicion['bd'] * 1000, 1),
+        }
+        for tramo, duracion in medicion['tramos'].items():
+            datos[f'{tramo}_ms'] = round(duracion * 1000, 1)
+
+        metricas.observar_peticion(datos, medicion['tramos'].get('pdf'))
+
+        if total * 1000 >= settings.PETICION_LENTA_MS:
+            datos['sql'] = [
+                {'bd': alias, 'ms': duracion, 'sql': sql} for alias, duracion, sql in medicion['sql']
+            ]
+            logger.warning('peticion_lenta', extra=datos)
+        else:
+            logger.info('peticion', extra=datos)
+        return response
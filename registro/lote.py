@@ -0,0 +1,164 @@
+from collections import Counter
+
+from django.db import transaction
+
+from . import catalogo, cupos, grupos, replicas
+from .cupos import reservar_lugar
+from .models import Alumno, Especialidad, FichaInscripcion, Taller
+from .serializadores import ficha_registrada
+
+LOTE_MAXIMO = 500
+
+
+class LoteRechazado(Exception):
+    pass
+
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def construir_ficha(alumno, especialidad, taller):
+    ficha = FichaInscripcion(
+        alumno=alumno,
+        especialidad=especialidad,
+        taller=taller,
+        semestre_inscripcion=alumno.semestre_anterior + 1,
+    )
+    ficha.grupo_inscripcion = ficha.calcular_grupo_nuevo()
+    return ficha
+
+
+def especialidad_por_grupo(alumno, especialidades_por_codigo):
+    codigo = grupos.codigo_especialidad(alumno.grupo_anterior)
+    if alumno.semestre_anterior > 2 and codigo:
+        return especialidades_por_codigo.get(codigo)
+    return None
+
+
+def aplicar_contadores(modelo, conteos):
+    for pk, lugares in sorted(conteos.items()):
+        if not reservar_lugar(modelo, pk, lugares):
+            raise LoteRechazado(f'El cupo de {modelo._meta.verbose_name} {pk} cambió durante el registro')
+
+
+def registrar_lote(filas):
+    resultados = [None] * len(filas)
+    solicitudes = []
+    for indice, fila in enumerate(filas):
+        fila = fila if isinstance(fila, dict) else {}
+        numero_control = _entero(fila.get('numero_control'))
+        if numero_control is None:
+            resultados[indice] = {'success': False, 'error': 'Número de control es obligatorio'}
+            continue
+        solicitudes.append((indice, numero_control, fila.get('especialidad_id'), fila.get('taller_id')))
+
+    numeros = {numero_control for _, numero_control, _, _ in solicitudes}
+    repetidos = {numero for numero, veces in Counter(n for _, n, _, _ in solicitudes).items() if veces > 1}
+    alumnos = Alumno.objects.in_bulk(numeros)
+    especialidades_por_codigo = {
+        codigo: pk for pk, codigo in Especialidad.objects.values_list('pk', 'codigo')
+    }
+
+    with transaction.atomic():
+        # Solo las especialidades que el lote puede ocupar: las elegidas y las
+        # que corresponden por grupo a los alumnos que no eligen.
+        ids_especialidad = {_entero(esp_id) for _, _, esp_id, _ in solicitudes} | {
+            especialidad_por_grupo(alumnos[numero_control], especialidades_por_codigo)
+            for _, numero_control, _, _ in solicitudes
+            if numero_control in alumnos and not alumnos[numero_control].puede_elegir_especialidad
+        }
+        ids_taller = {_entero(taller_id) for _, _, _, taller_id in solicitudes}
+        ids_especialidad.discard(None)
+        ids_taller.discard(None)
+
+        # Se bloquean en orden de llave para no formar ciclos con otros lotes
+        # ni con las reservas individuales.
+        especialidades = {
+            esp.pk: esp for esp in Especialidad.objects.select_for_update().filter(pk__in=ids_especialidad).order_by('pk')
+        }
+        talleres = {
+            taller.pk: taller for taller in Taller.objects.select_for_update().filter(pk__in=ids_taller).order_by('pk')
+        }
+        especialidades_por_codigo = {
+            codigo: especialidades[pk] for codigo, pk in especialidades_por_codigo.items() if pk in especialidades
+        }
+
+        # Las fichas existentes se leen ya con los bloqueos tomados, como en
+        # preferencias.py: una inscripción individual confirmada mientras el
+        # lote esperaba se reporta por alumno en vez de romper el bulk_create.
+        fichas_existentes = set(
+            FichaInscripcion.objects.filter(alumno_id__in=numeros).values_list('alumno_id', 'semestre_inscripcion')
+        )
+        disponibles_especialidad = cupos.disponibles(Especialidad, especialidades)
+        disponibles_taller = cupos.disponibles(Taller, talleres)
+
+        fichas = []
+        for indice, numero_control, especialidad_id, taller_id in solicitudes:
+            alumno = alumnos.get(numero_control)
+            error = None
+            especialidad = None
+            taller = None
+
+            if alumno is None:
+                error = 'Alumno no encontrado'
+            elif numero_control in repetidos:
+                error = 'El alumno aparece más de una vez en el lote'
+            elif (numero_control, alumno.semestre_anterior + 1) in fichas_existentes:
+                error = f'El alumno ya tiene una ficha registrada para el semestre {alumno.semestre_anterior + 1}'
+            elif alumno.puede_elegir_especialidad:
+                if not especialidad_id:
+                    error = 'Los alumnos de 2do semestre deben elegir una especialidad'
+                else:
+                    especialidad = especialidades.get(_entero(especialidad_id))
+                    if especialidad is None:
+                        error = 'Especialidad no válida'
+            else:
+                especialidad = especialidad_por_grupo(alumno, especialidades_por_codigo)
+
+            if error is None and taller_id:
+                taller = talleres.get(_entero(taller_id))
+                if taller is None:
+                    error = 'Taller no válido'
+
+            if error is None and especialidad and disponibles_especialidad[especialidad.pk] <= 0:
+                error = f'No hay cupo disponible en la especialidad {especialidad.nombre}'
+            if error is None and taller and disponibles_taller[taller.pk] <= 0:
+                error = f'No hay cupo disponible en el taller {taller.nombre}'
+
+            if error is not None:
+                resultados[indice] = {'success': False, 'error': error}
+                continue
+
+            if especialidad:
+                disponibles_especialidad[especialidad.pk] -= 1
+            if taller:
+                disponibles_taller[taller.pk] -= 1
+            fichas.append((indice, construir_ficha(alumno, especialidad, taller)))
+
+        if fichas:
+            FichaInscripcion.objects.bulk_create([ficha for _, ficha in fichas])
+            aplicar_contadores(Especialidad, Counter(f.especialidad_id for _, f in fichas if f.especialidad_id))
+            aplicar_contadores(Taller, Counter(f.taller_id for _, f in fichas if f.taller_id))
+
+            # MySQL no devuelve las llaves generadas por bulk_create.
+            if any(ficha.pk is None for _, ficha in fichas):
+                ids = {
+                    (alumno_id, semestre): pk
+                    for alumno_id, semestre, pk in FichaInscripcion.objects.filter(
+                        alumno_id__in=[ficha.alumno_id for _, ficha in fichas]
+                    ).values_list('alumno_id', 'semestre_inscripcion', 'id_inscripcion')
+                }
+                for _, ficha in fichas:
+                    ficha.id_inscripcion = ids.get((ficha.alumno_id, ficha.semestre_inscripcion))
+
+            transaction.on_commit(catalogo.invalidar)
+            alumnos_registrados = [ficha.alumno_id for _, ficha in fichas]
+            transaction.on_commit(lambda: replicas.fijar_alumnos(alumnos_registrados))
+
+    for indice, ficha in fichas:
+        resultados[indice] = {'success': True, 'data': ficha_registrada(ficha)}
+    return resultados
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from registro.grupos import asignar_grupos
+
+
+class Command(BaseCommand):
+    help = (
+        "Reparte las fichas de un semestre en secciones por especialidad ('3PRA', "
+        "'3PRB', ...) de a lo más --tamano alumnos, conservando juntos a los alumnos "
+        "del mismo grupo anterior cuando es posible. Escribe todo en una sola transacción."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('semestre', type=int, help='Semestre de inscripción a repartir.')
+        parser.add_argument('--tamano', type=int, default=settings.GRUPO_TAMANO_MAXIMO)
+
+    def handle(self, *args, **options):
+        if options['tamano'] < 1:
+            raise CommandError('--tamano debe ser mayor que cero')
+
+        inicio = time.perf_counter()
+        try:
+            resumen, cambios = asignar_grupos(options['semestre'], options['tamano'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        duracion = time.perf_counter() - inicio
+
+        for codigo, tamanos in resumen.items():
+            secciones = ', '.join(f'{grupo}={total}' for grupo, total in tamanos.items())
+            self.stdout.write(f"{codigo}: {secciones}")
+        self.stdout.write(
+            f"{sum(sum(t.values()) for t in resumen.values())} fichas, {cambios} grupos "
+            f"actualizados en {duracion:.2f}s"
+        )
@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from registro import preferencias
+from registro.lote import LoteRechazado
+
+
+class Command(BaseCommand):
+    help = (
+        "Convierte las preferencias capturadas durante la ventana en fichas: reparte "
+        "los lugares en orden de prioridad y escribe fichas y contadores en bloque."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prioridad', choices=['sorteo', 'fecha'], default=settings.PREFERENCIAS_PRIORIDAD)
+        parser.add_argument('--semilla', default=settings.PREFERENCIAS_SEMILLA)
+        parser.add_argument('--simular', action='store_true',
+                            help='Calcula la asignación sin escribir fichas.')
+        parser.add_argument('--forzar', action='store_true',
+                            help='Asigna aunque la ventana siga abierta.')
+
+    def handle(self, *args, **options):
+        if preferencias.ventana_abierta() and not options['forzar']:
+            raise CommandError('La ventana de preferencias sigue abierta (use --forzar)')
+
+        inicio = time.perf_counter()
+        try:
+            resumen = preferencias.asignar_preferencias(
+                options['prioridad'], options['semilla'], options['simular']
+            )
+        except LoteRechazado as e:
+            raise CommandError(f'No se escribió la asignación: {e}')
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f"{resumen['pendientes']} de {resumen['preferencias']} preferencias pendientes; "
+            f"asignadas={resumen['asignadas']} primera_opcion={resumen['primera_opcion']} "
+            f"sin_taller={resumen['sin_taller']} sin_lugar={len(resumen['sin_lugar'])} "
+            f"en {duracion:.2f}s{' (simulación)' if options['simular'] else ''}"
+        )
+        if resumen['sin_lugar']:
+            muestra = ', '.join(str(n) for n in resumen['sin_lugar'][:50])
+            resto = len(resumen['sin_lugar']) - 50
+            self.stdout.write(f"Sin lugar: {muestra}{f' y {resto} más' if resto > 0 else ''}")
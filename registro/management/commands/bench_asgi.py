@@ -0,0 +1,131 @@
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SERVIDORES = {
+    'wsgi': ['Inscripciones.wsgi:application'],
+    'asgi': ['Inscripciones.asgi:application', '-k', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _esperar_puerto(puerto, proceso, limite=30):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if proceso.poll() is not None:
+            raise CommandError('El servidor terminó antes de aceptar conexiones')
+        try:
+            socket.create_connection(('127.0.0.1', puerto), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'El servidor no abrió el puerto {puerto}')
+
+
+async def _peticion(puerto, ruta, lento):
+    lector, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+    try:
+        cabecera = f'GET {ruta} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode()
+        if lento:
+            # Cliente lento: la mitad de la petición, una pausa y el resto.
+            escritor.write(cabecera[:len(cabecera) // 2])
+            await escritor.drain()
+            await asyncio.sleep(lento)
+            cabecera = cabecera[len(cabecera) // 2:]
+        escritor.write(cabecera)
+        await escritor.drain()
+        respuesta = await lector.read()
+    finally:
+        escritor.close()
+    return int(respuesta.split(b' ', 2)[1])
+
+
+async def _conexion(puerto, ruta, lento, fin, limite, latencias, errores):
+    if lento:
+        # Los clientes lentos se desfasan para que siempre haya alguno a medias.
+        await asyncio.sleep(random.uniform(0, lento))
+    while time.monotonic() < fin:
+        inicio = time.perf_counter()
+        try:
+            estado = await asyncio.wait_for(_peticion(puerto, ruta, lento), limite)
+        except (asyncio.TimeoutError, OSError, IndexError, ValueError):
+            errores.append(None)
+            continue
+        if estado == 200:
+            latencias.append(time.perf_counter() - inicio)
+        else:
+            errores.append(estado)
+
+
+async def _carga(puerto, ruta, rapidas, lentas, duracion, lento, limite):
+    resultados = {'rápidas': ([], []), 'lentas': ([], [])}
+    fin = time.monotonic() + duracion
+    await asyncio.gather(
+        *[_conexion(puerto, ruta, 0, fin, limite, *resultados['rápidas']) for _ in range(rapidas)],
+        *[_conexion(puerto, ruta, lento, fin, limite, *resultados['lentas']) for _ in range(lentas)],
+    )
+    return resultados
+
+
+def _percentil(valores, p):
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Levanta un worker de gunicorn síncrono (WSGI) y uno de uvicorn (ASGI) y compara "
+        "cuántas peticiones atiende cada uno con clientes lentos y rápidos concurrentes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ruta', default='/api/talleres-disponibles/')
+        parser.add_argument('--rapidas', type=int, default=10, help='Conexiones concurrentes que envían la petición de inmediato.')
+        parser.add_argument('--lentas', type=int, default=50, help='Conexiones concurrentes que tardan --lento segundos en enviarla.')
+        parser.add_argument('--duracion', type=float, default=10)
+        parser.add_argument('--lento', type=float, default=0.5, help='Segundos que cada cliente tarda en enviar la petición.')
+        parser.add_argument('--limite', type=float, default=10, help='Tiempo máximo por petición antes de contarla como error.')
+        parser.add_argument('--modos', nargs='+', choices=sorted(SERVIDORES), default=['wsgi', 'asgi'])
+
+    def handle(self, *args, **options):
+        for modo in options['modos']:
+            puerto = _puerto_libre()
+            entorno = dict(os.environ, API_ASYNC='1' if modo == 'asgi' else '0')
+            proceso = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', *SERVIDORES[modo], '-w', '1',
+                 '--bind', f'127.0.0.1:{puerto}', '--timeout', '120', '--log-level', 'warning'],
+                cwd=settings.BASE_DIR, env=entorno
+            )
+            try:
+                _esperar_puerto(puerto, proceso)
+                resultados = asyncio.run(_carga(
+                    puerto, options['ruta'], options['rapidas'], options['lentas'],
+                    options['duracion'], options['lento'], options['limite']
+                ))
+            finally:
+                proceso.terminate()
+                proceso.wait()
+
+            for tipo, (latencias, errores) in resultados.items():
+                latencias.sort()
+                linea = (
+                    f'{modo} {tipo:>7}: {len(latencias)} respuestas '
+                    f'({len(latencias) / options["duracion"]:.1f}/s), {len(errores)} errores'
+                )
+                if latencias:
+                    linea += (
+                        f', p50 {_percentil(latencias, 0.5) * 1000:.0f} ms,'
+                        f' p99 {_percentil(latencias, 0.99) * 1000:.0f} ms'
+                    )
+                self.stdout.write(linea)
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from registro.cupos import crear_fracciones, reservar_lugar
+from registro.models import Especialidad, FraccionCupo
+from registro.sinteticos import codigos_libres
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide reservas por segundo sobre una sola especialidad con varios hilos, con "
+        "el contador en la fila del curso y con fracciones. Cada reserva mantiene su "
+        "transacción abierta --trabajo ms (lo que tardaría el resto del registro) y se "
+        "revierte al final, así el cupo no se agota. Úsalo contra MySQL: SQLite "
+        "serializa toda escritura y no muestra la diferencia."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', default='1,2,4,8,16')
+        parser.add_argument('--fracciones', type=int, default=8)
+        parser.add_argument('--trabajo', type=float, default=5, help='Milisegundos dentro de la transacción.')
+        parser.add_argument('--segundos', type=float, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            hilos = [int(n) for n in options['hilos'].split(',')]
+        except ValueError:
+            raise CommandError('--hilos debe ser una lista de enteros separados por comas')
+
+        especialidad = Especialidad.objects.create(nombre='BENCH Cupos', codigo=codigos_libres(1)[0])
+        try:
+            crear_fracciones(Especialidad, especialidad.pk, 0, options['fracciones'])
+            for fracciones in (1, options['fracciones']):
+                with override_settings(CUPOS_FRACCIONES=fracciones):
+                    for n in hilos:
+                        reservas, fallidas = self.medir(especialidad.pk, n, options)
+                        self.stdout.write(
+                            f"fracciones={fracciones:>2} hilos={n:>3}: "
+                            f"{reservas / options['segundos']:.0f} reservas/s ({fallidas} sin lugar)"
+                        )
+        finally:
+            FraccionCupo.objects.filter(tipo='especialidad', curso=especialidad.pk).delete()
+            especialidad.delete()
+
+    def medir(self, pk, hilos, options):
+        trabajo = options['trabajo'] / 1000
+        fin = time.perf_counter() + options['segundos']
+        totales = {'reservas': 0, 'fallidas': 0}
+        candado = threading.Lock()
+
+        def trabajar():
+            reservas = fallidas = 0
+            try:
+                while time.perf_counter() < fin:
+                    with transaction.atomic():
+                        if reservar_lugar(Especialidad, pk):
+                            reservas += 1
+                        else:
+                            fallidas += 1
+                        time.sleep(trabajo)
+                        transaction.set_rollback(True)
+            finally:
+                connection.close()
+            with candado:
+                totales['reservas'] += reservas
+                totales['fallidas'] += fallidas
+
+        trabajadores = [threading.Thread(target=trabajar) for _ in range(hilos)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+        return totales['reservas'], totales['fallidas']
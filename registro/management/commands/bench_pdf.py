@@ -0,0 +1,47 @@
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+
+from registro.pdf import (
+    datos_solicitud, obtener_plantilla, renderizar_solicitud, renderizar_solicitud_plantilla
+)
+
+
+class Command(BaseCommand):
+    help = "Compara el tiempo de CPU y el tamaño por PDF entre el modo platypus y el modo plantilla."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=50)
+
+    def handle(self, *args, **options):
+        repeticiones = options['repeticiones']
+        datos = [
+            datos_solicitud({
+                'alumno__numero_control': 22300000 + i,
+                'alumno__nombres': 'María José',
+                'alumno__apellido_paterno': 'Hernández',
+                'alumno__apellido_materno': f'López {i}',
+                'alumno__grupo_anterior': '2B',
+                'alumno__semestre_anterior': 2,
+                'semestre_inscripcion': 3,
+                'especialidad__nombre': 'Programación',
+                'taller__nombre': 'Ajedrez',
+                'fecha_solicitud': datetime(2025, 8, 1, tzinfo=timezone.utc),
+            })
+            for i in range(repeticiones)
+        ]
+
+        inicio = time.process_time()
+        obtener_plantilla()
+        self.stdout.write(f'maquetación de la plantilla (una vez por proceso): {(time.process_time() - inicio) * 1000:.1f} ms')
+
+        for nombre, renderizar in (('platypus', renderizar_solicitud), ('plantilla', renderizar_solicitud_plantilla)):
+            renderizar(datos[0])
+            inicio = time.process_time()
+            tamanos = [len(renderizar(d)) for d in datos]
+            duracion = time.process_time() - inicio
+            self.stdout.write(
+                f'{nombre:>9}: {duracion / repeticiones * 1000:.2f} ms de CPU por PDF, '
+                f'{sum(tamanos) / len(tamanos) / 1024:.1f} KiB por PDF'
+            )
@@ -0,0 +1,106 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from registro import preferencias
+from registro.models import Alumno, Especialidad, FichaInscripcion, PreferenciaInscripcion, Taller
+from registro.sinteticos import codigos_libres, verificar_rango
+
+NUMERO_CONTROL_BASE = 1700000000
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la asignación por preferencias con alumnos sintéticos: el reparto en "
+        "memoria y la asignación completa (lectura, bloqueo, bulk_create y contadores). "
+        "Escribe en la base de datos configurada; úsalo contra una copia."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alumnos', type=int, default=10000)
+        parser.add_argument('--especialidades', type=int, default=60)
+        parser.add_argument('--talleres', type=int, default=60)
+        parser.add_argument('--opciones', type=int, default=3, help='Preferencias por alumno.')
+        parser.add_argument('--conservar', action='store_true',
+                            help='No borra los datos sintéticos al terminar.')
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        especialidades, talleres = self.sembrar(options)
+        try:
+            self.medir_reparto(options)
+
+            inicio = time.perf_counter()
+            resumen = preferencias.asignar_preferencias('sorteo', 'bench')
+            duracion = time.perf_counter() - inicio
+            self.stdout.write(
+                f"asignación completa: {options['alumnos']} alumnos en {duracion:.2f}s "
+                f"(asignadas={resumen['asignadas']} primera_opcion={resumen['primera_opcion']} "
+                f"sin_lugar={len(resumen['sin_lugar'])})"
+            )
+        finally:
+            if not options['conservar']:
+                self.limpiar(especialidades, talleres, options['alumnos'])
+
+    def sembrar(self, options):
+        # asignar_preferencias() asigna todas las preferencias guardadas, no solo
+        # las sintéticas.
+        if PreferenciaInscripcion.objects.exists():
+            raise CommandError('Ya hay preferencias registradas; el benchmark las asignaría junto con las sintéticas.')
+        verificar_rango(NUMERO_CONTROL_BASE, options['alumnos'])
+        codigos = codigos_libres(options['especialidades'])
+        especialidades = Especialidad.objects.bulk_create([
+            Especialidad(nombre=f'BENCH Especialidad {i}', codigo=codigos[i])
+            for i in range(options['especialidades'])
+        ])
+        talleres = Taller.objects.bulk_create([
+            Taller(nombre=f'BENCH Taller {i}') for i in range(options['talleres'])
+        ])
+        # MySQL no devuelve las llaves generadas por bulk_create.
+        ids_especialidad = list(Especialidad.objects.filter(nombre__startswith='BENCH ').values_list('pk', flat=True))
+        ids_taller = list(Taller.objects.filter(nombre__startswith='BENCH ').values_list('pk', flat=True))
+
+        # Unas cuantas especialidades concentran la mayoría de las primeras opciones.
+        pesos = [1 / (i + 1) for i in range(len(ids_especialidad))]
+        alumnos = []
+        filas = []
+        for i in range(options['alumnos']):
+            numero_control = NUMERO_CONTROL_BASE + i
+            alumnos.append(Alumno(
+                numero_control=numero_control, nombres='Bench', apellido_paterno='Alumno',
+                apellido_materno=str(i), grupo_anterior='2A', semestre_anterior=2,
+            ))
+            opciones = []
+            while len(opciones) < min(options['opciones'], len(ids_especialidad)):
+                pk = random.choices(ids_especialidad, pesos)[0]
+                if pk not in opciones:
+                    opciones.append(pk)
+            filas.append(PreferenciaInscripcion(
+                alumno_id=numero_control, semestre_inscripcion=3, especialidades=opciones,
+                talleres=random.sample(ids_taller, min(options['opciones'], len(ids_taller))),
+            ))
+        Alumno.objects.bulk_create(alumnos, batch_size=1000)
+        PreferenciaInscripcion.objects.bulk_create(filas, batch_size=1000)
+        self.solicitudes = [(fila.alumno_id, fila.especialidades, fila.talleres) for fila in filas]
+        self.disponibles = (
+            {pk: Especialidad.CUPO_MAXIMO for pk in ids_especialidad},
+            {pk: Taller.CUPO_MAXIMO for pk in ids_taller},
+        )
+        return ids_especialidad, ids_taller
+
+    def medir_reparto(self, options):
+        repeticiones = 20
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            preferencias.asignar(self.solicitudes, dict(self.disponibles[0]), dict(self.disponibles[1]))
+        duracion = (time.perf_counter() - inicio) / repeticiones
+        self.stdout.write(f"reparto en memoria: {options['alumnos']} alumnos en {duracion * 1000:.1f} ms")
+
+    def limpiar(self, especialidades, talleres, total_alumnos):
+        rango = (NUMERO_CONTROL_BASE, NUMERO_CONTROL_BASE + total_alumnos - 1)
+        FichaInscripcion.objects.filter(alumno__numero_control__range=rango).delete()
+        PreferenciaInscripcion.objects.filter(alumno__numero_control__range=rango).delete()
+        Alumno.objects.filter(numero_control__range=rango).delete()
+        Especialidad.objects.filter(pk__in=especialidades).delete()
+        Taller.objects.filter(pk__in=talleres).delete()
@@ -0,0 +1,104 @@
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+
+from registro import serializadores
+from registro.models import Alumno, Especialidad, FichaInscripcion, Taller
+from registro.serializadores import RespuestaJSON
+
+
+def _pagina_anterior(fichas):
+    # Conversión campo por campo sobre instancias, como antes de serializadores.py.
+    fichas_data = []
+    for ficha in fichas:
+        fichas_data.append({
+            'id_inscripcion': ficha.id_inscripcion,
+            'alumno': {
+                'numero_control': ficha.alumno.numero_control,
+                'nombre_completo': f"{ficha.alumno.nombres} {ficha.alumno.apellido_paterno} {ficha.alumno.apellido_materno}",
+                'grupo_anterior': ficha.alumno.grupo_anterior,
+                'semestre_anterior': ficha.alumno.semestre_anterior
+            },
+            'inscripcion': {
+                'grupo_inscripcion': ficha.grupo_inscripcion,
+                'semestre_inscripcion': ficha.semestre_inscripcion,
+                'especialidad': {
+                    'nombre': ficha.especialidad.nombre if ficha.especialidad else None,
+                    'codigo': ficha.especialidad.codigo if ficha.especialidad else None
+                },
+                'taller': ficha.taller.nombre if ficha.taller else None,
+                'fecha_solicitud': ficha.fecha_solicitud
+            }
+        })
+    return JsonResponse({'fichas': fichas_data}).content
+
+
+def _pagina_nueva(filas):
+    return RespuestaJSON({'fichas': [serializadores.ficha(fila) for fila in filas]}).content
+
+
+class Command(BaseCommand):
+    help = "Mide el costo de serializar una página de fichas: instancias + JsonResponse contra values_list + RespuestaJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=100)
+        parser.add_argument('--repeticiones', type=int, default=500)
+        parser.add_argument(
+            '--bd', action='store_true',
+            help='Incluye la consulta: lee las primeras filas de la base en lugar de datos sintéticos.'
+        )
+
+    def _medir(self, nombre, funcion, repeticiones):
+        funcion()
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            tamano = len(funcion())
+        duracion = (time.perf_counter() - inicio) / repeticiones
+        self.stdout.write(f'{nombre:>10}: {duracion * 1000:.3f} ms por página, {tamano / 1024:.1f} KiB')
+        return duracion
+
+    def handle(self, *args, **options):
+        filas, repeticiones = options['filas'], options['repeticiones']
+        orden = ('-fecha_solicitud', '-id_inscripcion')
+
+        if options['bd']:
+            consulta = FichaInscripcion.objects.order_by(*orden)
+
+            def anterior():
+                return _pagina_anterior(consulta.select_related('alumno', 'especialidad', 'taller')[:filas])
+
+            def nueva():
+                return _pagina_nueva(consulta.values_list(*serializadores.CAMPOS_FICHA)[:filas])
+        else:
+            especialidad = Especialidad(id_especialidad=1, nombre='Programación', codigo='PR')
+            taller = Taller(id_taller=1, nombre='Ajedrez')
+            fecha = datetime(2025, 8, 1, 9, 30, 15, 123456, tzinfo=timezone.utc)
+            fichas = []
+            tuplas = []
+            for i in range(filas):
+                alumno = Alumno(
+                    numero_control=22300000 + i, nombres='María José', apellido_paterno='Hernández',
+                    apellido_materno=f'López {i}', grupo_anterior='2B', semestre_anterior=2
+                )
+                fichas.append(FichaInscripcion(
+                    id_inscripcion=i + 1, alumno=alumno, especialidad=especialidad, taller=taller,
+                    grupo_inscripcion='3PR', semestre_inscripcion=3, fecha_solicitud=fecha
+                ))
+                tuplas.append((
+                    i + 1, alumno.numero_control, alumno.nombres, alumno.apellido_paterno,
+                    alumno.apellido_materno, alumno.grupo_anterior, alumno.semestre_anterior,
+                    '3PR', 3, especialidad.nombre, especialidad.codigo, taller.nombre, fecha
+                ))
+
+            def anterior():
+                return _pagina_anterior(fichas)
+
+            def nueva():
+                return _pagina_nueva(tuplas)
+
+        self.stdout.write(f'orjson: {"sí" if serializadores.orjson is not None else "no (json estándar)"}')
+        antes = self._medir('anterior', anterior, repeticiones)
+        despues = self._medir('nueva', nueva, repeticiones)
+        self.stdout.write(f'mejora: {antes / despues:.1f}x')
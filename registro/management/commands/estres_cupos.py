@@ -0,0 +1,134 @@
+import threading
+import time
+from queue import Empty, Queue
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+
+from registro.cupos import ocupados
+from registro.sinteticos import codigos_libres, verificar_rango
+from registro.models import Alumno, Especialidad, FichaInscripcion, Taller
+
+NUMERO_CONTROL_BASE = 1900000000
+
+
+class Command(BaseCommand):
+    help = (
+        "Registra alumnos sintéticos desde varios hilos sobre una misma especialidad "
+        "y taller para comprobar que no se sobrevende ningún cupo. Escribe en la base "
+        "de datos configurada, así que úsalo contra una copia (MySQL) y no en producción."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alumnos', type=int, default=200)
+        parser.add_argument('--hilos', type=int, default=32)
+        parser.add_argument('--conservar', action='store_true',
+                            help='No borra los datos sintéticos al terminar.')
+
+    def handle(self, *args, **options):
+        total_alumnos = options['alumnos']
+        hilos = options['hilos']
+
+        especialidad, taller = self.sembrar(total_alumnos)
+        pendientes = Queue()
+        for i in range(total_alumnos):
+            pendientes.put(NUMERO_CONTROL_BASE + i)
+
+        resultados = {'registradas': 0, 'sin_cupo': 0, 'errores': 0}
+        candado = threading.Lock()
+
+        def trabajar():
+            try:
+                while True:
+                    try:
+                        numero_control = pendientes.get_nowait()
+                    except Empty:
+                        return
+                    try:
+                        with transaction.atomic():
+                            alumno = Alumno.objects.get(numero_control=numero_control)
+                            FichaInscripcion(alumno=alumno, especialidad=especialidad, taller=taller).save()
+                        clave = 'registradas'
+                    except ValidationError:
+                        clave = 'sin_cupo'
+                    except DatabaseError:
+                        clave = 'errores'
+                    with candado:
+                        resultados[clave] += 1
+            finally:
+                connection.close()
+
+        inicio = time.perf_counter()
+        trabajadores = [threading.Thread(target=trabajar) for _ in range(hilos)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+        duracion = time.perf_counter() - inicio
+
+        try:
+            self.verificar(especialidad, taller, resultados)
+            self.stdout.write(
+                f"{total_alumnos} solicitudes con {hilos} hilos en {duracion:.2f}s "
+                f"({total_alumnos / duracion:.1f} solicitudes/s, "
+                f"{resultados['registradas'] / duracion:.1f} registros/s)"
+            )
+            self.stdout.write(
+                f"registradas={resultados['registradas']} sin_cupo={resultados['sin_cupo']} "
+                f"errores={resultados['errores']}"
+            )
+        finally:
+            if not options['conservar']:
+                self.limpiar(especialidad, taller, total_alumnos)
+
+    def sembrar(self, total_alumnos):
+        verificar_rango(NUMERO_CONTROL_BASE, total_alumnos)
+        especialidad = Especialidad.objects.create(nombre='SIM Especialidad', codigo=codigos_libres(1)[0])
+        taller = Taller.objects.create(nombre='SIM Taller')
+        Alumno.objects.bulk_create([
+            Alumno(
+                numero_control=NUMERO_CONTROL_BASE + i,
+                nombres='Sim',
+                apellido_paterno='Alumno',
+                apellido_materno=str(i),
+                grupo_anterior='2Z',
+                semestre_anterior=2,
+            )
+            for i in range(total_alumnos)
+        ])
+        return especialidad, taller
+
+    def verificar(self, especialidad, taller, resultados):
+        especialidad.cantidad = ocupados(Especialidad, [especialidad.pk])[especialidad.pk]
+        taller.cantidad = ocupados(Taller, [taller.pk])[taller.pk]
+        fichas_especialidad = FichaInscripcion.objects.filter(especialidad=especialidad).count()
+        fichas_taller = FichaInscripcion.objects.filter(taller=taller).count()
+
+        self.stdout.write(
+            f"especialidad: cantidad={especialidad.cantidad} fichas={fichas_especialidad} "
+            f"(cupo {Especialidad.CUPO_MAXIMO}); taller: cantidad={taller.cantidad} "
+            f"fichas={fichas_taller} (cupo {Taller.CUPO_MAXIMO})"
+        )
+
+        fallas = []
+        if especialidad.cantidad > Especialidad.CUPO_MAXIMO:
+            fallas.append('la especialidad se sobrevendió')
+        if taller.cantidad > Taller.CUPO_MAXIMO:
+            fallas.append('el taller se sobrevendió')
+        if especialidad.cantidad != fichas_especialidad:
+            fallas.append('el contador de la especialidad no coincide con sus fichas')
+        if taller.cantidad != fichas_taller:
+            fallas.append('el contador del taller no coincide con sus fichas')
+        if resultados['registradas'] != fichas_taller:
+            fallas.append('el número de registros exitosos no coincide con las fichas')
+        if fallas:
+            raise CommandError('; '.join(fallas))
+
+    def limpiar(self, especialidad, taller, total_alumnos):
+        # sembrar() comprobó que el rango estaba vacío: todo lo que hay en él es de esta corrida.
+        rango = (NUMERO_CONTROL_BASE, NUMERO_CONTROL_BASE + total_alumnos - 1)
+        FichaInscripcion.objects.filter(alumno__numero_control__range=rango).delete()
+        Alumno.objects.filter(numero_control__range=rango).delete()
+        especialidad.delete()
+        taller.delete()
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from registro.exportar_pdf import filtrar_solicitudes, solicitudes_combinadas, solicitudes_en_zip
+
+
+class Command(BaseCommand):
+    help = "Genera las solicitudes de reinscripción de un grupo, especialidad o semestre en un PDF combinado o un ZIP."
+
+    def add_arguments(self, parser):
+        parser.add_argument('salida', help='Ruta del archivo a generar (.pdf o .zip).')
+        parser.add_argument('--grupo', default='')
+        parser.add_argument('--especialidad', default='', help='Código de la especialidad.')
+        parser.add_argument('--semestre', default='')
+        parser.add_argument('--procesos', type=int, default=settings.PDF_PROCESOS)
+
+    def handle(self, *args, **options):
+        if not (options['grupo'] or options['especialidad'] or options['semestre']):
+            raise CommandError('Indique al menos --grupo, --especialidad o --semestre')
+
+        filas = filtrar_solicitudes(options['grupo'], options['especialidad'], options['semestre'])
+        salida = options['salida']
+        inicio = time.perf_counter()
+
+        with open(salida, 'wb') as destino:
+            if salida.lower().endswith('.zip'):
+                for parte in solicitudes_en_zip(filas.iterator(), options['procesos']):
+                    destino.write(parte)
+                resumen = f'ZIP de {destino.tell() / 1024:.0f} KiB'
+            else:
+                paginas = solicitudes_combinadas(filas.iterator(), destino)
+                resumen = f'{paginas} páginas, {destino.tell() / 1024:.0f} KiB'
+
+        self.stdout.write(f'{salida}: {resumen} en {time.perf_counter() - inicio:.2f}s')
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from registro import catalogo
+from registro.cupos import crear_fracciones
+from registro.models import Especialidad, FraccionCupo, Taller
+
+
+class Command(BaseCommand):
+    help = (
+        "Reparte el contador de cada especialidad y taller en CUPOS_FRACCIONES filas "
+        "de FraccionCupo conservando la ocupación actual. Con 1 fracción devuelve la "
+        "suma a Especialidad.cantidad y Taller.cantidad y borra las fracciones. "
+        "Córralo con el registro detenido, junto con el cambio de CUPOS_FRACCIONES."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fracciones', type=int, default=settings.CUPOS_FRACCIONES)
+
+    def handle(self, *args, **options):
+        fracciones = options['fracciones']
+        if fracciones < 1:
+            raise CommandError('--fracciones debe ser mayor que cero')
+
+        for modelo in (Especialidad, Taller):
+            tipo = modelo._meta.model_name
+            with transaction.atomic():
+                cursos = dict(modelo.objects.select_for_update().order_by('pk').values_list('pk', 'cantidad'))
+                existentes = FraccionCupo.objects.select_for_update().filter(tipo=tipo)
+                sumas = {}
+                for curso, cantidad in existentes.values_list('curso', 'cantidad'):
+                    sumas[curso] = sumas.get(curso, 0) + cantidad
+                existentes.delete()
+
+                for pk, cantidad in cursos.items():
+                    total = sumas.get(pk, cantidad)
+                    if total != cantidad:
+                        modelo.objects.filter(pk=pk).update(cantidad=total)
+                    if fracciones > 1:
+                        crear_fracciones(modelo, pk, total, fracciones)
+            self.stdout.write(f"{tipo}: {len(cursos)} cursos en {fracciones} fracciones")
+
+        catalogo.invalidar()
@@ -0,0 +1,156 @@
+import csv
+import hashlib
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from registro import busqueda
+from registro.models import Alumno
+
+CAMPOS = ['numero_control', 'nombres', 'apellido_paterno', 'apellido_materno', 'grupo_anterior', 'semestre_anterior']
+CAMPOS_ACTUALIZABLES = CAMPOS[1:] + ['clave_busqueda']
+# Se validan antes de escribir: un valor más largo que la columna haría fallar
+# el bloque en MySQL con los bloques anteriores ya confirmados.
+LONGITUDES = {
+    campo: Alumno._meta.get_field(campo).max_length
+    for campo in CAMPOS if Alumno._meta.get_field(campo).max_length
+}
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def huella(valores):
+    return hashlib.blake2b('\x1f'.join(_texto(v) for v in valores).encode(), digest_size=16).digest()
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa o actualiza alumnos desde un archivo CSV o XLSX con las columnas "
+        f"{', '.join(CAMPOS)}. El archivo se lee por bloques y las filas sin cambios se omiten."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument('--lote', type=int, default=1000)
+        parser.add_argument('--hoja', help='Hoja a leer en archivos XLSX (por omisión la activa).')
+        parser.add_argument('--delimitador', default=',')
+        parser.add_argument('--codificacion', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        ruta = Path(options['archivo'])
+        if not ruta.exists():
+            raise CommandError(f'No existe el archivo {ruta}')
+
+        if ruta.suffix.lower() in ('.xlsx', '.xlsm'):
+            filas = self.leer_xlsx(ruta, options['hoja'])
+        else:
+            filas = self.leer_csv(ruta, options['delimitador'], options['codificacion'])
+
+        self.totales = {'leidas': 0, 'nuevas': 0, 'actualizadas': 0, 'sin_cambios': 0, 'invalidas': 0}
+        inicio = time.perf_counter()
+        while True:
+            bloque = list(islice(filas, options['lote']))
+            if not bloque:
+                break
+            self.procesar(bloque)
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f"{self.totales['leidas']} filas en {duracion:.2f}s "
+            f"({self.totales['leidas'] / duracion if duracion else 0:.0f} filas/s): "
+            f"nuevas={self.totales['nuevas']} actualizadas={self.totales['actualizadas']} "
+            f"sin_cambios={self.totales['sin_cambios']} invalidas={self.totales['invalidas']}"
+        )
+
+    def leer_csv(self, ruta, delimitador, codificacion):
+        with open(ruta, newline='', encoding=codificacion) as archivo:
+            lector = csv.reader(archivo, delimiter=delimitador)
+            yield from self.filas_con_encabezado(lector)
+
+    def leer_xlsx(self, ruta, hoja):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise CommandError('Para importar archivos XLSX se necesita openpyxl')
+
+        libro = load_workbook(ruta, read_only=True, data_only=True)
+        try:
+            hoja_activa = libro[hoja] if hoja else libro.active
+            yield from self.filas_con_encabezado(hoja_activa.iter_rows(values_only=True))
+        finally:
+            libro.close()
+
+    def filas_con_encabezado(self, filas):
+        encabezado = [_texto(columna).lower() for columna in next(filas, [])]
+        faltantes = [campo for campo in CAMPOS if campo not in encabezado]
+        if faltantes:
+            raise CommandError(f"Faltan columnas en el archivo: {', '.join(faltantes)}")
+        posiciones = [encabezado.index(campo) for campo in CAMPOS]
+
+        for numero_linea, fila in enumerate(filas, start=2):
+            if not any(_texto(valor) for valor in fila):
+                continue
+            yield numero_linea, [fila[posicion] if posicion < len(fila) else None for posicion in posiciones]
+
+    def normalizar(self, valores):
+        numero_control, nombres, paterno, materno, grupo, semestre = (_texto(v) for v in valores)
+        try:
+            valores = [int(numero_control), nombres, paterno, materno, grupo, int(semestre)]
+        except ValueError:
+            raise ValueError('número de control o semestre no válido')
+
+        largos = [
+            f'{campo} excede {LONGITUDES[campo]} caracteres'
+            for campo, valor in zip(CAMPOS, valores)
+            if campo in LONGITUDES and len(valor) > LONGITUDES[campo]
+        ]
+        if largos:
+            raise ValueError(', '.join(largos))
+        return valores
+
+    def procesar(self, bloque):
+        entrantes = {}
+        for numero_linea, valores in bloque:
+            self.totales['leidas'] += 1
+            try:
+                valores = self.normalizar(valores)
+            except ValueError as e:
+                self.totales['invalidas'] += 1
+                self.stderr.write(f'Línea {numero_linea}: {e}')
+                continue
+            entrantes[valores[0]] = valores
+
+        existentes = {
+            valores[0]: huella(valores)
+            for valores in Alumno.objects.filter(pk__in=entrantes).values_list(*CAMPOS)
+        }
+
+        cambios = []
+        for numero_control, valores in entrantes.items():
+            anterior = existentes.get(numero_control)
+            if anterior == huella(valores):
+                self.totales['sin_cambios'] += 1
+                continue
+            self.totales['actualizadas' if anterior else 'nuevas'] += 1
+            alumno = Alumno(**dict(zip(CAMPOS, valores)))
+            alumno.clave_busqueda = busqueda.clave_busqueda(alumno.nombres, alumno.apellido_paterno, alumno.apellido_materno)
+            cambios.append(alumno)
+
+        if not cambios:
+            return
+
+        opciones = {'update_conflicts': True, 'update_fields': CAMPOS_ACTUALIZABLES}
+        # MySQL resuelve el conflicto por cualquier llave única y no acepta unique_fields.
+        if connection.features.supports_update_conflicts_with_target:
+            opciones['unique_fields'] = ['numero_control']
+        Alumno.objects.bulk_create(cambios, **opciones)
+        transaction.on_commit(busqueda.invalidar)
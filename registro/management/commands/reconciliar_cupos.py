@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from registro.cupos import reconciliar
+from registro.models import Especialidad, Taller
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula Especialidad.cantidad y Taller.cantidad a partir de las fichas "
+        "(un GROUP BY por tabla), reporta las diferencias y las corrige. Con --cada "
+        "se repite periódicamente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--solo-reporte', action='store_true',
+                            help='Reporta las diferencias sin corregirlas.')
+        parser.add_argument('--cada', type=float, default=0,
+                            help='Segundos entre ejecuciones; 0 ejecuta una sola vez.')
+
+    def handle(self, *args, **options):
+        reparar = not options['solo_reporte']
+        if not options['cada']:
+            self.ejecutar(reparar)
+            return
+
+        while True:
+            close_old_connections()
+            try:
+                self.ejecutar(reparar)
+            except DatabaseError as e:
+                self.stderr.write(f"Error al reconciliar: {e}")
+            time.sleep(options['cada'])
+
+    def ejecutar(self, reparar):
+        inicio = time.perf_counter()
+        total = 0
+        for etiqueta, modelo in (('especialidad', Especialidad), ('taller', Taller)):
+            for diferencia in reconciliar(modelo, reparar):
+                total += 1
+                linea = (
+                    f"{etiqueta} {diferencia['id']} ({diferencia['nombre']}): "
+                    f"cantidad={diferencia['cantidad']} fichas={diferencia['reales']} "
+                    f"({diferencia['reales'] - diferencia['cantidad']:+d})"
+                )
+                if diferencia['sobrecupo']:
+                    linea += f" excede el cupo por {diferencia['sobrecupo']}"
+                self.stdout.write(linea)
+
+        accion = 'corregidos' if reparar else 'con diferencia'
+        self.stdout.write(
+            f"{total} contadores {accion} en {(time.perf_counter() - inicio) * 1000:.0f} ms"
+        )
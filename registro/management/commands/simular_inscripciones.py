@@ -0,0 +1,230 @@
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from queue import Empty, Queue
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from registro import busqueda, catalogo
+from registro.cupos import ocupados
+from registro.models import Alumno, Especialidad, FichaInscripcion, Taller
+from registro.sinteticos import codigos_libres, verificar_rango
+
+NUMERO_CONTROL_BASE = 1800000000
+
+# Peso de cada operación en la mezcla de tráfico.
+MEZCLA = {
+    'buscar_alumno': 3,
+    'catalogo': 3,
+    'registrar_inscripcion': 3,
+    'generar_solicitud_pdf': 1,
+}
+
+
+def _percentil(valores, p):
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Simula el día de inscripciones contra un servidor local: siembra alumnos y cursos "
+        "sintéticos, lanza una mezcla de búsquedas, consultas del catálogo, registros y PDFs "
+        "con varios hilos, reporta latencias por endpoint y verifica que no se sobrevendan "
+        "cupos. El servidor debe usar la misma base de datos que este comando."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--alumnos', type=int, default=300)
+        parser.add_argument('--especialidades', type=int, default=3)
+        parser.add_argument('--talleres', type=int, default=4)
+        parser.add_argument('--hilos', type=int, default=32)
+        parser.add_argument('--duracion', type=float, default=60,
+                            help='Segundos máximos; termina antes si ya se intentaron todos los registros.')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--conservar', action='store_true',
+                            help='No borra los datos sintéticos al terminar.')
+
+    def handle(self, *args, **options):
+        self.url = options['url'].rstrip('/')
+        self.timeout = options['timeout']
+        total = options['alumnos']
+        especialidades, talleres = self.sembrar(total, options['especialidades'], options['talleres'])
+
+        pendientes = Queue()
+        for numero_control in random.sample(range(NUMERO_CONTROL_BASE, NUMERO_CONTROL_BASE + total), total):
+            pendientes.put(numero_control)
+        self.registrados = []
+        self.latencias = defaultdict(list)
+        self.estados = defaultdict(Counter)
+        self.resultados = Counter()
+        self.ejemplos = {}
+        self.candado = threading.Lock()
+
+        operaciones = list(MEZCLA)
+        pesos = list(MEZCLA.values())
+        fin = time.monotonic() + options['duracion']
+
+        def trabajar():
+            while time.monotonic() < fin:
+                operacion = random.choices(operaciones, pesos)[0]
+                if operacion == 'registrar_inscripcion':
+                    try:
+                        numero_control = pendientes.get_nowait()
+                    except Empty:
+                        return
+                    self.registrar(numero_control, especialidades, talleres)
+                elif operacion == 'generar_solicitud_pdf' and self.registrados:
+                    self.pedir('generar_solicitud_pdf', f'/api/pdf/{random.choice(self.registrados)}/')
+                elif operacion == 'catalogo':
+                    ruta = random.choice(['/api/talleres-disponibles/', '/api/especialidades-disponibles/'])
+                    self.pedir('catalogo', ruta)
+                else:
+                    numero_control = random.randrange(NUMERO_CONTROL_BASE, NUMERO_CONTROL_BASE + total)
+                    self.pedir('buscar_alumno', f'/api/buscar-alumno/{numero_control}/')
+
+        inicio = time.perf_counter()
+        trabajadores = [threading.Thread(target=trabajar) for _ in range(options['hilos'])]
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+        duracion = time.perf_counter() - inicio
+
+        try:
+            self.reportar(duracion)
+            self.verificar(total, especialidades, talleres)
+        finally:
+            if not options['conservar']:
+                self.limpiar(total, especialidades, talleres)
+
+    def pedir(self, nombre, ruta, cuerpo=None, encabezados=None):
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else None
+        peticion = Request(self.url + ruta, data=datos, headers={
+            'Content-Type': 'application/json', **(encabezados or {})
+        })
+        inicio = time.perf_counter()
+        try:
+            with urlopen(peticion, timeout=self.timeout) as respuesta:
+                estado, contenido, reintentar = respuesta.status, respuesta.read(), None
+        except HTTPError as error:
+            estado, contenido, reintentar = error.code, error.read(), error.headers.get('Retry-After')
+        except (URLError, OSError):
+            estado, contenido, reintentar = 'conexión', b'', None
+        duracion = time.perf_counter() - inicio
+        with self.candado:
+            self.latencias[nombre].append(duracion)
+            self.estados[nombre][estado] += 1
+            if (estado == 'conexión' or estado >= 500) and nombre not in self.ejemplos:
+                self.ejemplos[nombre] = f'{estado} {contenido[:300].decode(errors="replace")}'
+        return estado, contenido, reintentar
+
+    def registrar(self, numero_control, especialidades, talleres):
+        # Cliente que reintenta con la misma Idempotency-Key cuando recibe 503.
+        cuerpo = {'numero_control': numero_control, 'taller_id': random.choice(talleres).pk}
+        if numero_control % 2 == 0:
+            cuerpo['especialidad_id'] = random.choice(especialidades).pk
+        encabezados = {'Idempotency-Key': uuid.uuid4().hex}
+        for _ in range(5):
+            estado, contenido, reintentar = self.pedir(
+                'registrar_inscripcion', '/api/registrar-inscripcion/', cuerpo, encabezados
+            )
+            if estado != 503:
+                break
+            time.sleep(min(float(reintentar or 1), 5))
+
+        with self.candado:
+            if estado == 201:
+                self.resultados['registradas'] += 1
+                self.registrados.append(numero_control)
+            elif estado == 400:
+                self.resultados['rechazadas'] += 1
+            else:
+                self.resultados[f'estado {estado}'] += 1
+
+    def sembrar(self, total, num_especialidades, num_talleres):
+        verificar_rango(NUMERO_CONTROL_BASE, total)
+        especialidades = [
+            Especialidad.objects.create(nombre=f'SIM Especialidad {codigo}', codigo=codigo)
+            for codigo in codigos_libres(num_especialidades)
+        ]
+        talleres = [Taller.objects.create(nombre=f'SIM Taller {i}') for i in range(num_talleres)]
+        # Semestre 2 elige especialidad; semestre 4 la hereda de su grupo.
+        alumnos = []
+        for i in range(total):
+            numero_control = NUMERO_CONTROL_BASE + i
+            par = numero_control % 2 == 0
+            alumno = Alumno(
+                numero_control=numero_control,
+                nombres='Sim',
+                apellido_paterno='Alumno',
+                apellido_materno=str(i),
+                grupo_anterior='2A' if par else f'4{random.choice(especialidades).codigo}',
+                semestre_anterior=2 if par else 4,
+            )
+            alumno.clave_busqueda = busqueda.clave_busqueda(alumno.nombres, alumno.apellido_paterno, alumno.apellido_materno)
+            alumnos.append(alumno)
+        Alumno.objects.bulk_create(alumnos)
+        catalogo.invalidar()
+        busqueda.invalidar()
+        return especialidades, talleres
+
+    def reportar(self, duracion):
+        self.stdout.write(f'duración: {duracion:.1f} s')
+        for nombre in MEZCLA:
+            latencias = sorted(self.latencias[nombre])
+            if not latencias:
+                continue
+            estados = ', '.join(f'{estado}: {n}' for estado, n in sorted(self.estados[nombre].items(), key=str))
+            self.stdout.write(
+                f'{nombre:>22}: {len(latencias)} peticiones ({len(latencias) / duracion:.1f}/s), '
+                f'p50 {_percentil(latencias, 0.5) * 1000:.0f} ms, p95 {_percentil(latencias, 0.95) * 1000:.0f} ms, '
+                f'p99 {_percentil(latencias, 0.99) * 1000:.0f} ms [{estados}]'
+            )
+        for nombre, ejemplo in self.ejemplos.items():
+            self.stdout.write(f'primer error de {nombre}: {ejemplo}')
+        self.stdout.write('registros: ' + ', '.join(f'{k}={v}' for k, v in sorted(self.resultados.items())))
+
+    def verificar(self, total, especialidades, talleres):
+        fallas = []
+        for modelo, cursos, campo in ((Especialidad, especialidades, 'especialidad'), (Taller, talleres, 'taller')):
+            fichas = dict(
+                FichaInscripcion.objects.filter(**{f'{campo}__in': cursos})
+                .values_list(campo).annotate(total=Count('pk'))
+            )
+            totales = ocupados(modelo, [c.pk for c in cursos])
+            for curso in modelo.objects.filter(pk__in=[c.pk for c in cursos]):
+                curso.cantidad = totales[curso.pk]
+                reales = fichas.get(curso.pk, 0)
+                self.stdout.write(f'{curso.nombre}: cantidad={curso.cantidad} fichas={reales} (cupo {modelo.CUPO_MAXIMO})')
+                if curso.cantidad > modelo.CUPO_MAXIMO:
+                    fallas.append(f'{curso.nombre} se sobrevendió')
+                if curso.cantidad != reales:
+                    fallas.append(f'el contador de {curso.nombre} no coincide con sus fichas')
+
+        fichas_simuladas = FichaInscripcion.objects.filter(
+            alumno__numero_control__range=(NUMERO_CONTROL_BASE, NUMERO_CONTROL_BASE + total - 1)
+        ).count()
+        if fichas_simuladas != self.resultados['registradas']:
+            fallas.append(
+                f'{self.resultados["registradas"]} registros exitosos pero {fichas_simuladas} fichas en la base'
+            )
+        if fallas:
+            raise CommandError('; '.join(fallas))
+        self.stdout.write('invariantes correctos')
+
+    def limpiar(self, total, especialidades, talleres):
+        # sembrar() comprobó que el rango estaba vacío: todo lo que hay en él es de esta corrida.
+        rango = (NUMERO_CONTROL_BASE, NUMERO_CONTROL_BASE + total - 1)
+        FichaInscripcion.objects.filter(alumno__numero_control__range=rango).delete()
+        Alumno.objects.filter(numero_control__range=rango).delete()
+        Especialidad.objects.filter(pk__in=[e.pk for e in especialidades]).delete()
+        Taller.objects.filter(pk__in=[t.pk for t in talleres]).delete()
+        catalogo.invalidar()
+        busqueda.invalidar()
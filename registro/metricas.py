@@ -0,0 +1,100 @@
+import os
+import time
+
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from . import catalogo
+
+# Métricas en formato Prometheus. Con varios workers de gunicorn cada proceso
+# escribe sus valores en PROMETHEUS_MULTIPROC_DIR (ver start.sh y
+# gunicorn.conf.py) y /metrics los suma; sin esa variable se usa el registro
+# del propio proceso. Los cupos salen de la instantánea del catálogo que ya
+# tiene el worker que atiende el scrape, sin consultar la base.
+
+BUCKETS_PETICION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+PETICION_SEGUNDOS = Histogram(
+    'registro_peticion_segundos', 'Duración de las peticiones por vista.',
+    ['vista', 'metodo'], buckets=BUCKETS_PETICION,
+)
+PETICIONES_ERROR = Counter(
+    'registro_peticiones_error', 'Respuestas 4xx y 5xx por vista.',
+    ['vista', 'clase'],
+)
+PDF_SEGUNDOS = Histogram(
+    'registro_pdf_render_segundos', 'Tiempo de render de solicitudes PDF por petición.',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+BD_CONSULTAS = Histogram(
+    'registro_bd_consultas_por_peticion', 'Consultas SQL por petición.',
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+BD_CONEXIONES = Gauge(
+    'registro_bd_conexiones', 'Conexiones a la base por estado (pool de cada worker vivo).',
+    ['bd', 'estado'], multiprocess_mode='livesum',
+)
+
+
+def observar_peticion(datos, pdf_segundos=None):
+    vista = datos['vista'] or 'sin_ruta'
+    PETICION_SEGUNDOS.labels(vista, datos['metodo']).observe(datos['duracion_ms'] / 1000)
+    if datos['estado'] >= 400:
+        PETICIONES_ERROR.labels(vista, f'{datos["estado"] // 100}xx').inc()
+    if pdf_segundos is not None:
+        PDF_SEGUNDOS.observe(pdf_segundos)
+    BD_CONSULTAS.observe(datos['consultas'])
+
+    for alias in connections:
+        conexion = connections[alias]
+        pool = getattr(conexion, 'pool', None)
+        if pool is not None:
+            estadisticas = pool.estadisticas()
+            BD_CONEXIONES.labels(alias, 'en_uso').set(estadisticas['en_uso'])
+            BD_CONEXIONES.labels(alias, 'libres').set(estadisticas['libres'])
+        else:
+            BD_CONEXIONES.labels(alias, 'abiertas').set(int(conexion.connection is not None))
+
+
+class CuposCollector:
+    def collect(self):
+        # Se usa la instantánea que el worker ya tiene (la renuevan las
+        # peticiones normales); solo se carga si el proceso aún no tiene una.
+        # La antigüedad se publica para saber qué tan atrasados pueden estar.
+        instantanea = catalogo.ultima() or catalogo.obtener()
+        antiguedad = GaugeMetricFamily(
+            'registro_cupos_antiguedad_segundos', 'Edad de la instantánea del catálogo usada para los cupos.'
+        )
+        antiguedad.add_metric([], time.monotonic() - instantanea['cargada_en'])
+        yield antiguedad
+        disponibles = GaugeMetricFamily(
+            'registro_cupos_disponibles', 'Lugares libres por curso.', labels=['tipo', 'curso']
+        )
+        ocupados = GaugeMetricFamily(
+            'registro_cupos_ocupados', 'Lugares ocupados por curso.', labels=['tipo', 'curso']
+        )
+        for esp in instantanea['especialidades']:
+            disponibles.add_metric(['especialidad', esp['codigo']], esp['fichas_disponibles'])
+            ocupados.add_metric(['especialidad', esp['codigo']], esp['cantidad'])
+        for taller in instantanea['talleres']:
+            disponibles.add_metric(['taller', taller['nombre']], taller['fichas_disponibles'])
+            ocupados.add_metric(['taller', taller['nombre']], taller['cantidad'])
+        yield disponibles
+        yield ocupados
+
+
+def metricas(request):
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        procesos = CollectorRegistry()
+        MultiProcessCollector(procesos)
+        contenido = generate_latest(procesos)
+    else:
+        contenido = generate_latest(REGISTRY)
+
+    cupos = CollectorRegistry()
+    cupos.register(CuposCollector())
+    contenido += generate_latest(cupos)
+    return HttpResponse(contenido, content_type=CONTENT_TYPE_LATEST)
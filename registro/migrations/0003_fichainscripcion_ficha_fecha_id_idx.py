@@ -0,0 +1,17 @@
+# Generated by Django 5.0.4 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0002_alter_especialidad_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fichainscripcion',
+            index=models.Index(fields=['-fecha_solicitud', '-id_inscripcion'], name='ficha_fecha_id_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.4 on 2026-10-18 14:25
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Copia de registro.busqueda al momento de esta migración, para que cambios
+# posteriores en ese módulo no alteren cómo se migra desde cero.
+def clave_busqueda(nombres, apellido_paterno, apellido_materno):
+    texto = f'{apellido_paterno} {apellido_materno} {nombres}'
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.lower().split())[:160]
+
+
+def llenar_clave_busqueda(apps, schema_editor):
+    Alumno = apps.get_model('registro', 'Alumno')
+    alumnos = []
+    for alumno in Alumno.objects.only('nombres', 'apellido_paterno', 'apellido_materno').iterator(chunk_size=2000):
+        alumno.clave_busqueda = clave_busqueda(alumno.nombres, alumno.apellido_paterno, alumno.apellido_materno)
+        alumnos.append(alumno)
+        if len(alumnos) >= 2000:
+            Alumno.objects.bulk_update(alumnos, ['clave_busqueda'])
+            alumnos = []
+    if alumnos:
+        Alumno.objects.bulk_update(alumnos, ['clave_busqueda'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0003_fichainscripcion_ficha_fecha_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alumno',
+            name='clave_busqueda',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=160),
+        ),
+        migrations.RunPython(llenar_clave_busqueda, migrations.RunPython.noop),
+    ]
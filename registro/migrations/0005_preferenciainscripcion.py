@@ -0,0 +1,30 @@
+# Generated by Django 5.0.4 on 2026-10-18 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0004_alumno_clave_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PreferenciaInscripcion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semestre_inscripcion', models.IntegerField()),
+                ('especialidades', models.JSONField(blank=True, default=list)),
+                ('talleres', models.JSONField(blank=True, default=list)),
+                ('fecha_registro', models.DateTimeField(auto_now=True)),
+                ('alumno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='registro.alumno')),
+            ],
+            options={
+                'verbose_name': 'Preferencia de Inscripción',
+                'verbose_name_plural': 'Preferencias de Inscripción',
+                'unique_together': {('alumno', 'semestre_inscripcion')},
+            },
+        ),
+    ]
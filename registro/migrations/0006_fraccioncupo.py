@@ -0,0 +1,29 @@
+# Generated by Django 5.0.4 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0005_preferenciainscripcion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FraccionCupo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=20)),
+                ('curso', models.IntegerField()),
+                ('indice', models.IntegerField()),
+                ('cantidad', models.IntegerField(default=0)),
+                ('capacidad', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Fracción de Cupo',
+                'verbose_name_plural': 'Fracciones de Cupo',
+                'unique_together': {('tipo', 'curso', 'indice')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0006_fraccioncupo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alumno',
+            name='clave_busqueda',
+            field=models.CharField(blank=True, editable=False, max_length=160),
+        ),
+    ]
@@ -1,6 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 
+from . import busqueda, catalogo, cupos, grupos, replicas
+from .cupos import reservar_lugar
+from .pdf import invalidar_cacheado
+
 class Alumno(models.Model):
     numero_control = models.IntegerField(primary_key=True)
     nombres = models.CharField(max_length=50, db_collation='utf8mb4_unicode_ci')
@@ -8,10 +12,16 @@ class Alumno(models.Model):
     apellido_materno = models.CharField(max_length=50)
     grupo_anterior = models.CharField(max_length=10)
     semestre_anterior = models.IntegerField()
+    clave_busqueda = models.CharField(max_length=busqueda.LONGITUD_CLAVE, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.nombres} {self.apellido_paterno} ({self.numero_control})"
 
+    def save(self, *args, **kwargs):
+        self.clave_busqueda = busqueda.clave_busqueda(self.nombres, self.apellido_paterno, self.apellido_materno)
+        super().save(*args, **kwargs)
+        transaction.on_commit(busqueda.invalidar)
+
     @property
     def puede_elegir_especialidad(self):
         return self.semestre_anterior == 2
@@ -22,11 +32,13 @@ class Especialidad(models.Model):
     codigo = models.CharField(max_length=2)
     cantidad = models.IntegerField(default=0)
 
+    CUPO_MAXIMO = 40
+
     def __str__(self):
         return f"{self.nombre} ({self.codigo})"
 
     def fichas_disponibles(self):
-        return 40 - self.cantidad
+        return self.CUPO_MAXIMO - cupos.cantidad_actual(self)
 
     class Meta:
         verbose_name_plural = "Especialidades"
@@ -36,15 +48,33 @@ class Taller(models.Model):
     nombre = models.CharField(max_length=50)
     cantidad = models.IntegerField(default=0)
 
+    CUPO_MAXIMO = 30
+
     def __str__(self):
         return self.nombre
 
     def fichas_disponibles(self):
-        return 30 - self.cantidad
+        return self.CUPO_MAXIMO - cupos.cantidad_actual(self)
 
     class Meta:
         verbose_name_plural = "Talleres"
 
+class FraccionCupo(models.Model):
+    # Parte del contador de un curso cuando CUPOS_FRACCIONES > 1 (ver registro/cupos.py).
+    tipo = models.CharField(max_length=20)
+    curso = models.IntegerField()
+    indice = models.IntegerField()
+    cantidad = models.IntegerField(default=0)
+    capacidad = models.IntegerField()
+
+    def __str__(self):
+        return f"{self.tipo} {self.curso} [{self.indice}]: {self.cantidad}/{self.capacidad}"
+
+    class Meta:
+        verbose_name = "Fracción de Cupo"
+        verbose_name_plural = "Fracciones de Cupo"
+        unique_together = ['tipo', 'curso', 'indice']
+
 class FichaInscripcion(models.Model):
     id_inscripcion = models.AutoField(primary_key=True)
     alumno = models.ForeignKey(Alumno, on_delete=models.CASCADE)
@@ -80,24 +110,36 @@ class FichaInscripcion(models.Model):
         
         is_new = self.pk is None
         
-        super().save(*args, **kwargs)
-        
-        if is_new:
-            if self.especialidad:
-                self.especialidad.cantidad += 1
-                self.especialidad.save()
-            if self.taller:
-                self.taller.cantidad += 1
-                self.taller.save()
+        # El cupo se aparta con un UPDATE condicional por curso; si no afecta
+        # ninguna fila el curso se llenó entre la validación y el guardado, y
+        # la ficha recién insertada se revierte junto con el savepoint.
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+
+                if is_new:
+                    if self.especialidad and not reservar_lugar(Especialidad, self.especialidad.pk):
+                        raise ValidationError(f"No hay cupo disponible en la especialidad {self.especialidad.nombre}")
+                    if self.taller and not reservar_lugar(Taller, self.taller.pk):
+                        raise ValidationError(f"No hay cupo disponible en el taller {self.taller.nombre}")
+
+                    if self.especialidad or self.taller:
+                        transaction.on_commit(catalogo.invalidar)
+        except ValidationError:
+            if is_new:
+                self.pk = None
+            raise
+
+        transaction.on_commit(lambda: invalidar_cacheado(self.alumno_id))
+        transaction.on_commit(lambda: replicas.fijar_alumnos([self.alumno_id]))
 
     def asignar_especialidad_existente(self):
         
         if not self.alumno or self.alumno.semestre_anterior <= 2:
             return
             
-        grupo_anterior_str = str(self.alumno.grupo_anterior)
-        if len(grupo_anterior_str) >= 3:
-            codigo_especialidad = grupo_anterior_str[-2:]
+        codigo_especialidad = grupos.codigo_especialidad(self.alumno.grupo_anterior)
+        if codigo_especialidad:
             try:
                 especialidad = Especialidad.objects.get(codigo=codigo_especialidad)
                 self.especialidad = especialidad
@@ -114,9 +156,8 @@ class FichaInscripcion(models.Model):
             else:
                 return f"{self.semestre_inscripcion}00"
         else:
-            grupo_anterior_str = str(self.alumno.grupo_anterior)
-            if len(grupo_anterior_str) >= 3:
-                codigo_especialidad = grupo_anterior_str[-2:]
+            codigo_especialidad = grupos.codigo_especialidad(self.alumno.grupo_anterior)
+            if codigo_especialidad:
                 return f"{self.semestre_inscripcion}{codigo_especialidad}"
             else:
                 return f"{self.semestre_inscripcion}00"
@@ -127,4 +168,25 @@ class FichaInscripcion(models.Model):
     class Meta:
         verbose_name = "Ficha de Inscripción"
         verbose_name_plural = "Fichas de Inscripción"
-        unique_together = ['alumno', 'semestre_inscripcion']
\ No newline at end of file
+        unique_together = ['alumno', 'semestre_inscripcion']
+        indexes = [
+            models.Index(fields=['-fecha_solicitud', '-id_inscripcion'], name='ficha_fecha_id_idx'),
+        ]
+
+class PreferenciaInscripcion(models.Model):
+    # Preferencias en orden (ids de especialidad y de taller) capturadas
+    # durante la ventana de preferencias; manage.py asignar_preferencias las
+    # convierte en fichas al cerrarla (ver registro/preferencias.py).
+    alumno = models.ForeignKey(Alumno, on_delete=models.CASCADE)
+    semestre_inscripcion = models.IntegerField()
+    especialidades = models.JSONField(default=list, blank=True)
+    talleres = models.JSONField(default=list, blank=True)
+    fecha_registro = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Preferencias {self.alumno_id} - semestre {self.semestre_inscripcion}"
+
+    class Meta:
+        verbose_name = "Preferencia de Inscripción"
+        verbose_name_plural = "Preferencias de Inscripción"
+        unique_together = ['alumno', 'semestre_inscripcion']
@@ -0,0 +1,95 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def codificar_cursor(fecha_solicitud, id_inscripcion):
+    contenido = json.dumps([fecha_solicitud.isoformat(), id_inscripcion]).encode()
+    return base64.urlsafe_b64encode(contenido).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        contenido = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        fecha, id_inscripcion = json.loads(contenido)
+        fecha = parse_datetime(fecha)
+        id_inscripcion = int(id_inscripcion)
+    except (TypeError, ValueError):
+        raise ValueError('Cursor no válido')
+    if fecha is None:
+        raise ValueError('Cursor no válido')
+    return fecha, id_inscripcion
+
+
+def _despues_de(fichas_query, fecha, id_inscripcion):
+    return fichas_query.filter(
+        Q(fecha_solicitud__lt=fecha) |
+        Q(fecha_solicitud=fecha, id_inscripcion__lt=id_inscripcion)
+    )
+
+
+def leer_por_pagina(valor):
+    # Con per_page < 1 el corte [:per_page + 1] de la consulta falla y el
+    # Paginator divide entre cero; se rechaza antes como parámetro no válido.
+    per_page = int(valor)
+    if per_page < 1:
+        raise ValueError('per_page debe ser mayor que cero')
+    return per_page
+
+
+def pagina_por_cursor(fichas_query, cursor, per_page):
+    # fichas_query debe venir ordenado por ('-fecha_solicitud', '-id_inscripcion').
+    if cursor:
+        fichas_query = _despues_de(fichas_query, *decodificar_cursor(cursor))
+
+    fichas = list(fichas_query[:per_page + 1])
+    siguiente = None
+    if len(fichas) > per_page:
+        fichas = fichas[:per_page]
+        ultima = fichas[-1]
+        siguiente = codificar_cursor(ultima.fecha_solicitud, ultima.id_inscripcion)
+    return fichas, siguiente
+
+
+async def apagina_por_cursor(fichas_query, cursor, per_page):
+    if cursor:
+        fichas_query = _despues_de(fichas_query, *decodificar_cursor(cursor))
+
+    fichas = [ficha async for ficha in fichas_query[:per_page + 1]]
+    siguiente = None
+    if len(fichas) > per_page:
+        fichas = fichas[:per_page]
+        ultima = fichas[-1]
+        siguiente = codificar_cursor(ultima.fecha_solicitud, ultima.id_inscripcion)
+    return fichas, siguiente
+
+
+def pagina_numerada(page, total, per_page):
+    # Mismas reglas que Paginator en la vista síncrona: un número no válido
+    # lleva a la primera página y uno fuera de rango a la última.
+    paginas = max(1, -(-total // per_page))
+    try:
+        numero = int(page)
+    except (TypeError, ValueError):
+        return 1, paginas
+    if numero < 1 or numero > paginas:
+        numero = paginas
+    return numero, paginas
+
+
+def recorrer_por_cursor(fichas_query, campos, tamano=2000):
+    # MySQL entrega el resultado completo de cada consulta al driver, así que
+    # iterator() no basta para mantener la memoria plana: se piden bloques de
+    # `tamano` filas avanzando por el índice (fecha_solicitud, id_inscripcion).
+    fichas_query = fichas_query.order_by('-fecha_solicitud', '-id_inscripcion')
+    campos = ('fecha_solicitud', 'id_inscripcion') + tuple(campos)
+    consulta = fichas_query
+    while True:
+        filas = list(consulta.values_list(*campos)[:tamano])
+        for fila in filas:
+            yield fila[2:]
+        if len(filas) < tamano:
+            return
+        consulta = _despues_de(fichas_query, filas[-1][0], filas[-1][1])
@@ -0,0 +1,435 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from functools import partial
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from PIL import Image as PILImage
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.pdfbase.pdfdoc import PDFImageXObject
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Flowable, Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from .instrumentacion import medir
+
+# Cambiar cuando cambie el diseño de la solicitud para no servir PDFs viejos de la caché.
+VERSION_PLANTILLA = '1'
+
+RUTA_LOGO = str(Path(__file__).resolve().parent / 'static' / 'logo.png')
+
+CAMPOS_SOLICITUD = (
+    'alumno__numero_control',
+    'alumno__nombres',
+    'alumno__apellido_paterno',
+    'alumno__apellido_materno',
+    'alumno__grupo_anterior',
+    'alumno__semestre_anterior',
+    'semestre_inscripcion',
+    'especialidad__nombre',
+    'taller__nombre',
+    'fecha_solicitud',
+)
+
+CAMPOS_PLANTILLA = (
+    'numero_control',
+    'nombre_completo',
+    'semestre_inscripcion',
+    'especialidad',
+    'taller',
+    'grupo_anterior',
+    'semestre_anterior',
+    'fecha_solicitud',
+)
+
+
+def datos_solicitud(fila):
+    return {
+        'numero_control': str(fila['alumno__numero_control']),
+        'nombre_completo': f"{fila['alumno__nombres']} {fila['alumno__apellido_paterno']} {fila['alumno__apellido_materno']}",
+        'semestre_inscripcion': str(fila['semestre_inscripcion']),
+        'especialidad': fila['especialidad__nombre'] or '',
+        'taller': fila['taller__nombre'] or '',
+        'grupo_anterior': str(fila['alumno__grupo_anterior']),
+        'semestre_anterior': str(fila['alumno__semestre_anterior']),
+        'fecha_solicitud': fila['fecha_solicitud'].strftime('%d/%m/%Y'),
+    }
+
+
+def huella_solicitud(datos):
+    contenido = '\x1f'.join([VERSION_PLANTILLA, settings.PDF_MODO] + [f'{clave}={datos[clave]}' for clave in sorted(datos)])
+    return hashlib.sha256(contenido.encode()).hexdigest()[:32]
+
+
+def _documento(buffer):
+    return SimpleDocTemplate(buffer, pagesize=letter,
+                             rightMargin=40, leftMargin=40,
+                             topMargin=30, bottomMargin=40)
+
+
+def _elementos(datos, logo=RUTA_LOGO):
+    elements = []
+    styles = getSampleStyleSheet()
+
+    header_style = ParagraphStyle(
+        'header',
+        parent=styles['Normal'],
+        fontSize=10,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#003366'),
+        spaceAfter=3
+    )
+
+    title_style = ParagraphStyle(
+        'title',
+        parent=styles['Heading1'],
+        fontSize=14,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#003366'),
+        spaceAfter=10,
+        fontName='Helvetica-Bold'
+    )
+
+    field_style = ParagraphStyle(
+        'field',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceAfter=5
+    )
+
+    section_style = ParagraphStyle(
+        'section',
+        parent=styles['Normal'],
+        fontSize=11,
+        fontName='Helvetica-Bold',
+        spaceAfter=8
+    )
+
+    try:
+        logo = Image(logo, width=90, height=90)
+    except Exception:
+        logo = Paragraph("<b>[LOGO]</b>", field_style)
+    
+    encabezado_data = [
+        [logo, Paragraph(
+            "<b>SECRETARÍA DE EDUCACIÓN PÚBLICA<br/>"
+            "SUBSECRETARÍA DE EDUCACIÓN MEDIA SUPERIOR<br/>"
+            "DIRECCIÓN GENERAL DE BACHILLERATO<br/>"
+            "<br/>"
+            "PREPARATORIA FEDERAL POR COOPERACIÓN<br/>"
+            "\"VALENTÍN GÓMEZ FARÍAS\"<br/>"
+            "C.C.T. 17EBH0027O</b>"
+            , header_style)]
+    ]
+    encabezado_table = Table(encabezado_data, colWidths=[100, 450])
+    encabezado_table.setStyle(TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('ALIGN', (1, 0), (1, 0), 'CENTER'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 5),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 5),
+    ]))
+    elements.append(encabezado_table)
+    elements.append(Spacer(1, 15))
+
+    datos_basicos = [
+        [f"Número De Control: {datos['numero_control']}", f"Nombre Completo: {datos['nombre_completo']}"]
+    ]
+    tabla_basicos = Table(datos_basicos, colWidths=[200, 350])
+    tabla_basicos.setStyle(TableStyle([
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 5),
+    ]))
+    elements.append(tabla_basicos)
+    elements.append(Spacer(1, 15))
+
+    datos_reinscripcion = [
+        ["DATOS DE REINSCRIPCIÓN"],
+        ["SEMESTRE", "ESPECIALIDAD", "TALLER"],
+        [datos['semestre_inscripcion'], datos['especialidad'], datos['taller']]
+    ]
+    tabla_reinscripcion = Table(datos_reinscripcion, colWidths=[183, 183, 184])
+    tabla_reinscripcion.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('SPAN', (0, 0), (-1, 0)),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#E8E8E8")),
+        ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor("#F0F0F0")),
+    ]))
+    elements.append(tabla_reinscripcion)
+    elements.append(Spacer(1, 15))
+
+    datos_ultimo_semestre = [
+        ["DATOS ULTIMO SEMESTRE CURSADO"],
+        ["GRUPO ANTERIOR", "SEMESTRE ANTERIOR"],
+        [datos['grupo_anterior'], datos['semestre_anterior']]
+    ]
+    tabla_ultimo = Table(datos_ultimo_semestre, colWidths=[275, 275])
+    tabla_ultimo.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('SPAN', (0, 0), (-1, 0)),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#E8E8E8")),
+        ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor("#F0F0F0")),
+    ]))
+    elements.append(tabla_ultimo)
+    elements.append(Spacer(1, 15))
+
+    materias_header = [
+        ["MATERIAS QUE ADEUDAN EN LOS SEMESTRES ANTERIORES"],
+        ["MATERIA", "PERIODO", "SEMESTRE"]
+    ]
+    materias_rows = [["", "", ""] for _ in range(6)]
+    
+    materias_data = materias_header + materias_rows
+    tabla_materias = Table(materias_data, colWidths=[250, 150, 150])
+    tabla_materias.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('SPAN', (0, 0), (-1, 0)),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#E8E8E8")),
+        ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor("#F0F0F0")),
+    ]))
+    elements.append(tabla_materias)
+    elements.append(Spacer(1, 15))
+
+    observaciones_data = [
+        ["OBSERVACIONES"],
+        [""]
+    ]
+    tabla_observaciones = Table(observaciones_data, colWidths=[550], rowHeights=[25, 60])
+    tabla_observaciones.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('BACKGROUND', (0, 0), (0, 0), colors.HexColor("#E8E8E8")),
+        ('VALIGN', (0, 1), (0, 1), 'TOP'),
+    ]))
+    elements.append(tabla_observaciones)
+    elements.append(Spacer(1, 20))
+
+    firma_data = [
+        ["FIRMA DE CONTROL ESCOLAR"],
+        [""],
+        [f"FECHA DE SOLICITUD: {datos['fecha_solicitud']}"]
+    ]
+    tabla_firma = Table(firma_data, colWidths=[275], rowHeights=[25, 50, 25])
+    tabla_firma.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 2), (0, 2), 'Helvetica-Bold'),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('BACKGROUND', (0, 0), (0, 0), colors.HexColor("#E8E8E8")),
+    ]))
+    elements.append(tabla_firma)
+    return elements
+
+
+def renderizar_solicitud(datos):
+    buffer = BytesIO()
+    _documento(buffer).build(_elementos(datos))
+    return buffer.getvalue()
+
+
+# Modo plantilla: todo lo que no depende del alumno se maqueta una sola vez por
+# proceso y se dibuja como un Form XObject; cada solicitud solo escribe encima
+# los textos del alumno en las posiciones que ocupaban en la maquetación.
+
+MARCA = '\x00'
+_PATRON_MARCA = re.compile(MARCA + r'(\w+)' + MARCA)
+NOMBRE_FORMA = 'plantillaSolicitud'
+
+_candado_plantilla = threading.Lock()
+_plantilla = None
+
+
+class _Ubicado(Flowable):
+    def __init__(self, contenido):
+        super().__init__()
+        self.contenido = contenido
+        self.hAlign = getattr(contenido, 'hAlign', 'LEFT')
+        self.origen = None
+
+    def wrap(self, ancho, alto):
+        self.width, self.height = self.contenido.wrap(ancho, alto)
+        return self.width, self.height
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        x = self._hAlignAdjust(x, _sW)
+        self.origen = (x, y)
+        self.contenido.drawOn(canvas, x, y)
+
+
+class _CanvasSolicitud(Canvas):
+    # Los textos con marca pertenecen al alumno: al maquetar la plantilla se
+    # registra dónde quedaron y al dibujar la forma se omiten.
+    def __init__(self, *args, marcadores=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.marcadores = marcadores
+
+    def _marcar(self, metodo, x, y, texto):
+        if self.marcadores is not None:
+            x, y = self.absolutePosition(x, y)
+            self.marcadores.append((metodo, x, y, self._fontname, self._fontsize, self._fillColorObj, texto))
+
+    def drawString(self, x, y, text, *args, **kwargs):
+        if MARCA in text:
+            self._marcar('drawString', x, y, text)
+        else:
+            super().drawString(x, y, text, *args, **kwargs)
+
+    def drawCentredString(self, x, y, text, *args, **kwargs):
+        if MARCA in text:
+            self._marcar('drawCentredString', x, y, text)
+        else:
+            super().drawCentredString(x, y, text, *args, **kwargs)
+
+
+def nuevo_canvas(destino):
+    return _CanvasSolicitud(destino, pagesize=letter)
+
+
+def _logo_jpeg():
+    # Un JPEG en disco se incrusta tal cual (DCTDecode); el PNG con alfa se
+    # tendría que descomprimir y volver a comprimir en cada documento.
+    ruta = Path(tempfile.gettempdir()) / f'inscripciones_logo_{int(os.path.getmtime(RUTA_LOGO))}.jpg'
+    if not ruta.exists():
+        with PILImage.open(RUTA_LOGO) as original:
+            fondo = PILImage.new('RGB', original.size, 'white')
+            fondo.paste(original, mask=original.convert('RGBA').getchannel('A'))
+        temporal = ruta.with_suffix(f'.{os.getpid()}.tmp')
+        fondo.save(temporal, 'JPEG', quality=90)
+        os.replace(temporal, ruta)
+    return str(ruta)
+
+
+def _construir_plantilla():
+    try:
+        logo = _logo_jpeg()
+    except Exception:
+        logo = RUTA_LOGO
+
+    marcas = {campo: f'{MARCA}{campo}{MARCA}' for campo in CAMPOS_PLANTILLA}
+    ubicados = [_Ubicado(elemento) for elemento in _elementos(marcas, logo)]
+    marcadores = []
+    _documento(BytesIO()).build(list(ubicados), canvasmaker=partial(_CanvasSolicitud, marcadores=marcadores))
+
+    elementos = [
+        (ubicado.contenido, ubicado.origen[0], ubicado.origen[1])
+        for ubicado in ubicados if ubicado.origen is not None
+    ]
+
+    # El stream del logo ya codificado se guarda para no leerlo ni volver a
+    # codificarlo (ASCII85) en cada documento.
+    prueba = nuevo_canvas(BytesIO())
+    _dibujar_forma(prueba, elementos)
+    imagenes = [
+        (nombre, {clave: valor for clave, valor in vars(objeto).items() if clave != '__InternalName__'})
+        for nombre, objeto in prueba._doc.idToObject.items()
+        if isinstance(objeto, PDFImageXObject)
+    ]
+
+    return {'elementos': elementos, 'marcadores': marcadores, 'imagenes': imagenes}
+
+
+def _dibujar_forma(c, elementos):
+    c.beginForm(NOMBRE_FORMA)
+    for elemento, x, y in elementos:
+        elemento.drawOn(c, x, y)
+    c.endForm()
+
+
+def obtener_plantilla():
+    global _plantilla
+
+    if _plantilla is None:
+        with _candado_plantilla:
+            if _plantilla is None:
+                _plantilla = _construir_plantilla()
+    return _plantilla
+
+
+def dibujar_solicitud(c, datos):
+    plantilla = obtener_plantilla()
+
+    if not c.hasForm(NOMBRE_FORMA):
+        # Mismo registro que hace Canvas.drawImage la primera vez que ve una
+        # imagen; al dibujar la forma, drawImage la encuentra ya registrada.
+        # Son internos de reportlab: la versión va fija en requirements.txt.
+        for nombre, atributos in plantilla['imagenes']:
+            if nombre not in c._doc.idToObject:
+                imagen = PDFImageXObject(atributos['name'])
+                vars(imagen).update(atributos)
+                c._setXObjects(imagen)
+                c._doc.Reference(imagen, nombre)
+                c._doc.addForm(imagen.name, imagen)
+
+        # Las tablas maquetadas se comparten entre hilos y guardan estado al dibujarse.
+        with _candado_plantilla:
+            _dibujar_forma(c, plantilla['elementos'])
+    c.doForm(NOMBRE_FORMA)
+
+    for metodo, x, y, fuente, tamano, color, texto in plantilla['marcadores']:
+        c.setFont(fuente, tamano)
+        c.setFillColor(color)
+        getattr(c, metodo)(x, y, _PATRON_MARCA.sub(lambda m: datos[m.group(1)], texto))
+
+
+def renderizar_solicitud_plantilla(datos):
+    buffer = BytesIO()
+    c = nuevo_canvas(buffer)
+    dibujar_solicitud(c, datos)
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def renderizar(datos):
+    with medir('pdf'):
+        if settings.PDF_MODO == 'platypus':
+            return renderizar_solicitud(datos)
+        return renderizar_solicitud_plantilla(datos)
+
+
+def _clave_alumno(numero_control):
+    return f'pdf:alumno:{numero_control}'
+
+
+def obtener_cacheado(huella):
+    return caches['pdf'].get(f'pdf:{huella}')
+
+
+def guardar_cacheado(numero_control, huella, contenido):
+    cache_pdf = caches['pdf']
+    cache_pdf.set(f'pdf:{huella}', contenido)
+    cache_pdf.set(_clave_alumno(numero_control), huella)
+
+
+def invalidar_cacheado(numero_control):
+    cache_pdf = caches['pdf']
+    huella = cache_pdf.get(_clave_alumno(numero_control))
+    if huella is not None:
+        cache_pdf.delete_many([f'pdf:{huella}', _clave_alumno(numero_control)])
@@ -0,0 +1,138 @@
+import hashlib
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import catalogo, cupos, replicas
+from .lote import aplicar_contadores, construir_ficha, especialidad_por_grupo
+from .models import Alumno, Especialidad, FichaInscripcion, PreferenciaInscripcion, Taller
+
+# Inscripción por ventana de preferencias: mientras está abierta los alumnos
+# solo guardan sus opciones en orden (un INSERT/UPDATE de su propia fila, sin
+# tocar los contadores); al cerrarla asignar_preferencias() reparte todos los
+# lugares en una pasada y escribe fichas y contadores en bloque.
+
+
+def _fecha(valor):
+    if not valor:
+        return None
+    fecha = parse_datetime(valor)
+    if fecha is not None and timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+def ventana_abierta(ahora=None):
+    inicio = _fecha(settings.PREFERENCIAS_INICIO)
+    fin = _fecha(settings.PREFERENCIAS_FIN)
+    if inicio is None or fin is None:
+        return False
+    return inicio <= (ahora or timezone.now()) < fin
+
+
+def prioridad(numero_control, fecha_registro, modo, semilla):
+    # 'sorteo' ordena por un hash del número de control, reproducible con la
+    # misma semilla y sin ventaja por registrarse primero; 'fecha' respeta el
+    # orden de registro.
+    if modo == 'fecha':
+        return (fecha_registro, numero_control)
+    return (hashlib.sha256(f'{semilla}:{numero_control}'.encode()).digest(), numero_control)
+
+
+def asignar(solicitudes, disponibles_especialidad, disponibles_taller):
+    # solicitudes: (clave, especialidades, talleres) en orden de prioridad. Cada
+    # alumno recibe la primera especialidad de su lista con lugar (si la lista
+    # no está vacía) y el primer taller con lugar. Devuelve {clave: (especialidad,
+    # taller)}, o {clave: None} si ninguna de sus especialidades tenía lugar.
+    resultado = {}
+    for clave, especialidades, talleres in solicitudes:
+        especialidad = None
+        if especialidades:
+            especialidad = next((pk for pk in especialidades if disponibles_especialidad.get(pk, 0) > 0), None)
+            if especialidad is None:
+                resultado[clave] = None
+                continue
+            disponibles_especialidad[especialidad] -= 1
+
+        taller = next((pk for pk in talleres if disponibles_taller.get(pk, 0) > 0), None)
+        if taller is not None:
+            disponibles_taller[taller] -= 1
+        resultado[clave] = (especialidad, taller)
+    return resultado
+
+
+def asignar_preferencias(modo=None, semilla=None, simular=False):
+    modo = modo or settings.PREFERENCIAS_PRIORIDAD
+    semilla = settings.PREFERENCIAS_SEMILLA if semilla is None else semilla
+
+    preferencias = list(PreferenciaInscripcion.objects.values_list(
+        'alumno_id', 'semestre_inscripcion', 'especialidades', 'talleres', 'fecha_registro'
+    ))
+    alumnos = Alumno.objects.in_bulk([alumno_id for alumno_id, *_ in preferencias])
+
+    with transaction.atomic():
+        # Se bloquean todos los cursos (en orden de llave, como lote.py) para
+        # que las reservas individuales esperen a que termine la asignación.
+        especialidades = {esp.pk: esp for esp in Especialidad.objects.select_for_update().order_by('pk')}
+        talleres = {taller.pk: taller for taller in Taller.objects.select_for_update().order_by('pk')}
+        especialidades_por_codigo = {esp.codigo: esp for esp in especialidades.values()}
+
+        # Las fichas existentes se leen ya con los bloqueos tomados: una
+        # inscripción individual confirmada antes de este punto no se duplica.
+        fichas_existentes = set(FichaInscripcion.objects.filter(
+            semestre_inscripcion__in={semestre for _, semestre, *_ in preferencias}
+        ).values_list('alumno_id', 'semestre_inscripcion'))
+        pendientes = sorted(
+            (
+                fila for fila in preferencias
+                if (fila[0], fila[1]) not in fichas_existentes and fila[0] in alumnos
+            ),
+            key=lambda fila: prioridad(fila[0], fila[4], modo, semilla),
+        )
+
+        solicitudes = []
+        for alumno_id, _, opciones_especialidad, opciones_taller, _ in pendientes:
+            alumno = alumnos[alumno_id]
+            if alumno.puede_elegir_especialidad:
+                opciones = opciones_especialidad
+            else:
+                fija = especialidad_por_grupo(alumno, especialidades_por_codigo)
+                opciones = [fija.pk] if fija else []
+            solicitudes.append((alumno_id, opciones, opciones_taller))
+
+        asignacion = asignar(
+            solicitudes,
+            cupos.disponibles(Especialidad, especialidades),
+            cupos.disponibles(Taller, talleres),
+        )
+
+        fichas = []
+        resumen = {'preferencias': len(preferencias), 'pendientes': len(pendientes),
+                   'asignadas': 0, 'primera_opcion': 0, 'sin_taller': 0, 'sin_lugar': []}
+        for alumno_id, opciones, opciones_taller in solicitudes:
+            lugar = asignacion[alumno_id]
+            if lugar is None:
+                resumen['sin_lugar'].append(alumno_id)
+                continue
+            especialidad_id, taller_id = lugar
+            resumen['asignadas'] += 1
+            if not opciones or opciones[0] == especialidad_id:
+                resumen['primera_opcion'] += 1
+            if opciones_taller and taller_id is None:
+                resumen['sin_taller'] += 1
+            fichas.append(construir_ficha(
+                alumnos[alumno_id], especialidades.get(especialidad_id), talleres.get(taller_id)
+            ))
+
+        if fichas and not simular:
+            FichaInscripcion.objects.bulk_create(fichas, batch_size=1000)
+            aplicar_contadores(Especialidad, Counter(f.especialidad_id for f in fichas if f.especialidad_id))
+            aplicar_contadores(Taller, Counter(f.taller_id for f in fichas if f.taller_id))
+
+            transaction.on_commit(catalogo.invalidar)
+            alumnos_registrados = [ficha.alumno_id for ficha in fichas]
+            transaction.on_commit(lambda: replicas.fijar_alumnos(alumnos_registrados))
+    return resumen
@@ -0,0 +1,101 @@
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+# Las lecturas van a la réplica solo dentro de una petición GET/HEAD que el
+# middleware haya marcado; comandos, tareas y peticiones de escritura leen de
+# la primaria. Tras una escritura el cliente (cookie) y el alumno (caché)
+# quedan fijados a la primaria REPLICA_FIJAR segundos, para que consultar_ficha
+# y el PDF vean la ficha recién registrada aunque la réplica vaya atrasada.
+
+COOKIE_FIJAR = 'fijar_primaria'
+METODOS_LECTURA = ('GET', 'HEAD', 'OPTIONS')
+
+_estado = ContextVar('replicas_estado', default=None)
+
+
+def replica_activa():
+    return 'replica' in settings.DATABASES
+
+
+def _clave_alumno(numero_control):
+    return f'replica:alumno:{numero_control}'
+
+
+def fijar_alumnos(numeros_control):
+    if replica_activa():
+        cache.set_many({_clave_alumno(n): True for n in numeros_control}, settings.REPLICA_FIJAR)
+
+
+def con_alias_actual(queryset):
+    # QuerySet.db consulta al enrutador en este momento. Un StreamingHttpResponse
+    # se recorre después de que el middleware restableció el estado, así que las
+    # consultas que se ejecutan al enviar la respuesta deben quedar ligadas
+    # antes a la base que corresponde a la petición.
+    return queryset.using(queryset.db)
+
+
+class EnrutadorReplica:
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if estado is None or estado['primaria'] or not replica_activa():
+            return 'default'
+        return 'replica'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Ambas bases tienen los mismos datos (la réplica es copia de la primaria).
+        return True
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _estado_inicial(self, request):
+        # Un diccionario mutable: process_view puede marcarlo aunque Django lo
+        # ejecute en otro hilo o contexto.
+        return {
+            'primaria': request.method not in METODOS_LECTURA or COOKIE_FIJAR in request.COOKIES,
+        }
+
+    def _marcar(self, request, response):
+        if request.method not in METODOS_LECTURA and response.status_code < 400 and replica_activa():
+            response.set_cookie(
+                COOKIE_FIJAR, '1', max_age=settings.REPLICA_FIJAR, httponly=True, samesite='Lax'
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _estado.set(self._estado_inicial(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _estado.reset(token)
+        return self._marcar(request, response)
+
+    async def __acall__(self, request):
+        token = _estado.set(self._estado_inicial(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _estado.reset(token)
+        return self._marcar(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        estado = _estado.get()
+        numero_control = view_kwargs.get('numero_control')
+        if estado is not None and not estado['primaria'] and numero_control is not None and replica_activa():
+            estado['primaria'] = bool(cache.get(_clave_alumno(numero_control)))
+        return None
@@ -0,0 +1,148 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+from .instrumentacion import medir
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Las funciones de este módulo reciben tuplas de values_list() en el orden de
+# los CAMPOS_* correspondientes, sin construir instancias de los modelos.
+CAMPOS_ALUMNO = (
+    'numero_control', 'nombres', 'apellido_paterno', 'apellido_materno',
+    'grupo_anterior', 'semestre_anterior',
+)
+
+CAMPOS_FICHA = (
+    'id_inscripcion',
+    'alumno__numero_control', 'alumno__nombres', 'alumno__apellido_paterno',
+    'alumno__apellido_materno', 'alumno__grupo_anterior', 'alumno__semestre_anterior',
+    'grupo_inscripcion', 'semestre_inscripcion',
+    'especialidad__nombre', 'especialidad__codigo', 'taller__nombre', 'fecha_solicitud',
+)
+
+CAMPOS_FICHA_EXISTENTE = (
+    'id_inscripcion', 'grupo_inscripcion', 'semestre_inscripcion',
+    'especialidad__nombre', 'taller__nombre', 'fecha_solicitud',
+)
+
+CAMPOS_ESPECIALIDAD = ('id_especialidad', 'nombre', 'codigo', 'cantidad')
+
+CAMPOS_TALLER = ('id_taller', 'nombre', 'cantidad')
+
+
+def nombre_completo(nombres, apellido_paterno, apellido_materno):
+    return f"{nombres} {apellido_paterno} {apellido_materno}"
+
+
+def alumno(fila):
+    numero_control, nombres, apellido_paterno, apellido_materno, grupo_anterior, semestre_anterior = fila
+    return {
+        'numero_control': numero_control,
+        'nombres': nombres,
+        'apellido_paterno': apellido_paterno,
+        'apellido_materno': apellido_materno,
+        'grupo_anterior': grupo_anterior,
+        'semestre_anterior': semestre_anterior,
+        'puede_elegir_especialidad': semestre_anterior == 2,
+    }
+
+
+def alumno_resumen(fila):
+    numero_control, nombres, apellido_paterno, apellido_materno, grupo_anterior, semestre_anterior = fila
+    return {
+        'numero_control': numero_control,
+        'nombre_completo': nombre_completo(nombres, apellido_paterno, apellido_materno),
+        'grupo_anterior': grupo_anterior,
+        'semestre_anterior': semestre_anterior,
+    }
+
+
+def ficha(fila):
+    return {
+        'id_inscripcion': fila[0],
+        'alumno': alumno_resumen(fila[1:7]),
+        'inscripcion': {
+            'grupo_inscripcion': fila[7],
+            'semestre_inscripcion': fila[8],
+            'especialidad': {
+                'nombre': fila[9],
+                'codigo': fila[10],
+            },
+            'taller': fila[11],
+            'fecha_solicitud': fila[12],
+        },
+    }
+
+
+def ficha_existente(fila):
+    id_inscripcion, grupo_inscripcion, semestre_inscripcion, especialidad, taller, fecha_solicitud = fila
+    return {
+        'id_inscripcion': id_inscripcion,
+        'grupo_inscripcion': grupo_inscripcion,
+        'semestre_inscripcion': semestre_inscripcion,
+        'especialidad': especialidad,
+        'taller': taller,
+        'fecha_solicitud': fecha_solicitud,
+    }
+
+
+def ficha_registrada(ficha):
+    # Recién guardada, la ficha ya tiene alumno, especialidad y taller en
+    # memoria; leerlos no vuelve a consultar la base.
+    alumno, especialidad, taller = ficha.alumno, ficha.especialidad, ficha.taller
+    return {
+        'id_inscripcion': ficha.id_inscripcion,
+        'numero_control': alumno.numero_control,
+        'nombre_completo': nombre_completo(alumno.nombres, alumno.apellido_paterno, alumno.apellido_materno),
+        'grupo_asignado': ficha.grupo_inscripcion,
+        'semestre_asignado': ficha.semestre_inscripcion,
+        'especialidad_asignada': especialidad.nombre if especialidad else None,
+        'codigo_especialidad': especialidad.codigo if especialidad else None,
+        'taller_asignado': taller.nombre if taller else None,
+        'fecha_solicitud': ficha.fecha_solicitud.isoformat(),
+    }
+
+
+def especialidad(fila, cupo_maximo):
+    id_especialidad, nombre, codigo, cantidad = fila
+    return {
+        'id_especialidad': id_especialidad,
+        'nombre': nombre,
+        'codigo': codigo,
+        'cantidad': cantidad,
+        'fichas_disponibles': cupo_maximo - cantidad,
+    }
+
+
+def taller(fila, cupo_maximo):
+    id_taller, nombre, cantidad = fila
+    return {
+        'id_taller': id_taller,
+        'nombre': nombre,
+        'cantidad': cantidad,
+        'fichas_disponibles': cupo_maximo - cantidad,
+    }
+
+
+_codificador = DjangoJSONEncoder()
+
+
+def codificar(data):
+    if orjson is None:
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+    # Las fechas pasan por DjangoJSONEncoder para conservar el mismo formato
+    # que JsonResponse (milisegundos y 'Z' para UTC).
+    return orjson.dumps(data, default=_codificador.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+
+
+class RespuestaJSON(HttpResponse):
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        with medir('serializacion'):
+            contenido = codificar(data)
+        super().__init__(content=contenido, **kwargs)
@@ -0,0 +1,31 @@
+import string
+
+from django.core.management.base import CommandError
+
+from .models import Alumno, Especialidad
+
+# Los comandos de prueba de carga siembran alumnos y cursos en la base real y
+# los borran al terminar por rango de número de control. Antes de sembrar se
+# comprueba que ese rango esté vacío (no se borra lo que no se creó) y se
+# eligen códigos de especialidad que nadie esté usando.
+
+
+def verificar_rango(base, total):
+    ultimo = base + total - 1
+    existentes = Alumno.objects.filter(numero_control__range=(base, ultimo)).count()
+    if existentes:
+        raise CommandError(
+            f'Ya hay {existentes} alumnos con número de control entre {base} y {ultimo} '
+            '(datos reales o de una corrida anterior con --conservar); no se siembra '
+            'sobre ellos para no borrarlos al terminar.'
+        )
+    return base, ultimo
+
+
+def codigos_libres(cantidad, iniciales='ZYXW'):
+    candidatos = [f'{a}{b}' for a in iniciales for b in string.digits + string.ascii_uppercase]
+    usados = set(Especialidad.objects.filter(codigo__in=candidatos).values_list('codigo', flat=True))
+    libres = [codigo for codigo in candidatos if codigo not in usados]
+    if len(libres) < cantidad:
+        raise CommandError(f'No hay {cantidad} códigos de especialidad libres para los datos sintéticos.')
+    return libres[:cantidad]
@@ -1,3 +1,979 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import tempfile
+import re
+import threading
+import time
+import zipfile
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.http import JsonResponse
+from django.db import OperationalError, connection, transaction
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from . import admision, busqueda, catalogo, checks, cupos, difusion, exportar_pdf, grupos, lote, pdf, preferencias, replicas
+from .filtros import filtrar_fichas
+from .idempotencia import idempotente
+from .models import Alumno, Especialidad, FichaInscripcion, FraccionCupo, PreferenciaInscripcion, Taller
+from .replicas import COOKIE_FIJAR, EnrutadorReplica, fijar_alumnos
+
+
+def _alumno(numero_control, semestre_anterior=1, grupo_anterior='1A'):
+    return Alumno(
+        numero_control=numero_control,
+        nombres='Prueba',
+        apellido_paterno='Alumno',
+        apellido_materno=str(numero_control),
+        grupo_anterior=grupo_anterior,
+        semestre_anterior=semestre_anterior,
+    )
+
+
+def _fila_solicitud(numero_control):
+    return {
+        'alumno__numero_control': numero_control, 'alumno__nombres': 'Ana', 'alumno__apellido_paterno': 'López',
+        'alumno__apellido_materno': 'Pérez', 'alumno__grupo_anterior': '2A', 'alumno__semestre_anterior': 2,
+        'semestre_inscripcion': 3, 'especialidad__nombre': None, 'taller__nombre': None,
+        'fecha_solicitud': datetime(2026, 10, 18),
+    }
+
+
+def _replica_independiente():
+    replica = settings.DATABASES.get('replica')
+    return replica is not None and not replica.get('TEST', {}).get('MIRROR')
+
+
+@skipUnless(_replica_independiente(), 'Requiere una réplica propia, p. ej. DB_SQLITE_DIR con dos SQLite')
+class EnrutadorReplicaTests(TestCase):
+    # La réplica es otra base que nunca recibe las escrituras de la primaria:
+    # se comporta como una réplica atrasada.
+    databases = {'default', 'replica'}
+
+    COMUN = 1001          # replicado: está en ambas bases
+    SOLO_REPLICA = 1002   # solo en la réplica
+    SOLO_PRIMARIA = 1003  # todavía no llega a la réplica
+
+    @classmethod
+    def setUpTestData(cls):
+        for alias in ('default', 'replica'):
+            _alumno(cls.COMUN).save(using=alias)
+        _alumno(cls.SOLO_REPLICA).save(using='replica')
+        _alumno(cls.SOLO_PRIMARIA).save(using='default')
+        for alias, numero_control in (('replica', cls.SOLO_REPLICA), ('default', cls.SOLO_PRIMARIA)):
+            FichaInscripcion.objects.using(alias).bulk_create([FichaInscripcion(
+                alumno_id=numero_control, grupo_inscripcion='2A', semestre_inscripcion=2
+            )])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_get_sin_fijar_lee_de_la_replica(self):
+        client = Client()
+        self.assertEqual(client.get(f'/api/buscar-alumno/{self.SOLO_REPLICA}/').status_code, 200)
+        self.assertEqual(client.get(f'/api/buscar-alumno/{self.SOLO_PRIMARIA}/').status_code, 404)
+
+    def test_escrituras_van_a_la_primaria(self):
+        self.assertEqual(EnrutadorReplica().db_for_write(Alumno), 'default')
+        self.assertEqual(EnrutadorReplica().db_for_read(Alumno), 'default')
+
+        client = Client()
+        response = client.post(
+            '/api/registrar-inscripcion/',
+            json.dumps({'numero_control': self.SOLO_REPLICA}),
+            content_type='application/json',
+        )
+        # El POST lee de la primaria, donde este alumno no existe.
+        self.assertEqual(response.status_code, 404)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                '/api/registrar-inscripcion/',
+                json.dumps({'numero_control': self.COMUN}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(FichaInscripcion.objects.using('default').filter(alumno_id=self.COMUN).exists())
+        self.assertFalse(FichaInscripcion.objects.using('replica').filter(alumno_id=self.COMUN).exists())
+        self.assertIn(COOKIE_FIJAR, response.cookies)
+
+    def test_cookie_fija_las_lecturas_a_la_primaria(self):
+        client = Client()
+        client.cookies[COOKIE_FIJAR] = '1'
+        self.assertEqual(client.get(f'/api/buscar-alumno/{self.SOLO_PRIMARIA}/').status_code, 200)
+        self.assertEqual(client.get(f'/api/buscar-alumno/{self.SOLO_REPLICA}/').status_code, 404)
+
+    def test_alumno_fijado_lee_de_la_primaria(self):
+        fijar_alumnos([self.SOLO_PRIMARIA])
+        client = Client()
+        self.assertEqual(client.get(f'/api/buscar-alumno/{self.SOLO_PRIMARIA}/').status_code, 200)
+        # Los demás alumnos siguen leyéndose de la réplica.
+        self.assertEqual(client.get(f'/api/buscar-alumno/{self.SOLO_REPLICA}/').status_code, 200)
+
+    def test_respuesta_en_partes_lee_de_la_replica(self):
+        # El contenido se genera al recorrer la respuesta, ya fuera del middleware.
+        response = Client().get('/api/exportar-fichas/')
+        contenido = b''.join(response.streaming_content).decode('utf-8-sig')
+        numeros = [linea.split(',')[0] for linea in contenido.splitlines()[1:]]
+        self.assertEqual(numeros, [str(self.SOLO_REPLICA)])
+
+    @override_settings(PDF_PROCESOS=1)
+    def test_zip_de_grupo_cuenta_y_lee_de_la_misma_base(self):
+        response = Client().get('/api/pdf-grupo/', {'grupo': '2A', 'formato': 'zip'})
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archivo:
+            self.assertEqual(archivo.namelist(), [f'solicitud_reinscripcion_{self.SOLO_REPLICA}.pdf'])
+
+    def test_inicio_inscripcion_tras_registrar_ve_la_ficha(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = Client().post(
+                '/api/registrar-inscripcion/',
+                json.dumps({'numero_control': self.COMUN}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 201)
+
+        # Otro cliente, sin cookie: el alumno quedó fijado en la caché.
+        response = Client().get(f'/api/inicio-inscripcion/{self.COMUN}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['alumno']['tiene_ficha'])
+
+        # Sin el fijado, la réplica atrasada aún no tiene la ficha.
+        cache.clear()
+        response = Client().get(f'/api/inicio-inscripcion/{self.COMUN}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['alumno']['tiene_ficha'])
+
+
+class ReservaConcurrenteTests(TransactionTestCase):
+    # Varios hilos, cada uno con su conexión, compiten por los últimos lugares
+    # de una especialidad.
+    LIBRES = 3
+    HILOS = 12
+    REINTENTOS = 50
+
+    def setUp(self):
+        cache.clear()
+        self.especialidad = Especialidad.objects.create(nombre='Programación', codigo='PR')
+        ocupados = Especialidad.CUPO_MAXIMO - self.LIBRES
+        inscritos = [_alumno(2000 + i, semestre_anterior=2, grupo_anterior='2A') for i in range(ocupados)]
+        Alumno.objects.bulk_create(inscritos)
+        FichaInscripcion.objects.bulk_create(
+            FichaInscripcion(alumno=alumno, especialidad=self.especialidad, grupo_inscripcion='3A', semestre_inscripcion=3)
+            for alumno in inscritos
+        )
+        Especialidad.objects.filter(pk=self.especialidad.pk).update(cantidad=ocupados)
+        self.aspirantes = [_alumno(3000 + i, semestre_anterior=2, grupo_anterior='2A') for i in range(self.HILOS)]
+        Alumno.objects.bulk_create(self.aspirantes)
+
+    def _inscribir(self, alumno, barrera, resultados):
+        try:
+            barrera.wait()
+            for _ in range(self.REINTENTOS):
+                try:
+                    with transaction.atomic():
+                        FichaInscripcion(alumno=alumno, especialidad_id=self.especialidad.pk).save()
+                    resultados.append('registrada')
+                    return
+                except ValidationError:
+                    resultados.append('sin_cupo')
+                    return
+                except OperationalError:
+                    # SQLite bloquea la tabla completa; MySQL espera el candado de fila.
+                    time.sleep(0.01)
+            resultados.append('error')
+        finally:
+            connection.close()
+
+    def test_no_se_excede_el_cupo(self):
+        barrera = threading.Barrier(self.HILOS)
+        resultados = []
+        hilos = [
+            threading.Thread(target=self._inscribir, args=(alumno, barrera, resultados))
+            for alumno in self.aspirantes
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(resultados.count('error'), 0)
+        self.assertEqual(resultados.count('registrada'), self.LIBRES)
+        self.assertEqual(resultados.count('sin_cupo'), self.HILOS - self.LIBRES)
+
+        self.especialidad.refresh_from_db()
+        self.assertLessEqual(self.especialidad.cantidad, Especialidad.CUPO_MAXIMO)
+        self.assertEqual(
+            self.especialidad.cantidad,
+            FichaInscripcion.objects.filter(especialidad=self.especialidad).count(),
+        )
+
+
+class LoteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.programacion = Especialidad.objects.create(nombre='Programación', codigo='PR')
+        cls.contabilidad = Especialidad.objects.create(nombre='Contabilidad', codigo='CO')
+        cls.ajedrez = Taller.objects.create(nombre='Ajedrez')
+        Alumno.objects.bulk_create([
+            _alumno(4001, semestre_anterior=2, grupo_anterior='2A'),
+            _alumno(4002, semestre_anterior=2, grupo_anterior='2A'),
+            _alumno(4003, semestre_anterior=4, grupo_anterior='4CO'),
+            _alumno(4004, semestre_anterior=2, grupo_anterior='2A'),
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_registra_y_reporta_por_fila(self):
+        resultados = lote.registrar_lote([
+            {'numero_control': 4001, 'especialidad_id': self.programacion.pk, 'taller_id': self.ajedrez.pk},
+            {'numero_control': 4002},
+            {'numero_control': 4003},
+            {'numero_control': 9999},
+            {'numero_control': 4001, 'especialidad_id': self.programacion.pk},
+            {},
+        ])
+
+        self.assertEqual([r['success'] for r in resultados], [False, False, True, False, False, False])
+        self.assertEqual(resultados[0]['error'], 'El alumno aparece más de una vez en el lote')
+        self.assertEqual(resultados[1]['error'], 'Los alumnos de 2do semestre deben elegir una especialidad')
+        self.assertEqual(resultados[3]['error'], 'Alumno no encontrado')
+        self.assertEqual(resultados[5]['error'], 'Número de control es obligatorio')
+
+        ficha = FichaInscripcion.objects.get(alumno_id=4003)
+        self.assertEqual((ficha.especialidad_id, ficha.grupo_inscripcion), (self.contabilidad.pk, '5CO'))
+        self.contabilidad.refresh_from_db()
+        self.assertEqual(self.contabilidad.cantidad, 1)
+
+    def test_sin_cupo_rechaza_solo_las_filas_que_no_caben(self):
+        Especialidad.objects.filter(pk=self.programacion.pk).update(cantidad=Especialidad.CUPO_MAXIMO - 1)
+        resultados = lote.registrar_lote([
+            {'numero_control': 4001, 'especialidad_id': self.programacion.pk},
+            {'numero_control': 4002, 'especialidad_id': self.programacion.pk},
+        ])
+
+        self.assertTrue(resultados[0]['success'])
+        self.assertEqual(resultados[1]['error'], 'No hay cupo disponible en la especialidad Programación')
+        self.programacion.refresh_from_db()
+        self.assertEqual(self.programacion.cantidad, Especialidad.CUPO_MAXIMO)
+
+    def test_inscripcion_confirmada_mientras_espera_los_bloqueos(self):
+        # Una inscripción individual se confirma justo antes de que el lote
+        # obtenga los bloqueos: el lote la reporta en esa fila y registra el resto.
+        select_for_update = Especialidad.objects.select_for_update
+
+        def competir(*args, **kwargs):
+            if not FichaInscripcion.objects.filter(alumno_id=4001).exists():
+                FichaInscripcion(alumno_id=4001, especialidad=self.programacion).save()
+            return select_for_update(*args, **kwargs)
+
+        with mock.patch.object(Especialidad.objects, 'select_for_update', side_effect=competir):
+            resultados = lote.registrar_lote([
+                {'numero_control': 4001, 'especialidad_id': self.programacion.pk},
+                {'numero_control': 4004, 'especialidad_id': self.programacion.pk},
+            ])
+
+        self.assertEqual(resultados[0]['error'], 'El alumno ya tiene una ficha registrada para el semestre 3')
+        self.assertTrue(resultados[1]['success'])
+        self.programacion.refresh_from_db()
+        self.assertEqual(self.programacion.cantidad, 2)
+        self.assertEqual(FichaInscripcion.objects.filter(especialidad=self.programacion).count(), 2)
+
+    def test_endpoint(self):
+        response = Client().post(
+            '/api/registrar-inscripciones-lote/',
+            json.dumps({'inscripciones': [{'numero_control': 4003}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['registradas'], 1)
+
+
+class ReconciliarCuposTests(TestCase):
+    # Las fichas se crean con bulk_create para que los contadores no se
+    # muevan y luego se desalinean a propósito.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.programacion = Especialidad.objects.create(nombre='Programación', codigo='PR')
+        cls.contabilidad = Especialidad.objects.create(nombre='Contabilidad', codigo='CO')
+        cls.ajedrez = Taller.objects.create(nombre='Ajedrez')
+        alumnos = [_alumno(4201 + i, semestre_anterior=2, grupo_anterior='2A') for i in range(3)]
+        Alumno.objects.bulk_create(alumnos)
+        FichaInscripcion.objects.bulk_create([
+            FichaInscripcion(alumno=alumnos[0], especialidad=cls.programacion, taller=cls.ajedrez, semestre_inscripcion=3),
+            FichaInscripcion(alumno=alumnos[1], especialidad=cls.programacion, semestre_inscripcion=3),
+            FichaInscripcion(alumno=alumnos[2], especialidad=cls.contabilidad, semestre_inscripcion=3),
+        ])
+        Especialidad.objects.filter(pk=cls.programacion.pk).update(cantidad=5)
+        Especialidad.objects.filter(pk=cls.contabilidad.pk).update(cantidad=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_solo_reporte_no_corrige(self):
+        self.assertEqual(cupos.reconciliar(Especialidad, reparar=False), [{
+            'id': self.programacion.pk, 'nombre': 'Programación', 'cantidad': 5, 'reales': 2, 'sobrecupo': 0,
+        }])
+        self.assertEqual(Especialidad.objects.get(pk=self.programacion.pk).cantidad, 5)
+
+    def test_corrige_y_queda_en_cero_diferencias(self):
+        self.assertEqual([d['id'] for d in cupos.reconciliar(Especialidad)], [self.programacion.pk])
+        self.assertEqual([d['id'] for d in cupos.reconciliar(Taller)], [self.ajedrez.pk])
+
+        self.assertEqual(Especialidad.objects.get(pk=self.programacion.pk).cantidad, 2)
+        self.assertEqual(Taller.objects.get(pk=self.ajedrez.pk).cantidad, 1)
+        self.assertEqual(cupos.reconciliar(Especialidad), [])
+        self.assertEqual(cupos.reconciliar(Taller), [])
+
+    def test_reporta_sobrecupo(self):
+        with mock.patch.object(Especialidad, 'CUPO_MAXIMO', 1):
+            diferencias = cupos.reconciliar(Especialidad, reparar=False)
+        self.assertEqual(diferencias[0]['sobrecupo'], 1)
+
+    def test_comando(self):
+        salida = io.StringIO()
+        call_command('reconciliar_cupos', '--solo-reporte', stdout=salida)
+        lineas = salida.getvalue().splitlines()
+        self.assertEqual(lineas[:2], [
+            f'especialidad {self.programacion.pk} (Programación): cantidad=5 fichas=2 (-3)',
+            f'taller {self.ajedrez.pk} (Ajedrez): cantidad=0 fichas=1 (+1)',
+        ])
+        self.assertTrue(lineas[2].startswith('2 contadores con diferencia en '))
+
+        call_command('reconciliar_cupos', stdout=io.StringIO())
+        salida = io.StringIO()
+        call_command('reconciliar_cupos', stdout=salida)
+        self.assertTrue(salida.getvalue().startswith('0 contadores corregidos en '))
+
+
+@override_settings(CUPOS_FRACCIONES=4)
+class CuposFraccionadosTests(TestCase):
+    # Cupo de 40 en cuatro fracciones de 10.
+
+    def setUp(self):
+        cache.clear()
+        self.especialidad = Especialidad.objects.create(nombre='Programación', codigo='PR')
+        FraccionCupo.objects.filter(tipo='especialidad').delete()
+        cupos.crear_fracciones(Especialidad, self.especialidad.pk, 25)
+
+    def _fracciones(self):
+        return list(FraccionCupo.objects.filter(
+            tipo='especialidad', curso=self.especialidad.pk
+        ).order_by('indice').values_list('cantidad', 'capacidad'))
+
+    def test_crear_fracciones_conserva_la_ocupacion(self):
+        self.assertEqual(self._fracciones(), [(10, 10), (10, 10), (5, 10), (0, 10)])
+        self.assertEqual(cupos.ocupados(Especialidad, [self.especialidad.pk]), {self.especialidad.pk: 25})
+
+    def test_varios_lugares_se_reparten_entre_fracciones(self):
+        self.assertTrue(cupos.reservar_lugar(Especialidad, self.especialidad.pk, 12))
+
+        fracciones = self._fracciones()
+        self.assertEqual(sum(cantidad for cantidad, _ in fracciones), 37)
+        self.assertTrue(all(cantidad <= capacidad for cantidad, capacidad in fracciones))
+        self.assertEqual(cupos.disponibles(Especialidad, {self.especialidad.pk: self.especialidad}),
+                         {self.especialidad.pk: 3})
+
+    def test_sin_lugar_suficiente_no_toma_ninguno(self):
+        self.assertFalse(cupos.reservar_lugar(Especialidad, self.especialidad.pk, 16))
+        self.assertEqual(self._fracciones(), [(10, 10), (10, 10), (5, 10), (0, 10)])
+
+    def test_deshace_lo_tomado_si_otra_reserva_gana_una_fraccion(self):
+        # Entre la lectura de lugares libres y los UPDATE, otra reserva llena
+        # la última fracción: la reserva de 15 no cabe y no debe quedar a medias.
+        def otra_reserva(libres):
+            FraccionCupo.objects.filter(
+                tipo='especialidad', curso=self.especialidad.pk, indice=3
+            ).update(cantidad=10)
+            libres.sort()
+
+        with mock.patch('registro.cupos.random.shuffle', otra_reserva):
+            self.assertFalse(cupos.reservar_lugar(Especialidad, self.especialidad.pk, 15))
+        self.assertEqual(self._fracciones(), [(10, 10), (10, 10), (5, 10), (10, 10)])
+
+    def test_lugares_sueltos_llenan_el_cupo_exacto(self):
+        reservas = [cupos.reservar_lugar(Especialidad, self.especialidad.pk) for _ in range(16)]
+        self.assertEqual(reservas, [True] * 15 + [False])
+        self.assertEqual(self._fracciones(), [(10, 10)] * 4)
+
+    def test_curso_sin_fracciones_las_crea_desde_su_contador(self):
+        taller = Taller.objects.create(nombre='Ajedrez')
+        FraccionCupo.objects.filter(tipo='taller').delete()
+        Taller.objects.filter(pk=taller.pk).update(cantidad=Taller.CUPO_MAXIMO - 2)
+
+        self.assertTrue(cupos.reservar_lugar(Taller, taller.pk, 2))
+        self.assertFalse(cupos.reservar_lugar(Taller, taller.pk))
+        self.assertEqual(cupos.ocupados(Taller, [taller.pk]), {taller.pk: Taller.CUPO_MAXIMO})
+
+    def test_reconciliar_ajusta_fracciones_y_contador(self):
+        alumnos = [_alumno(4301 + i, semestre_anterior=2, grupo_anterior='2A') for i in range(3)]
+        Alumno.objects.bulk_create(alumnos)
+        FichaInscripcion.objects.bulk_create(
+            FichaInscripcion(alumno=alumno, especialidad=self.especialidad, semestre_inscripcion=3)
+            for alumno in alumnos
+        )
+
+        diferencias = cupos.reconciliar(Especialidad)
+
+        self.assertEqual([(d['cantidad'], d['reales']) for d in diferencias], [(25, 3)])
+        self.assertEqual(self._fracciones(), [(3, 10), (0, 10), (0, 10), (0, 10)])
+        self.assertEqual(Especialidad.objects.get(pk=self.especialidad.pk).cantidad, 3)
+
+
+class PreferenciasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.programacion = Especialidad.objects.create(nombre='Programación', codigo='PR', cantidad=Especialidad.CUPO_MAXIMO - 1)
+        cls.contabilidad = Especialidad.objects.create(nombre='Contabilidad', codigo='CO')
+        cls.llena = Especialidad.objects.create(nombre='Logística', codigo='LG', cantidad=Especialidad.CUPO_MAXIMO)
+        cls.ajedrez = Taller.objects.create(nombre='Ajedrez', cantidad=Taller.CUPO_MAXIMO - 1)
+        cls.futbol = Taller.objects.create(nombre='Fútbol')
+        Alumno.objects.bulk_create([
+            _alumno(4101, semestre_anterior=2, grupo_anterior='2A'),
+            _alumno(4102, semestre_anterior=2, grupo_anterior='2A'),
+            _alumno(4103, semestre_anterior=4, grupo_anterior='4CO'),
+            _alumno(4104, semestre_anterior=2, grupo_anterior='2A'),
+            _alumno(4105, semestre_anterior=2, grupo_anterior='2A'),
+        ])
+        # Ya inscrito por la vía individual (cuenta 1 en Contabilidad).
+        FichaInscripcion.objects.create(alumno_id=4104, semestre_inscripcion=3, especialidad=cls.contabilidad)
+        opciones = {
+            4101: (1, [cls.programacion.pk, cls.contabilidad.pk], [cls.ajedrez.pk, cls.futbol.pk]),
+            4102: (2, [cls.programacion.pk, cls.contabilidad.pk], [cls.ajedrez.pk]),
+            4105: (3, [cls.llena.pk], []),
+            4103: (4, [], [cls.futbol.pk]),
+            4104: (5, [cls.programacion.pk], []),
+        }
+        for numero_control, (dia, especialidades, talleres) in opciones.items():
+            alumno = Alumno.objects.get(pk=numero_control)
+            PreferenciaInscripcion.objects.create(
+                alumno=alumno, semestre_inscripcion=alumno.semestre_anterior + 1,
+                especialidades=especialidades, talleres=talleres,
+            )
+            PreferenciaInscripcion.objects.filter(alumno=alumno).update(
+                fecha_registro=datetime(2026, 10, dia, 8, tzinfo=timezone.utc)
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_asignar_toma_la_primera_opcion_con_lugar(self):
+        disponibles_especialidad = {1: 1, 2: 5}
+        disponibles_taller = {7: 1}
+        resultado = preferencias.asignar([
+            ('a', [1, 2], [7]),
+            ('b', [1, 2], [7]),
+            ('c', [1], []),
+            ('d', [], [7]),
+        ], disponibles_especialidad, disponibles_taller)
+
+        self.assertEqual(resultado, {'a': (1, 7), 'b': (2, None), 'c': None, 'd': (None, None)})
+        self.assertEqual((disponibles_especialidad, disponibles_taller), ({1: 0, 2: 4}, {7: 0}))
+
+    def test_prioridad_por_sorteo_es_reproducible(self):
+        numeros = list(range(4101, 4121))
+        orden = lambda semilla: sorted(numeros, key=lambda n: preferencias.prioridad(n, None, 'sorteo', semilla))
+        self.assertEqual(orden('2026'), orden('2026'))
+        self.assertNotEqual(orden('2026'), orden('otra'))
+        self.assertNotEqual(orden('2026'), numeros)
+
+    def test_asigna_por_fecha_de_registro(self):
+        resumen = preferencias.asignar_preferencias(modo='fecha')
+
+        self.assertEqual(resumen, {'preferencias': 5, 'pendientes': 4, 'asignadas': 3,
+                                   'primera_opcion': 2, 'sin_taller': 1, 'sin_lugar': [4105]})
+        fichas = {
+            alumno_id: (especialidad_id, taller_id)
+            for alumno_id, especialidad_id, taller_id in FichaInscripcion.objects.exclude(
+                alumno_id=4104
+            ).values_list('alumno_id', 'especialidad_id', 'taller_id')
+        }
+        self.assertEqual(fichas, {
+            4101: (self.programacion.pk, self.ajedrez.pk),
+            4102: (self.contabilidad.pk, None),
+            4103: (self.contabilidad.pk, self.futbol.pk),
+        })
+        self.assertEqual(FichaInscripcion.objects.filter(alumno_id=4104).count(), 1)
+
+        cantidades = lambda modelo: dict(modelo.objects.values_list('pk', 'cantidad'))
+        self.assertEqual(cantidades(Especialidad), {self.programacion.pk: 40, self.contabilidad.pk: 3, self.llena.pk: 40})
+        self.assertEqual(cantidades(Taller), {self.ajedrez.pk: 30, self.futbol.pk: 1})
+
+    def test_simular_no_escribe(self):
+        resumen = preferencias.asignar_preferencias(modo='fecha', simular=True)
+
+        self.assertEqual(resumen['asignadas'], 3)
+        self.assertEqual(FichaInscripcion.objects.count(), 1)
+        self.assertEqual(Especialidad.objects.get(pk=self.contabilidad.pk).cantidad, 1)
+
+    @override_settings(PREFERENCIAS_INICIO='2026-10-01T00:00', PREFERENCIAS_FIN='2026-10-15T00:00')
+    def test_ventana_cerrada_rechaza_preferencias(self):
+        response = Client().post(
+            '/api/registrar-preferencias/', json.dumps({'numero_control': 4101}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 409)
+
+
+class BusquedaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for numero_control, nombres, paterno, materno in [
+            (5001, 'Ana María', 'López', 'Pérez'),
+            (5002, 'Luis', 'Pérez', 'López'),
+            (5003, 'Lorena', 'Lozano', 'Ruiz'),
+            (6004, 'José', 'Ángeles', 'Mora'),
+        ]:
+            Alumno.objects.create(
+                numero_control=numero_control, nombres=nombres, apellido_paterno=paterno,
+                apellido_materno=materno, grupo_anterior='1A', semestre_anterior=1,
+            )
+            FichaInscripcion.objects.create(alumno_id=numero_control)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_apellido_paterno_y_palabra_completa_primero(self):
+        # Pérez como apellido paterno pesa más que como materno.
+        self.assertEqual(busqueda.buscar('perez'), [5002, 5001])
+        # Palabra completa antes que prefijo.
+        self.assertEqual(busqueda.buscar('lo'), [5001, 5003, 5002])
+        self.assertEqual(busqueda.buscar('lopez'), [5001, 5002])
+
+    def test_sin_acentos_todos_los_terminos_y_numero_de_control(self):
+        self.assertEqual(busqueda.buscar('ANGELES jose'), [6004])
+        self.assertEqual(busqueda.buscar('ana perez'), [5001])
+        self.assertEqual(busqueda.buscar('ana ruiz'), [])
+        # Empates por clave: lopez, lozano, perez.
+        self.assertEqual(busqueda.buscar('50'), [5001, 5003, 5002])
+        self.assertEqual(busqueda.buscar('   '), [])
+        self.assertEqual(busqueda.buscar('lo', limite=1), [5001])
+
+    def test_nuevo_alumno_invalida_el_indice(self):
+        self.assertEqual(busqueda.buscar('quiroz'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            _alumno(5005).save()
+            Alumno.objects.filter(pk=5005).update(clave_busqueda='quiroz ana')
+        self.assertEqual(busqueda.buscar('quiroz'), [5005])
+
+    def test_filtro_de_fichas_coincide_con_el_indice(self):
+        for texto in ('perez', 'lo', 'ana perez', 'angeles', '50', 'luis lozano', 'ma'):
+            with self.subTest(texto=texto):
+                filtradas = filtrar_fichas(texto, '', '', '').values_list('alumno_id', flat=True)
+                self.assertEqual(sorted(filtradas), sorted(busqueda.buscar(texto, limite=None)))
+        self.assertFalse(filtrar_fichas('   ', '', '', '').exists())
+
+
+@override_settings(DATABASE_ROUTERS=[])
+class PaginacionCursorTests(TestCase):
+    # Cinco fichas; las tres primeras comparten fecha_solicitud, así que el
+    # orden entre ellas lo decide id_inscripcion. Sin enrutador todo se lee de
+    # la primaria, que es donde se crean.
+
+    @classmethod
+    def setUpTestData(cls):
+        Alumno.objects.bulk_create([_alumno(n) for n in range(5101, 5106)])
+        for n in range(5101, 5106):
+            FichaInscripcion.objects.create(alumno_id=n, semestre_inscripcion=2)
+        fechas = {5101: 1, 5102: 1, 5103: 1, 5104: 2, 5105: 3}
+        for n, dia in fechas.items():
+            FichaInscripcion.objects.filter(alumno_id=n).update(fecha_solicitud=datetime(2026, 10, dia, 8, tzinfo=timezone.utc))
+        cls.esperado = list(FichaInscripcion.objects.order_by(
+            '-fecha_solicitud', '-id_inscripcion'
+        ).values_list('alumno_id', flat=True))
+
+    def _recorrer(self, per_page):
+        vistos, paginas, cursor = [], 0, ''
+        while True:
+            response = Client().get('/api/consultar-fichas/', {'modo': 'cursor', 'per_page': per_page, 'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            datos = response.json()
+            vistos += [ficha['alumno']['numero_control'] for ficha in datos['fichas']]
+            paginas += 1
+            self.assertEqual(datos['pagination']['has_next'], datos['pagination']['next_cursor'] is not None)
+            if not datos['pagination']['has_next']:
+                return vistos, paginas
+            cursor = datos['pagination']['next_cursor']
+
+    def test_recorre_todas_las_fichas_sin_repetir_ni_saltar(self):
+        self.assertEqual(self.esperado[-3:], [5103, 5102, 5101])
+        for per_page, paginas in ((1, 5), (2, 3), (4, 2), (5, 1), (6, 1)):
+            with self.subTest(per_page=per_page):
+                self.assertEqual(self._recorrer(per_page), (self.esperado, paginas))
+
+    def test_el_cursor_corta_dentro_de_un_empate_de_fecha(self):
+        response = Client().get('/api/consultar-fichas/', {'modo': 'cursor', 'per_page': 3})
+        cursor = response.json()['pagination']['next_cursor']
+        response = Client().get('/api/consultar-fichas/', {'modo': 'cursor', 'per_page': 3, 'cursor': cursor})
+        numeros = [ficha['alumno']['numero_control'] for ficha in response.json()['fichas']]
+        self.assertEqual(numeros, self.esperado[3:])
+
+    def test_cursor_no_valido(self):
+        for cursor in ('xyz', 'bm9qc29u', base64.urlsafe_b64encode(b'["no-es-fecha", 1]').decode()):
+            with self.subTest(cursor=cursor):
+                response = Client().get('/api/consultar-fichas/', {'modo': 'cursor', 'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['error'], 'Cursor no válido')
+
+    def test_per_page_no_positivo_responde_400(self):
+        for modo in ('cursor', ''):
+            for per_page in ('0', '-1', 'diez'):
+                with self.subTest(modo=modo, per_page=per_page):
+                    response = Client().get('/api/consultar-fichas/', {'modo': modo, 'per_page': per_page})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json()['error'], 'Parámetros no válidos')
+
+    def test_vista_async_rechaza_per_page_no_positivo(self):
+        from . import vistas_async
+        request = RequestFactory().get('/api/consultar-fichas/', {'modo': 'cursor', 'per_page': '-1'})
+        response = asyncio.run(vistas_async.consultar_todas_fichas(request))
+        self.assertEqual(response.status_code, 400)
+
+
+class CacheCompartidaTests(SimpleTestCase):
+
+    def test_advierte_con_cache_por_proceso(self):
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=locmem, DEBUG=False):
+            self.assertEqual([w.id for w in checks.cache_compartida(None)], ['registro.W001'])
+        with override_settings(CACHES=locmem, DEBUG=True):
+            self.assertEqual(checks.cache_compartida(None), [])
+
+
+class ImportarAlumnosTests(TestCase):
+
+    def importar(self, contenido):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as archivo:
+            archivo.write(contenido)
+        self.addCleanup(os.remove, archivo.name)
+        salida, errores = io.StringIO(), io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('importar_alumnos', archivo.name, lote=2, stdout=salida, stderr=errores)
+        return salida.getvalue(), errores.getvalue()
+
+    def test_reporta_filas_invalidas_y_escribe_las_demas(self):
+        encabezado = 'numero_control,nombres,apellido_paterno,apellido_materno,grupo_anterior,semestre_anterior\n'
+        salida, errores = self.importar(
+            encabezado
+            + '7001,Ana,López,Pérez,2A,2\n'
+            + f'7002,{"N" * 51},López,Pérez,2A,2\n'
+            + '7003,Luis,Mora,Ruiz,4PROGRAMACION,4\n'
+            + 'abc,Eva,Mora,Ruiz,2A,2\n'
+            + '7005,Eva,Mora,Ruiz,2A,2\n'
+        )
+
+        self.assertEqual(sorted(Alumno.objects.values_list('pk', flat=True)), [7001, 7005])
+        self.assertIn('Línea 3: nombres excede 50 caracteres', errores)
+        self.assertIn('Línea 4: grupo_anterior excede 10 caracteres', errores)
+        self.assertIn('Línea 5: número de control o semestre no válido', errores)
+        self.assertIn('nuevas=2 actualizadas=0 sin_cambios=0 invalidas=3', salida)
+
+        salida, _ = self.importar(encabezado + '7001,Ana,López,Pérez,2A,2\n7005,Eva,Mora,Ruiz,2B,2\n')
+        self.assertIn('nuevas=0 actualizadas=1 sin_cambios=1 invalidas=0', salida)
+        self.assertEqual(Alumno.objects.get(pk=7005).grupo_anterior, '2B')
+
+
+class GruposTests(TestCase):
+
+    def test_codigo_de_especialidad_del_grupo(self):
+        casos = {
+            '3PR': ('3', 'PR', ''),
+            '3PRB': ('3', 'PR', 'B'),
+            '301': ('3', '01', ''),
+            '300': ('3', '00', ''),
+            '2A': ('2', '', 'A'),
+        }
+        for grupo, partes in casos.items():
+            with self.subTest(grupo=grupo):
+                self.assertEqual(grupos.partes_grupo(grupo), partes)
+        self.assertEqual(grupos.codigo_especialidad('401'), '01')
+        self.assertIsNone(grupos.codigo_especialidad('2A'))
+
+    def test_especialidad_con_codigo_numerico(self):
+        especialidad = Especialidad.objects.create(nombre='Electrónica', codigo='01')
+        alumno = _alumno(8001, semestre_anterior=4, grupo_anterior='401')
+        alumno.save()
+        ficha = FichaInscripcion(alumno=alumno)
+        ficha.save()
+        self.assertEqual((ficha.especialidad, ficha.grupo_inscripcion), (especialidad, '501'))
+
+    def test_repartir_equilibra_y_conserva_cohortes(self):
+        alumnos = [(i, i, '2A' if i < 4 else '2B') for i in range(7)]
+        asignacion = grupos.repartir(alumnos, 4)
+        tamanos = sorted(list(asignacion.values()).count(s) for s in set(asignacion.values()))
+        self.assertEqual(tamanos, [3, 4])
+        self.assertEqual({asignacion[i] for i in range(4)}, {0})
+        self.assertEqual({asignacion[i] for i in range(4, 7)}, {1})
+
+    def test_asignar_grupos(self):
+        programacion = Especialidad.objects.create(nombre='Programación', codigo='PR')
+        fichas = []
+        for i, (grupo_anterior, especialidad, grupo) in enumerate([
+            ('4PRA', programacion, '5PR'), ('4PRA', programacion, '5PR'), ('4PRB', programacion, '5PR'),
+            ('4XY', None, '5XY'), ('4A', None, '500'),
+        ]):
+            alumno = _alumno(8100 + i, semestre_anterior=4, grupo_anterior=grupo_anterior)
+            alumno.save()
+            fichas.append(FichaInscripcion(
+                alumno=alumno, especialidad=especialidad, grupo_inscripcion=grupo, semestre_inscripcion=5
+            ))
+        FichaInscripcion.objects.bulk_create(fichas)
+
+        resumen, cambios = grupos.asignar_grupos(5, 2)
+        self.assertEqual(resumen, {'00': {'500': 1}, 'PR': {'5PRA': 2, '5PRB': 1}, 'XY': {'5XY': 1}})
+        self.assertEqual(cambios, 3)
+        self.assertEqual(
+            dict(FichaInscripcion.objects.values_list('alumno_id', 'grupo_inscripcion')),
+            {8100: '5PRA', 8101: '5PRA', 8102: '5PRB', 8103: '5XY', 8104: '500'},
+        )
+        self.assertEqual(grupos.asignar_grupos(5, 2)[1], 0)
+
+
+class IdempotenciaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _alumno(9001).save()
+
+    def setUp(self):
+        cache.clear()
+
+    def registrar(self, clave, numero_control=9001):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Client().post(
+                '/api/registrar-inscripcion/',
+                json.dumps({'numero_control': numero_control}),
+                content_type='application/json',
+                headers={'Idempotency-Key': clave},
+            )
+
+    def test_reintento_repite_la_respuesta(self):
+        primera = self.registrar('clave-1')
+        segunda = self.registrar('clave-1')
+
+        self.assertEqual(primera.status_code, 201)
+        self.assertEqual((segunda.status_code, segunda.content), (201, primera.content))
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(FichaInscripcion.objects.filter(alumno_id=9001).count(), 1)
+
+        # Otra clave ejecuta la vista: el alumno ya tiene ficha.
+        self.assertEqual(self.registrar('clave-2').status_code, 409)
+        # La misma clave con otro cuerpo se rechaza.
+        self.assertEqual(self.registrar('clave-1', numero_control=9002).status_code, 422)
+
+    def test_errores_del_servidor_no_se_guardan(self):
+        estados = [500, 503, 429, 200]
+        llamadas = []
+
+        @idempotente
+        def vista(request):
+            llamadas.append(request)
+            return JsonResponse({}, status=estados[len(llamadas) - 1])
+
+        factory = RequestFactory()
+        for esperado in estados + [200]:
+            response = vista(factory.post('/', b'{}', content_type='application/json', headers={'Idempotency-Key': 'k'}))
+            self.assertEqual(response.status_code, esperado)
+        # El último 200 es la repetición del cuarto: la vista corrió cuatro veces.
+        self.assertEqual(len(llamadas), 4)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+
+
+@override_settings(ADMISION_CONCURRENCIA=1, ADMISION_TASA=0, ADMISION_ESPERA=0.3, ADMISION_PRESUPUESTO=25)
+class AdmisionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+        @admision.admision_controlada
+        def vista(request):
+            return JsonResponse({'success': True}, status=201)
+        self.vista = vista
+
+    def ocupar_lugar(self):
+        cache.add('admision:lugar:0', 'otro', 60)
+
+    def test_admite_y_libera_el_lugar(self):
+        self.assertEqual(self.vista(self.factory.post('/')).status_code, 201)
+        self.assertEqual(self.vista(self.factory.post('/')).status_code, 201)
+        self.assertEqual(admision.estadisticas()['en_curso'], 0)
+
+    def test_sin_lugar_responde_503_con_posicion(self):
+        self.ocupar_lugar()
+        inicio = time.monotonic()
+        response = self.vista(self.factory.post('/'))
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.1)
+        self.assertEqual(response.status_code, 503)
+        datos = json.loads(response.content)
+        self.assertEqual(datos['posicion'], 1)
+        self.assertEqual(response['Retry-After'], str(datos['reintentar_en']))
+        self.assertEqual(admision.estadisticas()['rechazadas'], 1)
+
+    @override_settings(ADMISION_TASA=1)
+    def test_tasa_maxima(self):
+        respuestas = [self.vista(self.factory.post('/')).status_code for _ in range(2)]
+        # Si el segundo cambió entre las dos, ambas entran.
+        self.assertIn(respuestas, ([201, 503], [201, 201]))
+
+    def test_recien_llegado_no_se_adelanta_a_la_fila(self):
+        # Dos turnos ya esperan y el lugar está libre: quien llega toma el
+        # tercer turno y, con un solo lugar, no le toca todavía.
+        cache.set('admision:turno', 2)
+        cache.set('admision:esperando', 2)
+        cache.set('admision:atendidos', 0)
+        response = self.vista(self.factory.post('/'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(json.loads(response.content)['posicion'], 3)
+
+        # Cuando los turnos anteriores salen, el siguiente entra.
+        cache.set('admision:atendidos', 3)
+        cache.set('admision:esperando', 1)
+        self.assertEqual(self.vista(self.factory.post('/')).status_code, 201)
+
+    @override_settings(ADMISION_ESPERA=5, ADMISION_PRESUPUESTO=0.2)
+    def test_la_espera_no_pasa_del_presupuesto(self):
+        self.ocupar_lugar()
+        inicio = time.monotonic()
+        response = self.vista(self.factory.post('/'))
+        self.assertEqual(response.status_code, 503)
+        self.assertLess(time.monotonic() - inicio, 1)
+
+    def test_endpoint_de_registro(self):
+        self.ocupar_lugar()
+        response = Client().post('/api/registrar-inscripcion/', '{}', content_type='application/json')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+
+class PlantillaPdfTests(SimpleTestCase):
+    DATOS = {
+        'numero_control': '21301234',
+        'nombre_completo': 'Ana María López Pérez',
+        'semestre_inscripcion': '3',
+        'especialidad': 'Contabilidad',
+        'taller': 'Ajedrez',
+        'grupo_anterior': '2A',
+        'semestre_anterior': '2',
+        'fecha_solicitud': '18/10/2026',
+    }
+
+    def contenido(self, documento):
+        # Las páginas y formas de reportlab van en ASCII85 + Flate; se
+        # devuelven descomprimidas junto con el resto del documento.
+        partes = [documento]
+        for stream in re.findall(rb'stream\r?\n(.*?)~>endstream', documento, re.S):
+            try:
+                partes.append(zlib.decompress(base64.a85decode(stream)))
+            except (ValueError, zlib.error):
+                pass
+        return b'\n'.join(partes).decode('latin-1')
+
+    def test_version_de_reportlab_fijada(self):
+        import reportlab
+        requisitos = (Path(settings.BASE_DIR) / 'requirements.txt').read_text(encoding='utf-16')
+        self.assertIn(f'reportlab=={reportlab.Version}', requisitos.splitlines())
+
+    def test_solicitud_en_modo_plantilla(self):
+        documento = pdf.renderizar_solicitud_plantilla(self.DATOS)
+        self.assertTrue(documento.startswith(b'%PDF-'))
+        self.assertTrue(documento.rstrip().endswith(b'%%EOF'))
+
+        texto = self.contenido(documento)
+        self.assertEqual(len(re.findall(r'/Type /Page\b', texto)), 1)
+        self.assertIn(f'/FormXob.{pdf.NOMBRE_FORMA} Do', texto)
+        self.assertIn('/Subtype /Image', texto)
+        for campo in ('numero_control', 'especialidad', 'taller', 'fecha_solicitud'):
+            self.assertRegex(texto, rf'\([^)]*{re.escape(self.DATOS[campo])}\) Tj')
+        # Ninguna marca de la plantilla queda en el documento.
+        self.assertNotIn(pdf.MARCA, texto)
+
+    def test_varias_solicitudes_comparten_la_forma(self):
+        destino = io.BytesIO()
+        filas = [_fila_solicitud(1000 + i) for i in range(3)]
+        self.assertEqual(exportar_pdf.solicitudes_combinadas(filas, destino), 3)
+
+        texto = self.contenido(destino.getvalue())
+        self.assertEqual(len(re.findall(r'/Type /Page\b', texto)), 3)
+        self.assertEqual(texto.count('/Subtype /Image'), 1)
+        self.assertEqual(texto.count(f'/FormXob.{pdf.NOMBRE_FORMA} Do'), 3)
+        # Las tres páginas apuntan al mismo objeto de la forma.
+        self.assertEqual(len(set(re.findall(rf'/FormXob\.{pdf.NOMBRE_FORMA} (\d+) 0 R', texto))), 1)
+        for i in range(3):
+            self.assertRegex(texto, rf'\([^)]*{1000 + i}\) Tj')
+
+
+class ExportarPdfTests(SimpleTestCase):
+
+    def test_zip_de_varias_exportaciones_usa_un_solo_pool(self):
+        def exportar(numeros):
+            contenido = b''.join(exportar_pdf.solicitudes_en_zip(map(_fila_solicitud, numeros), 2))
+            with zipfile.ZipFile(io.BytesIO(contenido)) as archivo:
+                return archivo.namelist()
+
+        self.assertEqual(len(exportar(range(1000, 1060))), 60)
+        pool = exportar_pdf._pool
+        self.addCleanup(exportar_pdf._descartar_pool, pool)
+        self.assertIsNotNone(pool)
+
+        nombres = exportar(range(2000, 2030))
+        self.assertIs(exportar_pdf._pool, pool)
+        self.assertEqual(nombres, [f'solicitud_reinscripcion_{n}.pdf' for n in range(2000, 2030)])
+
+
+@override_settings(CUPOS_SSE_INTERVALO=0.01, CUPOS_SSE_LATIDO=5)
+class DifusionCuposTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.especialidad = Especialidad.objects.create(nombre='Programación', codigo='PR')
+
+    async def test_vigilante_fuera_de_la_peticion(self):
+        contextos = []
+        leer_catalogo = difusion._leer_catalogo
+
+        def espiar():
+            contextos.append(replicas._estado.get())
+            return leer_catalogo()
+
+        # El estado de la petición que abre el flujo no pasa a la tarea.
+        token = replicas._estado.set({'primaria': False})
+        try:
+            with mock.patch.object(difusion, '_leer_catalogo', espiar), \
+                    mock.patch.object(difusion.connections, 'close_all') as cerrar:
+                flujo = difusion.eventos()
+                self.assertTrue((await flujo.__anext__()).startswith(b'retry:'))
+                self.assertTrue((await flujo.__anext__()).startswith(b'event: catalogo'))
+                tarea = difusion._estado['tarea']
+                self.assertIsNotNone(tarea)
+
+                await Especialidad.objects.filter(pk=self.especialidad.pk).aupdate(cantidad=5)
+                catalogo.invalidar()
+                evento = await asyncio.wait_for(flujo.__anext__(), 2)
+                self.assertTrue(evento.startswith(b'event: cupos'))
+                self.assertIn(b'"cantidad":5', evento)
+
+                await flujo.aclose()
+                await asyncio.wait_for(tarea, 2)
+        finally:
+            replicas._estado.reset(token)
+
+        self.assertIsNone(difusion._estado['tarea'])
+        self.assertEqual(difusion._estado['suscriptores'], 0)
+        self.assertTrue(contextos)
+        self.assertTrue(all(estado is None for estado in contextos))
+        # Cada lectura del catálogo cierra su conexión.
+        self.assertEqual(cerrar.call_count, len(contextos))
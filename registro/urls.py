@@ -1,13 +1,32 @@
+from django.conf import settings
 from django.urls import path
 from .views import *
 
+if settings.API_ASYNC:
+    # Con un servidor ASGI (ver start.sh) las consultas de solo lectura usan
+    # el ORM asíncrono y no ocupan un hilo mientras esperan al cliente o a la base.
+    from .vistas_async import (
+        buscar_alumno, consultar_ficha, consultar_todas_fichas, cupos_en_vivo,
+        especialidades_disponibles, exportar_fichas, generar_solicitudes_grupo_pdf,
+        talleres_disponibles
+    )
+
 
 urlpatterns = [
     path('buscar-alumno/<int:numero_control>/', buscar_alumno, name='buscar_alumno'),
+    path('inicio-inscripcion/<int:numero_control>/', inicio_inscripcion, name='inicio_inscripcion'),
+    path('buscar-alumnos/', buscar_alumnos, name='buscar_alumnos'),
     path('talleres-disponibles/', talleres_disponibles, name='talleres_disponibles'),
     path('especialidades-disponibles/', especialidades_disponibles, name='especialidades_disponibles'),
+    path('cupos-en-vivo/', cupos_en_vivo, name='cupos_en_vivo'),
     path('registrar-inscripcion/', registrar_inscripcion, name='registrar_inscripcion'),
+    path('registrar-inscripciones-lote/', registrar_inscripciones_lote, name='registrar_inscripciones_lote'),
+    path('registrar-preferencias/', registrar_preferencias, name='registrar_preferencias'),
     path('pdf/<int:numero_control>/', generar_solicitud_pdf, name='generar_pdf'),
+    path('pdf-grupo/', generar_solicitudes_grupo_pdf, name='generar_pdf_grupo'),
     path('consultar-ficha/<int:numero_control>/', consultar_ficha, name='consultar_ficha'),
     path('consultar-fichas/', consultar_todas_fichas, name='consultar_todas_fichas'),
+    path('exportar-fichas/', exportar_fichas, name='exportar_fichas'),
+    path('estado-pool/', estado_pool, name='estado_pool'),
+    path('estado-admision/', estado_admision, name='estado_admision'),
 ]
\ No newline at end of file
@@ -1,82 +1,121 @@
-from django.db import transaction
-from django.http import JsonResponse, HttpResponse
+from django.db import IntegrityError, connection, transaction
+from django.conf import settings
+from django.http import FileResponse, JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import ValidationError
+import csv
 import json
+import tempfile
 from .models import *
-from io import BytesIO
-
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Table, TableStyle, 
-    Spacer, Image
+from . import admision, busqueda, catalogo, preferencias, replicas, serializadores
+from .admision import admision_controlada
+from .idempotencia import idempotente
+from .instrumentacion import medir
+from .filtros import filtrar_fichas, validar_semestre
+from .exportar_pdf import filtrar_solicitudes, solicitudes_combinadas, solicitudes_en_zip
+from .lote import LOTE_MAXIMO, LoteRechazado, registrar_lote
+from .paginacion import leer_por_pagina, pagina_por_cursor, recorrer_por_cursor
+from .serializadores import RespuestaJSON
+from .pdf import (
+    CAMPOS_SOLICITUD, datos_solicitud, guardar_cacheado, huella_solicitud,
+    obtener_cacheado, renderizar
 )
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from django.utils.http import parse_etags
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
         
 
 def buscar_alumno(request, numero_control):
     if request.method == 'GET':
-        try:
-            alumno = Alumno.objects.get(numero_control=numero_control)
-            data = {
-                'numero_control': alumno.numero_control,
-                'nombres': alumno.nombres,
-                'apellido_paterno': alumno.apellido_paterno,
-                'apellido_materno': alumno.apellido_materno,
-                'grupo_anterior': alumno.grupo_anterior,
-                'semestre_anterior': alumno.semestre_anterior,
-                'puede_elegir_especialidad': alumno.puede_elegir_especialidad,
-                'tiene_ficha': FichaInscripcion.objects.filter(alumno=alumno).exists()
-            }
-            
-            if data['tiene_ficha']:
-                ficha = FichaInscripcion.objects.get(alumno=alumno)
-                data['ficha_existente'] = {
-                    'id_inscripcion': ficha.id_inscripcion,
-                    'grupo_inscripcion': ficha.grupo_inscripcion,
-                    'semestre_inscripcion': ficha.semestre_inscripcion,
-                    'especialidad': ficha.especialidad.nombre if ficha.especialidad else None,
-                    'taller': ficha.taller.nombre if ficha.taller else None,
-                    'fecha_solicitud': ficha.fecha_solicitud
-                }
-            
-            return JsonResponse(data, status=200)
-        except Alumno.DoesNotExist:
+        fila = Alumno.objects.filter(numero_control=numero_control).values_list(
+            *serializadores.CAMPOS_ALUMNO
+        ).first()
+        if fila is None:
             return JsonResponse({'error': 'Alumno no encontrado'}, status=404)
+
+        ficha = FichaInscripcion.objects.filter(alumno_id=numero_control).values_list(
+            *serializadores.CAMPOS_FICHA_EXISTENTE
+        ).order_by('-fecha_solicitud').first()
+
+        data = serializadores.alumno(fila)
+        data['tiene_ficha'] = ficha is not None
+        if ficha is not None:
+            data['ficha_existente'] = serializadores.ficha_existente(ficha)
+
+        return RespuestaJSON(data, status=200)
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+
+CAMPOS_INICIO = serializadores.CAMPOS_ALUMNO + tuple(
+    'fichainscripcion__' + campo for campo in serializadores.CAMPOS_FICHA_EXISTENTE
+)
+
+
+def inicio_inscripcion(request, numero_control):
+    if request.method == 'GET':
+        # Alumno y ficha en una sola consulta (LEFT JOIN); el catálogo sale de
+        # la instantánea en memoria, así que no agrega viajes a la base.
+        fila = Alumno.objects.filter(numero_control=numero_control).values_list(*CAMPOS_INICIO).order_by(
+            '-fichainscripcion__fecha_solicitud'
+        ).first()
+        if fila is None:
+            return JsonResponse({'error': 'Alumno no encontrado'}, status=404)
+
+        columnas_alumno = len(serializadores.CAMPOS_ALUMNO)
+        alumno = serializadores.alumno(fila[:columnas_alumno])
+        alumno['tiene_ficha'] = fila[columnas_alumno] is not None
+        data = {'alumno': alumno, 'ficha_existente': None, 'especialidades': [], 'talleres': []}
+
+        if alumno['tiene_ficha']:
+            data['ficha_existente'] = serializadores.ficha_existente(fila[columnas_alumno:])
+        else:
+            instantanea = catalogo.obtener()
+            data['talleres'] = [t for t in instantanea['talleres'] if t['fichas_disponibles'] > 0]
+            if alumno['puede_elegir_especialidad']:
+                data['especialidades'] = [
+                    e for e in instantanea['especialidades'] if e['fichas_disponibles'] > 0
+                ]
+
+        return RespuestaJSON(data, status=200)
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+
+def buscar_alumnos(request):
+    if request.method == 'GET':
+        try:
+            limite = max(1, min(int(request.GET.get('limite', 20)), 100))
+        except ValueError:
+            return JsonResponse({'error': 'Límite no válido'}, status=400)
+
+        numeros = busqueda.buscar(request.GET.get('q', ''), limite=limite)
+        filas = {
+            fila[0]: fila
+            for fila in Alumno.objects.filter(numero_control__in=numeros).values_list(*serializadores.CAMPOS_ALUMNO)
+        }
+        resultados = [serializadores.alumno_resumen(filas[numero]) for numero in numeros if numero in filas]
+        return RespuestaJSON({'resultados': resultados}, status=200)
     else:
         return JsonResponse({'error': 'Método no permitido'}, status=405)
 
 
 def talleres_disponibles(request):
     if request.method == 'GET':
-        talleres = Taller.objects.filter(cantidad__lt=30).values('id_taller', 'nombre', 'cantidad')
-        talleres_list = []
-        for taller in talleres:
-            taller_obj = Taller.objects.get(id_taller=taller['id_taller'])
-            taller['fichas_disponibles'] = taller_obj.fichas_disponibles()
-            talleres_list.append(taller)
-        return JsonResponse(talleres_list, safe=False)
+        return HttpResponse(catalogo.obtener()['json_talleres'], content_type='application/json')
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
 
 
 def especialidades_disponibles(request):
     if request.method == 'GET':
-        especialidades = Especialidad.objects.filter(cantidad__lt=40).values(
-            'id_especialidad', 'nombre', 'codigo', 'cantidad'
-        )
-        especialidades_list = []
-        for esp in especialidades:
-            esp_obj = Especialidad.objects.get(id_especialidad=esp['id_especialidad'])
-            esp['fichas_disponibles'] = esp_obj.fichas_disponibles()
-            especialidades_list.append(esp)
-        return JsonResponse(especialidades_list, safe=False)
+        return HttpResponse(catalogo.obtener()['json_especialidades'], content_type='application/json')
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
 
 @csrf_exempt
+@idempotente
+@admision_controlada
 @transaction.atomic
 def registrar_inscripcion(request):
     if request.method == 'POST':
@@ -141,20 +180,10 @@ def registrar_inscripcion(request):
             
             ficha.save()
 
-            return JsonResponse({
+            return RespuestaJSON({
                 'success': True,
                 'message': 'Inscripción registrada exitosamente',
-                'data': {
-                    'id_inscripcion': ficha.id_inscripcion,
-                    'numero_control': ficha.alumno.numero_control,
-                    'nombre_completo': f"{ficha.alumno.nombres} {ficha.alumno.apellido_paterno} {ficha.alumno.apellido_materno}",
-                    'grupo_asignado': ficha.grupo_inscripcion,
-                    'semestre_asignado': ficha.semestre_inscripcion,
-                    'especialidad_asignada': ficha.especialidad.nombre if ficha.especialidad else None,
-                    'codigo_especialidad': ficha.especialidad.codigo if ficha.especialidad else None,
-                    'taller_asignado': ficha.taller.nombre if ficha.taller else None,
-                    'fecha_solicitud': ficha.fecha_solicitud.isoformat()
-                }
+                'data': serializadores.ficha_registrada(ficha)
             }, status=201)
 
         except ValidationError as e:
@@ -171,38 +200,140 @@ def registrar_inscripcion(request):
         return JsonResponse({'error': 'Método no permitido'}, status=405)
 
 
-def consultar_ficha(request, numero_control):
-    if request.method == 'GET':
+@csrf_exempt
+@idempotente
+@admision_controlada
+def registrar_inscripciones_lote(request):
+    if request.method == 'POST':
         try:
-            alumno = Alumno.objects.get(numero_control=numero_control)
-            ficha = FichaInscripcion.objects.get(alumno=alumno)
-            
-            data = {
-                'id_inscripcion': ficha.id_inscripcion,
-                'alumno': {
-                    'numero_control': ficha.alumno.numero_control,
-                    'nombre_completo': f"{ficha.alumno.nombres} {ficha.alumno.apellido_paterno} {ficha.alumno.apellido_materno}",
-                    'grupo_anterior': ficha.alumno.grupo_anterior,
-                    'semestre_anterior': ficha.alumno.semestre_anterior
-                },
-                'inscripcion': {
-                    'grupo_inscripcion': ficha.grupo_inscripcion,
-                    'semestre_inscripcion': ficha.semestre_inscripcion,
-                    'especialidad': {
-                        'nombre': ficha.especialidad.nombre if ficha.especialidad else None,
-                        'codigo': ficha.especialidad.codigo if ficha.especialidad else None
-                    },
-                    'taller': ficha.taller.nombre if ficha.taller else None,
-                    'fecha_solicitud': ficha.fecha_solicitud
+            data = json.loads(request.body)
+            filas = data.get('inscripciones')
+            if not isinstance(filas, list) or not filas:
+                return JsonResponse({'success': False, 'error': 'Se requiere una lista de inscripciones'}, status=400)
+            if len(filas) > LOTE_MAXIMO:
+                return JsonResponse({
+                    'success': False,
+                    'error': f'El lote no puede tener más de {LOTE_MAXIMO} inscripciones'
+                }, status=400)
+
+            resultados = registrar_lote(filas)
+            registradas = sum(1 for resultado in resultados if resultado['success'])
+
+            return JsonResponse({
+                'success': True,
+                'registradas': registradas,
+                'rechazadas': len(resultados) - registradas,
+                'resultados': resultados
+            }, status=200)
+
+        except (ValueError, AttributeError):
+            return JsonResponse({'success': False, 'error': 'Cuerpo de la solicitud no válido'}, status=400)
+        except (LoteRechazado, IntegrityError) as e:
+            return JsonResponse({
+                'success': False,
+                'error': f'El lote no se registró, intente de nuevo: {str(e)}'
+            }, status=409)
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': f'Error interno del servidor: {str(e)}'
+            }, status=500)
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+
+def _ids(valor):
+    if not isinstance(valor, list) or not all(type(pk) is int for pk in valor):
+        raise ValueError
+    if len(set(valor)) != len(valor):
+        raise ValueError
+    return valor
+
+
+@csrf_exempt
+def registrar_preferencias(request):
+    if request.method == 'POST':
+        try:
+            if not preferencias.ventana_abierta():
+                return JsonResponse({'success': False, 'error': 'La ventana de preferencias está cerrada'}, status=409)
+
+            data = json.loads(request.body)
+            numero_control = data.get('numero_control')
+            if not numero_control:
+                return JsonResponse({'success': False, 'error': 'Número de control es obligatorio'}, status=400)
+
+            try:
+                alumno = Alumno.objects.get(numero_control=numero_control)
+            except Alumno.DoesNotExist:
+                return JsonResponse({'success': False, 'error': 'Alumno no encontrado'}, status=404)
+
+            semestre_nuevo = alumno.semestre_anterior + 1
+            if FichaInscripcion.objects.filter(alumno=alumno, semestre_inscripcion=semestre_nuevo).exists():
+                return JsonResponse({
+                    'success': False,
+                    'error': f'El alumno ya tiene una ficha registrada para el semestre {semestre_nuevo}'
+                }, status=409)
+
+            especialidades = _ids(data.get('especialidades', []))
+            talleres = _ids(data.get('talleres', []))
+
+            # Se valida contra la instantánea del catálogo, sin consultar los cursos.
+            instantanea = catalogo.obtener()
+            if not set(especialidades) <= {esp['id_especialidad'] for esp in instantanea['especialidades']}:
+                return JsonResponse({'success': False, 'error': 'Especialidad no válida'}, status=400)
+            if not set(talleres) <= {taller['id_taller'] for taller in instantanea['talleres']}:
+                return JsonResponse({'success': False, 'error': 'Taller no válido'}, status=400)
+
+            if alumno.puede_elegir_especialidad:
+                if not especialidades:
+                    return JsonResponse({
+                        'success': False,
+                        'error': 'Los alumnos de 2do semestre deben elegir una especialidad'
+                    }, status=400)
+            else:
+                # La especialidad de los demás semestres sale de su grupo anterior.
+                especialidades = []
+
+            PreferenciaInscripcion.objects.update_or_create(
+                alumno=alumno,
+                semestre_inscripcion=semestre_nuevo,
+                defaults={'especialidades': especialidades, 'talleres': talleres},
+            )
+
+            return JsonResponse({
+                'success': True,
+                'message': 'Preferencias registradas exitosamente',
+                'data': {
+                    'numero_control': alumno.numero_control,
+                    'semestre_inscripcion': semestre_nuevo,
+                    'especialidades': especialidades,
+                    'talleres': talleres,
                 }
-            }
-            
-            return JsonResponse(data, status=200)
-            
-        except Alumno.DoesNotExist:
-            return JsonResponse({'error': 'Alumno no encontrado'}, status=404)
-        except FichaInscripcion.DoesNotExist:
+            }, status=201)
+
+        except (ValueError, AttributeError):
+            return JsonResponse({'success': False, 'error': 'Cuerpo de la solicitud no válido'}, status=400)
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': f'Error interno del servidor: {str(e)}'
+            }, status=500)
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+
+def consultar_ficha(request, numero_control):
+    if request.method == 'GET':
+        fila = FichaInscripcion.objects.filter(alumno_id=numero_control).values_list(
+            *serializadores.CAMPOS_FICHA
+        ).order_by('-fecha_solicitud').first()
+
+        if fila is None:
+            if not Alumno.objects.filter(numero_control=numero_control).exists():
+                return JsonResponse({'error': 'Alumno no encontrado'}, status=404)
             return JsonResponse({'error': 'El alumno no tiene ficha de inscripción'}, status=404)
+
+        return RespuestaJSON(serializadores.ficha(fila), status=200)
     else:
         return JsonResponse({'error': 'Método no permitido'}, status=405)
 
@@ -211,78 +342,56 @@ def consultar_todas_fichas(request):
     if request.method == 'GET':
         try:
             page = request.GET.get('page', 1)
-            per_page = int(request.GET.get('per_page', 20))
+            per_page = leer_por_pagina(request.GET.get('per_page', 20))
             
             search = request.GET.get('search', '')
             grupo = request.GET.get('grupo', '')
             semestre = request.GET.get('semestre', '')
             especialidad = request.GET.get('especialidad', '')
             
-            fichas_query = FichaInscripcion.objects.select_related(
-                'alumno', 'especialidad', 'taller'
-            ).all()
-            
-            if search:
-                fichas_query = fichas_query.filter(
-                    FichaInscripcion(alumno__numero_control__icontains=search) |
-                    FichaInscripcion(alumno__nombres__icontains=search) |
-                    FichaInscripcion(alumno__apellido_paterno__icontains=search) |
-                    FichaInscripcion(alumno__apellido_materno__icontains=search)
-                )
-            
-            if grupo:
-                fichas_query = fichas_query.filter(grupo_inscripcion__icontains=grupo)
-            
-            if semestre:
-                fichas_query = fichas_query.filter(semestre_inscripcion=semestre)
-            
-            if especialidad:
-                fichas_query = fichas_query.filter(especialidad__codigo=especialidad)
-            
-            fichas_query = fichas_query.order_by('-fecha_solicitud')
-            
-            paginator = Paginator(fichas_query, per_page)
+            # Filas con nombre para que el cursor lea fecha_solicitud e id_inscripcion.
+            fichas_query = filtrar_fichas(search, grupo, semestre, especialidad).values_list(
+                *serializadores.CAMPOS_FICHA, named=True
+            )
             
-            try:
-                fichas_page = paginator.page(page)
-            except PageNotAnInteger:
-                fichas_page = paginator.page(1)
-            except EmptyPage:
-                fichas_page = paginator.page(paginator.num_pages)
+            fichas_query = fichas_query.order_by('-fecha_solicitud', '-id_inscripcion')
             
-            fichas_data = []
-            for ficha in fichas_page:
-                ficha_data = {
-                    'id_inscripcion': ficha.id_inscripcion,
-                    'alumno': {
-                        'numero_control': ficha.alumno.numero_control,
-                        'nombre_completo': f"{ficha.alumno.nombres} {ficha.alumno.apellido_paterno} {ficha.alumno.apellido_materno}",
-                        'grupo_anterior': ficha.alumno.grupo_anterior,
-                        'semestre_anterior': ficha.alumno.semestre_anterior
-                    },
-                    'inscripcion': {
-                        'grupo_inscripcion': ficha.grupo_inscripcion,
-                        'semestre_inscripcion': ficha.semestre_inscripcion,
-                        'especialidad': {
-                            'nombre': ficha.especialidad.nombre if ficha.especialidad else None,
-                            'codigo': ficha.especialidad.codigo if ficha.especialidad else None
-                        },
-                        'taller': ficha.taller.nombre if ficha.taller else None,
-                        'fecha_solicitud': ficha.fecha_solicitud
-                    }
+            if request.GET.get('modo') == 'cursor':
+                try:
+                    fichas_page, next_cursor = pagina_por_cursor(
+                        fichas_query, request.GET.get('cursor', ''), per_page
+                    )
+                except ValueError:
+                    return JsonResponse({'error': 'Cursor no válido'}, status=400)
+
+                pagination_info = {
+                    'modo': 'cursor',
+                    'per_page': per_page,
+                    'has_next': next_cursor is not None,
+                    'next_cursor': next_cursor
+                }
+            else:
+                paginator = Paginator(fichas_query, per_page)
+                
+                try:
+                    fichas_page = paginator.page(page)
+                except PageNotAnInteger:
+                    fichas_page = paginator.page(1)
+                except EmptyPage:
+                    fichas_page = paginator.page(paginator.num_pages)
+                
+                pagination_info = {
+                    'current_page': fichas_page.number,
+                    'total_pages': paginator.num_pages,
+                    'total_records': paginator.count,
+                    'per_page': per_page,
+                    'has_next': fichas_page.has_next(),
+                    'has_previous': fichas_page.has_previous(),
+                    'next_page': fichas_page.next_page_number() if fichas_page.has_next() else None,
+                    'previous_page': fichas_page.previous_page_number() if fichas_page.has_previous() else None
                 }
-                fichas_data.append(ficha_data)
             
-            pagination_info = {
-                'current_page': fichas_page.number,
-                'total_pages': paginator.num_pages,
-                'total_records': paginator.count,
-                'per_page': per_page,
-                'has_next': fichas_page.has_next(),
-                'has_previous': fichas_page.has_previous(),
-                'next_page': fichas_page.next_page_number() if fichas_page.has_next() else None,
-                'previous_page': fichas_page.previous_page_number() if fichas_page.has_previous() else None
-            }
+            fichas_data = [serializadores.ficha(fila) for fila in fichas_page]
             
             response_data = {
                 'fichas': fichas_data,
@@ -295,8 +404,13 @@ def consultar_todas_fichas(request):
                 }
             }
             
-            return JsonResponse(response_data, status=200)
+            return RespuestaJSON(response_data, status=200)
             
+        except ValueError as e:
+            return JsonResponse({
+                'error': 'Parámetros no válidos',
+                'detail': str(e)
+            }, status=400)
         except Exception as e:
             return JsonResponse({
                 'error': 'Error interno del servidor',
@@ -307,205 +421,113 @@ def consultar_todas_fichas(request):
         return JsonResponse({'error': 'Método no permitido'}, status=405)
 
 
+COLUMNAS_EXPORTACION = [
+    ('numero_control', 'alumno__numero_control'),
+    ('nombres', 'alumno__nombres'),
+    ('apellido_paterno', 'alumno__apellido_paterno'),
+    ('apellido_materno', 'alumno__apellido_materno'),
+    ('grupo_anterior', 'alumno__grupo_anterior'),
+    ('semestre_anterior', 'alumno__semestre_anterior'),
+    ('id_inscripcion', 'id_inscripcion'),
+    ('grupo_inscripcion', 'grupo_inscripcion'),
+    ('semestre_inscripcion', 'semestre_inscripcion'),
+    ('especialidad', 'especialidad__nombre'),
+    ('codigo_especialidad', 'especialidad__codigo'),
+    ('taller', 'taller__nombre'),
+    ('fecha_solicitud', 'fecha_solicitud'),
+]
+
+
+class _Eco:
+    def write(self, value):
+        return value
+
+
+def _filas_csv(filas):
+    escritor = csv.writer(_Eco())
+    yield '\ufeff' + escritor.writerow([nombre for nombre, _ in COLUMNAS_EXPORTACION])
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+@require_http_methods(["GET"])
+def exportar_fichas(request):
+    formato = request.GET.get('formato', 'csv')
+    if formato not in ('csv', 'xlsx'):
+        return JsonResponse({'error': 'Formato no válido, use csv o xlsx'}, status=400)
+
+    try:
+        fichas_query = filtrar_fichas(
+            request.GET.get('search', ''),
+            request.GET.get('grupo', ''),
+            request.GET.get('semestre', ''),
+            request.GET.get('especialidad', '')
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    filas = recorrer_por_cursor(
+        replicas.con_alias_actual(fichas_query), [campo for _, campo in COLUMNAS_EXPORTACION], settings.EXPORTACION_BLOQUE
+    )
+
+    if formato == 'csv':
+        response = StreamingHttpResponse(_filas_csv(filas), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="fichas_inscripcion.csv"'
+        return response
+
+    # XLSX es un ZIP que se cierra al final: se escribe en modo write_only
+    # (memoria constante) a un temporal y después se envía.
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('Fichas')
+    hoja.append([nombre for nombre, _ in COLUMNAS_EXPORTACION])
+    for fila in filas:
+        hoja.append([valor.replace(tzinfo=None) if hasattr(valor, 'tzinfo') else valor for valor in fila])
+    destino = tempfile.TemporaryFile()
+    libro.save(destino)
+    destino.seek(0)
+
+    response = FileResponse(
+        destino, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    response['Content-Disposition'] = 'attachment; filename="fichas_inscripcion.xlsx"'
+    return response
+
+
 @require_http_methods(["GET"])
 def generar_solicitud_pdf(request, numero_control):
     try:
-        try:
-            alumno = Alumno.objects.get(numero_control=numero_control)
-            ficha = FichaInscripcion.objects.get(alumno=alumno)
-        except Alumno.DoesNotExist:
-            return HttpResponse('Alumno no encontrado', status=404)
-        except FichaInscripcion.DoesNotExist:
+        fila = FichaInscripcion.objects.filter(alumno_id=numero_control).order_by(
+            '-semestre_inscripcion'
+        ).values(*CAMPOS_SOLICITUD).first()
+        if fila is None:
+            if not Alumno.objects.filter(numero_control=numero_control).exists():
+                return HttpResponse('Alumno no encontrado', status=404)
             return HttpResponse('El alumno no tiene ficha de inscripción registrada', status=404)
 
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter,
-                                rightMargin=40, leftMargin=40,
-                                topMargin=30, bottomMargin=40)
-
-        elements = []
-        styles = getSampleStyleSheet()
-
-        header_style = ParagraphStyle(
-            'header',
-            parent=styles['Normal'],
-            fontSize=10,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#003366'),
-            spaceAfter=3
-        )
-
-        title_style = ParagraphStyle(
-            'title',
-            parent=styles['Heading1'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#003366'),
-            spaceAfter=10,
-            fontName='Helvetica-Bold'
-        )
+        datos = datos_solicitud(fila)
+        huella = huella_solicitud(datos)
+        etag = f'"{huella}"'
 
-        field_style = ParagraphStyle(
-            'field',
-            parent=styles['Normal'],
-            fontSize=10,
-            spaceAfter=5
-        )
+        etags_cliente = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in etags_cliente or '*' in etags_cliente:
+            response = HttpResponse(status=304)
+        else:
+            contenido = obtener_cacheado(huella)
+            if contenido is None:
+                contenido = renderizar(datos)
+                guardar_cacheado(numero_control, huella, contenido)
 
-        section_style = ParagraphStyle(
-            'section',
-            parent=styles['Normal'],
-            fontSize=11,
-            fontName='Helvetica-Bold',
-            spaceAfter=8
-        )
+            response = HttpResponse(contenido, content_type='application/pdf')
+            response['Content-Disposition'] = f'inline; filename="solicitud_reinscripcion_{numero_control}.pdf"'
 
-        try:
-            logo = Image("registro/static/logo.png", width=90, height=90)
-        except:
-            logo = Paragraph("<b>[LOGO]</b>", field_style)
-        
-        encabezado_data = [
-            [logo, Paragraph(
-                "<b>SECRETARÍA DE EDUCACIÓN PÚBLICA<br/>"
-                "SUBSECRETARÍA DE EDUCACIÓN MEDIA SUPERIOR<br/>"
-                "DIRECCIÓN GENERAL DE BACHILLERATO<br/>"
-                "<br/>"
-                "PREPARATORIA FEDERAL POR COOPERACIÓN<br/>"
-                "\"VALENTÍN GÓMEZ FARÍAS\"<br/>"
-                "C.C.T. 17EBH0027O</b>"
-                , header_style)]
-        ]
-        encabezado_table = Table(encabezado_data, colWidths=[100, 450])
-        encabezado_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('ALIGN', (1, 0), (1, 0), 'CENTER'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 5),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 5),
-        ]))
-        elements.append(encabezado_table)
-        elements.append(Spacer(1, 15))
-
-        nombre_completo = f"{alumno.nombres} {alumno.apellido_paterno} {alumno.apellido_materno}"
-        
-        datos_basicos = [
-            [f"Número De Control: {alumno.numero_control}", f"Nombre Completo: {nombre_completo}"]
-        ]
-        tabla_basicos = Table(datos_basicos, colWidths=[200, 350])
-        tabla_basicos.setStyle(TableStyle([
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 5),
-        ]))
-        elements.append(tabla_basicos)
-        elements.append(Spacer(1, 15))
-
-        datos_reinscripcion = [
-            ["DATOS DE REINSCRIPCIÓN"],
-            ["SEMESTRE", "ESPECIALIDAD", "TALLER"],
-            [str(ficha.semestre_inscripcion), ficha.especialidad.nombre, ficha.taller.nombre]
-        ]
-        tabla_reinscripcion = Table(datos_reinscripcion, colWidths=[183, 183, 184])
-        tabla_reinscripcion.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('SPAN', (0, 0), (-1, 0)),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#E8E8E8")),
-            ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor("#F0F0F0")),
-        ]))
-        elements.append(tabla_reinscripcion)
-        elements.append(Spacer(1, 15))
-
-        datos_ultimo_semestre = [
-            ["DATOS ULTIMO SEMESTRE CURSADO"],
-            ["GRUPO ANTERIOR", "SEMESTRE ANTERIOR"],
-            [str(alumno.grupo_anterior), str(alumno.semestre_anterior)]
-        ]
-        tabla_ultimo = Table(datos_ultimo_semestre, colWidths=[275, 275])
-        tabla_ultimo.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('SPAN', (0, 0), (-1, 0)),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#E8E8E8")),
-            ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor("#F0F0F0")),
-        ]))
-        elements.append(tabla_ultimo)
-        elements.append(Spacer(1, 15))
-
-        materias_header = [
-            ["MATERIAS QUE ADEUDAN EN LOS SEMESTRES ANTERIORES"],
-            ["MATERIA", "PERIODO", "SEMESTRE"]
-        ]
-        materias_rows = [["", "", ""] for _ in range(6)]
-        
-        materias_data = materias_header + materias_rows
-        tabla_materias = Table(materias_data, colWidths=[250, 150, 150])
-        tabla_materias.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('SPAN', (0, 0), (-1, 0)),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#E8E8E8")),
-            ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor("#F0F0F0")),
-        ]))
-        elements.append(tabla_materias)
-        elements.append(Spacer(1, 15))
-
-        observaciones_data = [
-            ["OBSERVACIONES"],
-            [""]
-        ]
-        tabla_observaciones = Table(observaciones_data, colWidths=[550], rowHeights=[25, 60])
-        tabla_observaciones.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('BACKGROUND', (0, 0), (0, 0), colors.HexColor("#E8E8E8")),
-            ('VALIGN', (0, 1), (0, 1), 'TOP'),
-        ]))
-        elements.append(tabla_observaciones)
-        elements.append(Spacer(1, 20))
-
-        fecha_actual = ficha.fecha_solicitud.strftime('%d/%m/%Y')
-        firma_data = [
-            ["FIRMA DE CONTROL ESCOLAR"],
-            [""],
-            [f"FECHA DE SOLICITUD: {fecha_actual}"]
-        ]
-        tabla_firma = Table(firma_data, colWidths=[275], rowHeights=[25, 50, 25])
-        tabla_firma.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, 2), (0, 2), 'Helvetica-Bold'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('BACKGROUND', (0, 0), (0, 0), colors.HexColor("#E8E8E8")),
-        ]))
-        elements.append(tabla_firma)
-
-        doc.build(elements)
-        buffer.seek(0)
-        
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'inline; filename="solicitud_reinscripcion_{numero_control}.pdf"'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
         
         response['Access-Control-Allow-Origin'] = '*'
         response['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
         response['Access-Control-Allow-Headers'] = 'Content-Type'
+        response['Access-Control-Expose-Headers'] = 'ETag'
         
         return response
 
@@ -515,6 +537,83 @@ def generar_solicitud_pdf(request, numero_control):
         return error_response
 
 
+@require_http_methods(["GET"])
+def generar_solicitudes_grupo_pdf(request):
+    grupo = request.GET.get('grupo', '')
+    especialidad = request.GET.get('especialidad', '')
+    semestre = request.GET.get('semestre', '')
+    formato = request.GET.get('formato', 'pdf')
+
+    if not (grupo or especialidad or semestre):
+        return JsonResponse({'error': 'Indique al menos grupo, especialidad o semestre'}, status=400)
+    if formato not in ('pdf', 'zip'):
+        return JsonResponse({'error': 'Formato no válido, use pdf o zip'}, status=400)
+    try:
+        validar_semestre(semestre)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    try:
+        # El conteo y las filas (que el ZIP lee al enviarse) de la misma base.
+        filas = replicas.con_alias_actual(filtrar_solicitudes(grupo, especialidad, semestre))
+        total = filas.count()
+        if not total:
+            return JsonResponse({'error': 'No hay fichas que coincidan con el filtro'}, status=404)
+        if formato == 'pdf' and total > settings.PDF_COMBINADO_MAXIMO:
+            # El PDF combinado se arma en memoria hasta cerrarlo; el ZIP se
+            # envía por partes y no tiene este límite.
+            return JsonResponse({
+                'error': f'El filtro incluye {total} solicitudes; el PDF combinado admite hasta '
+                         f'{settings.PDF_COMBINADO_MAXIMO}. Use formato=zip.'
+            }, status=400)
+
+        nombre = '_'.join(valor for valor in (grupo, especialidad, semestre) if valor)
+        if formato == 'zip':
+            response = StreamingHttpResponse(
+                solicitudes_en_zip(filas.iterator(), settings.PDF_PROCESOS),
+                content_type='application/zip'
+            )
+            response['Content-Disposition'] = f'attachment; filename="solicitudes_{nombre}.zip"'
+        else:
+            destino = tempfile.TemporaryFile()
+            with medir('pdf'):
+                solicitudes_combinadas(filas.iterator(), destino)
+            destino.seek(0)
+            response = FileResponse(destino, content_type='application/pdf')
+            response['Content-Disposition'] = f'inline; filename="solicitudes_{nombre}.pdf"'
+
+        response['Access-Control-Allow-Origin'] = '*'
+        return response
+
+    except Exception as e:
+        error_response = HttpResponse(f"Error al generar PDF: {str(e)}", status=500)
+        error_response['Access-Control-Allow-Origin'] = '*'
+        return error_response
+
+
+def estado_admision(request):
+    if request.method == 'GET':
+        return RespuestaJSON(admision.estadisticas(), status=200)
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+
+def cupos_en_vivo(request):
+    # Cada conexión SSE ocuparía un hilo del worker durante horas; solo se
+    # sirve con el servidor ASGI (ver vistas_async.py y start.sh).
+    return JsonResponse({'error': 'Disponible solo con el servidor ASGI'}, status=501)
+
+
+def estado_pool(request):
+    if request.method == 'GET':
+        pool = getattr(connection, 'pool', None)
+        if pool is None:
+            return JsonResponse({'error': 'La base de datos no usa pool de conexiones'}, status=404)
+        return RespuestaJSON(pool.estadisticas(), status=200)
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+
 def handle_preflight(request):
     response = HttpResponse()
     response['Access-Control-Allow-Origin'] = '*'
@@ -0,0 +1,182 @@
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+
+from . import catalogo, difusion, serializadores, views
+from .filtros import filtrar_fichas
+from .models import Alumno, FichaInscripcion
+from .paginacion import apagina_por_cursor, leer_por_pagina, pagina_numerada
+from .serializadores import RespuestaJSON
+
+# Versiones asíncronas de las vistas de solo lectura de views.py. Responden lo
+# mismo; urls.py las usa cuando API_ASYNC está activo (servidor ASGI).
+
+PARTES_POR_TANDA = 64
+
+
+async def _por_tandas(contenido):
+    # Con ASGI, Django junta en memoria todo un iterador síncrono antes de
+    # enviarlo. Aquí se lee por tandas en el hilo de sync_to_async (el mismo
+    # que tiene la conexión a la base) y se envía conforme se genera.
+    iterador = iter(contenido)
+    siguiente_tanda = sync_to_async(lambda: list(islice(iterador, PARTES_POR_TANDA)))
+    while True:
+        tanda = await siguiente_tanda()
+        if not tanda:
+            return
+        for parte in tanda:
+            yield parte
+
+
+def _descarga_async(vista):
+    async def envoltura(request, *args, **kwargs):
+        response = await sync_to_async(vista)(request, *args, **kwargs)
+        if response.streaming and not response.is_async:
+            response.streaming_content = _por_tandas(response.streaming_content)
+        return response
+    return envoltura
+
+
+# CSV/XLSX de fichas y ZIP/PDF por grupo: la generación sigue siendo la de
+# views.py, solo cambia cómo se entrega la respuesta.
+exportar_fichas = _descarga_async(views.exportar_fichas)
+generar_solicitudes_grupo_pdf = _descarga_async(views.generar_solicitudes_grupo_pdf)
+
+
+async def buscar_alumno(request, numero_control):
+    if request.method == 'GET':
+        fila = await Alumno.objects.filter(numero_control=numero_control).values_list(
+            *serializadores.CAMPOS_ALUMNO
+        ).afirst()
+        if fila is None:
+            return JsonResponse({'error': 'Alumno no encontrado'}, status=404)
+
+        ficha = await FichaInscripcion.objects.filter(alumno_id=numero_control).values_list(
+            *serializadores.CAMPOS_FICHA_EXISTENTE
+        ).order_by('-fecha_solicitud').afirst()
+
+        data = serializadores.alumno(fila)
+        data['tiene_ficha'] = ficha is not None
+        if ficha is not None:
+            data['ficha_existente'] = serializadores.ficha_existente(ficha)
+
+        return RespuestaJSON(data, status=200)
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+
+async def talleres_disponibles(request):
+    if request.method == 'GET':
+        instantanea = await sync_to_async(catalogo.obtener)()
+        return HttpResponse(instantanea['json_talleres'], content_type='application/json')
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+
+async def especialidades_disponibles(request):
+    if request.method == 'GET':
+        instantanea = await sync_to_async(catalogo.obtener)()
+        return HttpResponse(instantanea['json_especialidades'], content_type='application/json')
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+
+async def cupos_en_vivo(request):
+    if request.method == 'GET':
+        response = StreamingHttpResponse(difusion.eventos(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+
+async def consultar_ficha(request, numero_control):
+    if request.method == 'GET':
+        fila = await FichaInscripcion.objects.filter(alumno_id=numero_control).values_list(
+            *serializadores.CAMPOS_FICHA
+        ).order_by('-fecha_solicitud').afirst()
+
+        if fila is None:
+            if not await Alumno.objects.filter(numero_control=numero_control).aexists():
+                return JsonResponse({'error': 'Alumno no encontrado'}, status=404)
+            return JsonResponse({'error': 'El alumno no tiene ficha de inscripción'}, status=404)
+
+        return RespuestaJSON(serializadores.ficha(fila), status=200)
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+
+async def consultar_todas_fichas(request):
+    if request.method == 'GET':
+        try:
+            page = request.GET.get('page', 1)
+            per_page = leer_por_pagina(request.GET.get('per_page', 20))
+
+            search = request.GET.get('search', '')
+            grupo = request.GET.get('grupo', '')
+            semestre = request.GET.get('semestre', '')
+            especialidad = request.GET.get('especialidad', '')
+
+            fichas_query = filtrar_fichas(search, grupo, semestre, especialidad).values_list(
+                *serializadores.CAMPOS_FICHA, named=True
+            ).order_by('-fecha_solicitud', '-id_inscripcion')
+
+            if request.GET.get('modo') == 'cursor':
+                try:
+                    fichas_page, next_cursor = await apagina_por_cursor(
+                        fichas_query, request.GET.get('cursor', ''), per_page
+                    )
+                except ValueError:
+                    return JsonResponse({'error': 'Cursor no válido'}, status=400)
+
+                pagination_info = {
+                    'modo': 'cursor',
+                    'per_page': per_page,
+                    'has_next': next_cursor is not None,
+                    'next_cursor': next_cursor
+                }
+            else:
+                total = await fichas_query.acount()
+                numero, paginas = pagina_numerada(page, total, per_page)
+                inicio = (numero - 1) * per_page
+                fichas_page = [fila async for fila in fichas_query[inicio:inicio + per_page]]
+
+                pagination_info = {
+                    'current_page': numero,
+                    'total_pages': paginas,
+                    'total_records': total,
+                    'per_page': per_page,
+                    'has_next': numero < paginas,
+                    'has_previous': numero > 1,
+                    'next_page': numero + 1 if numero < paginas else None,
+                    'previous_page': numero - 1 if numero > 1 else None
+                }
+
+            response_data = {
+                'fichas': [serializadores.ficha(fila) for fila in fichas_page],
+                'pagination': pagination_info,
+                'filters_applied': {
+                    'search': search,
+                    'grupo': grupo,
+                    'semestre': semestre,
+                    'especialidad': especialidad
+                }
+            }
+
+            return RespuestaJSON(response_data, status=200)
+
+        except ValueError as e:
+            return JsonResponse({
+                'error': 'Parámetros no válidos',
+                'detail': str(e)
+            }, status=400)
+        except Exception as e:
+            return JsonResponse({
+                'error': 'Error interno del servidor',
+                'detail': str(e)
+            }, status=500)
+
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
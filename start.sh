@@ -1,4 +1,17 @@
 #!/usr/bin/env bash
 set -o errexit
 
+# Métricas de todos los workers de gunicorn en /metrics (ver gunicorn.conf.py).
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/inscripciones_metricas}
+
+# SERVIDOR=asgi sirve Inscripciones.asgi con workers de uvicorn (vistas de
+# lectura asíncronas, API_ASYNC=1); por defecto se usan workers síncronos.
+# Las exportaciones (exportar-fichas, pdf-grupo) siguen enviándose por partes
+# en ambos modos.
+# Para desarrollo: uvicorn Inscripciones.asgi:application --port 8000
+if [ "$SERVIDOR" = "asgi" ]; then
+    export API_ASYNC=1
+    exec gunicorn Inscripciones.asgi:application -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:$PORT
+fi
+
 gunicorn Inscripciones.wsgi:application --bind 0.0.0.0:$PORT
\ No newline at end of file